@@ -4,8 +4,17 @@
 
 from .board import Board
 from .simulator import Simulator
-from .ui import UI
-from .game_engine import GameEngine
 from .operators import OperatorProcessor
 
 __all__ = ['Board', 'Simulator', 'UI', 'GameEngine', 'OperatorProcessor']
+
+
+def __getattr__(name):
+    # The pygame front end is imported lazily so headless runs never load pygame
+    if name == 'UI':
+        from .ui import UI
+        return UI
+    if name == 'GameEngine':
+        from .game_engine import GameEngine
+        return GameEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,194 @@
+"""
+Static analysis of 3D programs.
+
+analyse() over-approximates every run of a program at once: it tracks, per
+cell, the kinds of value that may ever be there (a number, or a particular
+token) and lets each operator fire whenever its operands may be present,
+until nothing more can change. Input values and the board history are not
+modelled, so the result holds for any A and B and through time warps,
+which only bring back earlier boards. From the fixed point it reports
+
+- the live cells, where some operator may fire; every other operator is
+  dead and can be skipped (CompiledProgram.live, Simulator.skip_dead_operators),
+- the inert cells, which no live operator reads, writes or removes, so
+  deleting them changes nothing but the volume,
+- the bounding box of every cell that may ever be occupied, and
+- whether any S can ever be reached; if not, the program cannot submit.
+
+A warp whose dx or dy is not a fixed number could write anywhere, and
+operators carried along by other operators can spread without limit. In
+those cases the analysis gives up and returns an unbounded Analysis, which
+claims nothing.
+
+    python -m app.analysis program.3d
+"""
+
+import argparse
+import sys
+from dataclasses import dataclass
+
+from .program import EXECUTABLE_OPCODES, TOKENS
+from .program_io import load_any
+
+EXECUTABLE_TOKENS = frozenset(TOKENS[opcode] for opcode in EXECUTABLE_OPCODES)
+NUMBER = 'int'  # the kind of every number; tokens are their own kind
+
+# Without carried operators or warps, values stay next to the program's
+# operators, so limit defaults to a few times the number of cells
+LIMIT_PER_CELL = 8
+
+
+@dataclass
+class Analysis:
+    """Over-approximated behaviour of a program, see analyse()."""
+    bounded: bool
+    live: frozenset = None  # cells where an operator may fire; None when unbounded
+    dead: frozenset = frozenset()  # operator cells of the program that can never fire
+    inert: frozenset = frozenset()  # cells no live operator ever reads, writes or removes
+    bounds: tuple = None  # (min_x, max_x, min_y, max_y) of every cell that may be occupied
+    may_submit: bool = True
+
+    def volume_bound(self, max_ticks):
+        """Largest volume a run of at most max_ticks ticks can reach, or None if unknown."""
+        if self.bounds is None:
+            return None
+        min_x, max_x, min_y, max_y = self.bounds
+        return (max_x - min_x + 1) * (max_y - min_y + 1) * max_ticks
+
+
+def _kind(value):
+    # A and B are replaced by numbers when a run starts
+    if isinstance(value, int) or value in ('A', 'B'):
+        return NUMBER
+    return value
+
+
+def analyse(board, limit=None):
+    """Analyse the program on a board; returns an Analysis.
+
+    The analysis gives up once more than limit cells may be occupied.
+    """
+    grid = board.grid
+    if limit is None:
+        limit = LIMIT_PER_CELL * len(grid) + 64
+    kinds = {pos: {_kind(value)} for pos, value in grid.items()}
+    numbers = {pos: value for pos, value in grid.items() if isinstance(value, int)}
+
+    live = set()
+    touched = set()  # read, written or removed by a live operator
+    written = set()
+    removed = set()
+    warp_operands = set()  # dx, dy and dt cells that live warps took as fixed
+    work = set(kinds)  # cells to examine as operators
+
+    def add(pos, new):
+        written.add(pos)
+        current = kinds.get(pos)
+        if current is None:
+            kinds[pos] = set(new)
+        elif new <= current:
+            return
+        else:
+            current |= new
+        x, y = pos
+        work.update((pos, (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)))
+
+    def move(source, target):
+        if kinds.get(source):
+            removed.add(source)
+            touched.update((source, target))
+            add(target, kinds[source])
+            return True
+        return False
+
+    while work:
+        if len(kinds) > limit:
+            return Analysis(bounded=False)
+        pos = work.pop()
+        tokens = kinds.get(pos, set()) & EXECUTABLE_TOKENS
+        if not tokens:
+            continue
+        x, y = pos
+        left, right, above, below = (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)
+        for token in tokens:
+            if token == '<':
+                fired = move(right, left)
+            elif token == '>':
+                fired = move(left, right)
+            elif token == '^':
+                fired = move(below, above)
+            elif token == 'v':
+                fired = move(above, below)
+            elif token == '@':
+                fired = kinds.get(above) and all(NUMBER in kinds.get(p, ()) for p in (left, right, below))
+                if not fired:
+                    continue
+                if left not in numbers or right not in numbers:
+                    return Analysis(bounded=False)  # could warp anywhere
+                warp_operands.update((left, right, below))
+                if below in numbers and numbers[below] < 1:
+                    continue  # dt is fixed and never valid
+                target = (x - numbers[left], y - numbers[right])
+                removed.update((above, left, right, below))
+                touched.update((above, left, right, below, target))
+                add(target, kinds[above])
+            else:
+                left_kinds = kinds.get(left, set())
+                above_kinds = kinds.get(above, set())
+                if token == '=':
+                    result = left_kinds & above_kinds
+                elif token == '#':
+                    result = left_kinds if above_kinds else set()
+                else:
+                    result = {NUMBER} if NUMBER in left_kinds and NUMBER in above_kinds else set()
+                fired = bool(result)
+                if fired:
+                    removed.update((left, above))
+                    touched.update((left, above, right, below))
+                    add(right, result)
+                    add(below, result)
+            if fired:
+                live.add(pos)
+
+    # A warp operand taken as fixed must never be overwritten
+    if not warp_operands.isdisjoint(written):
+        return Analysis(bounded=False)
+
+    submits = [pos for pos, value in grid.items() if value == 'S']
+    xs = [x for x, y in kinds]
+    ys = [y for x, y in kinds]
+    return Analysis(
+        bounded=True,
+        live=frozenset(live),
+        dead=frozenset(pos for pos, value in grid.items() if value in EXECUTABLE_TOKENS and pos not in live),
+        inert=frozenset(pos for pos, value in grid.items()
+                        if pos not in touched and pos not in live and value != 'S'),
+        bounds=(min(xs), max(xs), min(ys), max(ys)) if kinds else None,
+        may_submit=any(pos in written or pos in removed for pos in submits),
+    )
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Statically analyse a 3D program.")
+    parser.add_argument('program', help="path to a program in grid text format or a program pack")
+    parser.add_argument('--name', help="program to analyse from a pack (default: the first)")
+    parser.add_argument('--max-ticks', type=int, default=1000000, help="tick limit for the volume bound")
+    args = parser.parse_args(argv)
+
+    analysis = analyse(load_any(args.program, args.name))
+    if not analysis.bounded:
+        print("Unbounded: a warp target is not fixed or operators spread too far")
+        return 0
+    print(f"Can submit: {'yes' if analysis.may_submit else 'no'}")
+    print(f"Live operators: {len(analysis.live)}")
+    print(f"Dead operators: {' '.join(f'{x},{y}' for x, y in sorted(analysis.dead)) or 'none'}")
+    print(f"Inert cells: {' '.join(f'{x},{y}' for x, y in sorted(analysis.inert)) or 'none'}")
+    if analysis.bounds is not None:
+        print(f"Bounds: x {analysis.bounds[0]}..{analysis.bounds[1]}, y {analysis.bounds[2]}..{analysis.bounds[3]}")
+        print(f"Volume bound at {args.max_ticks} ticks: {analysis.volume_bound(args.max_ticks)}")
+    return 0 if analysis.may_submit else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
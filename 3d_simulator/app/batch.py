@@ -0,0 +1,208 @@
+"""
+Batch runner for the 3D language simulator.
+
+Runs one program for many (A, B) input pairs in lockstep. Every input pair
+is a lane with its own Simulator, board and history, but with the numpy
+engine all lanes share one BoardArrays stack, so each tick's operations are
+collected for every running lane in a single vectorised pass (lanes whose
+boards have fewer than vector_engine.MIN_CELLS cells are collected by the
+scalar path instead). Lanes finish independently when they submit,
+deadlock, fail or hit max_ticks.
+
+The scalar engine is the default. Only collecting operations is shared
+across lanes; each lane still copies the board, applies its operations and
+records its history on its own, so with realistic programs the numpy
+engine is slower than scalar (about 1.5x with 200 lanes, whether or not
+small boards fall back to the scalar path). Pass engine='numpy' to use it
+anyway.
+
+    python -m app.batch program.3d 1,2 3,4 5,6
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from .program_io import load_any
+from .simulator import Simulator
+from .vector_engine import BoardArrays, VectorProcessor
+
+
+@dataclass
+class LaneResult:
+    """Outcome of one input pair in a batch."""
+    input_a: int
+    input_b: int
+    submitted_value: object
+    tick: int
+    volume: int
+    stop_reason: str
+    error: str = None
+    cycle_period: int = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of a batch run: one LaneResult per input pair, in input order."""
+    lanes: list
+    steps: int
+    elapsed: float
+
+    def as_dict(self):
+        """Return the result as a JSON-serialisable dict."""
+        return {
+            'lanes': [asdict(lane) for lane in self.lanes],
+            'steps': self.steps,
+            'elapsed': self.elapsed,
+        }
+
+    def format_table(self):
+        """Return the per-lane results as a plain-text table."""
+        header = ('A', 'B', 'submitted', 'ticks', 'volume', 'status')
+        rows = [header]
+        for lane in self.lanes:
+            status = lane.stop_reason or 'running'
+            if lane.error:
+                status = f"{status}: {lane.error}"
+            elif lane.cycle_period is not None:
+                status = f"{status} (period {lane.cycle_period})"
+            rows.append((str(lane.input_a), str(lane.input_b), str(lane.submitted_value),
+                         str(lane.tick), str(lane.volume), status))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header) - 1)]
+        return '\n'.join(
+            '  '.join(cell.rjust(width) for cell, width in zip(row, widths)) + '  ' + row[-1]
+            for row in rows
+        )
+
+
+def default_engine():
+    """The engine run_batch uses when none is given, see the module docstring."""
+    return 'scalar'
+
+
+def run_batch(board, inputs, max_ticks=None, engine=None):
+    """Run a program for every (a, b) pair in inputs and return a BatchResult.
+
+    The board is copied per lane, so the caller's program is left untouched.
+    """
+    if engine is None:
+        engine = default_engine()
+    inputs = list(inputs)
+
+    simulators = []
+    for a, b in inputs:
+        simulator = Simulator(board.copy(), a, b)
+        if max_ticks is not None:
+            simulator.max_ticks = max_ticks
+        simulators.append(simulator)
+
+    start = time.perf_counter()
+    if engine == 'numpy':
+        steps = _run_vectorised(simulators)
+    elif engine == 'scalar':
+        steps = _run_scalar(simulators)
+    else:
+        raise ValueError(f"Unknown engine: {engine}")
+    elapsed = time.perf_counter() - start
+
+    lanes = [
+        LaneResult(
+            input_a=simulator.input_a,
+            input_b=simulator.input_b,
+            submitted_value=simulator.submitted_value,
+            tick=simulator.tick,
+            volume=simulator.get_spacetime_volume(),
+            stop_reason=simulator.stop_reason,
+            error=simulator.error,
+            cycle_period=simulator.cycle_period,
+        )
+        for simulator in simulators
+    ]
+    return BatchResult(lanes=lanes, steps=steps, elapsed=elapsed)
+
+
+def _run_scalar(simulators):
+    """Step each lane with its own scalar processor, in lockstep."""
+    for simulator in simulators:
+        simulator.start()
+    running = list(simulators)
+    steps = 0
+    while running:
+        steps += 1
+        running = [simulator for simulator in running if simulator.step()]
+    return steps
+
+
+def _run_vectorised(simulators):
+    """Step all lanes together, collecting operations in one numpy pass per tick."""
+    arrays = BoardArrays(len(simulators))
+    processors = []
+    for lane, simulator in enumerate(simulators):
+        simulator.start()
+        processor = VectorProcessor(simulator.board, arrays, lane)
+        simulator.processor = processor
+        simulator.engine = 'numpy'
+        processors.append(processor)
+
+    # The first collection covers the board after input replacement
+    lanes = list(range(len(simulators)))
+    _collect(simulators, processors, lanes)
+
+    steps = 0
+    while lanes:
+        steps += 1
+        lanes = [lane for lane in lanes if simulators[lane].advance()]
+        _collect(simulators, processors, lanes)
+        lanes = [lane for lane in lanes if simulators[lane].check_reducible()]
+    return steps
+
+
+def _collect(simulators, processors, lanes):
+    """Collect the next tick's operations for the given lanes."""
+    # Lanes whose boards are too small for the numpy pass get None, the scalar path
+    vector_lanes = [lane for lane in lanes if processors[lane].sync(simulators[lane]._active)]
+    results = dict(zip(vector_lanes, processors[0].arrays.collect(vector_lanes))) if vector_lanes else {}
+    for lane in lanes:
+        simulator = simulators[lane]
+        processors[lane].accept(results.get(lane), simulator._active)
+        simulator._operations_collected()
+
+
+def parse_inputs(specs):
+    """Parse input pairs written as 'a,b'."""
+    inputs = []
+    for spec in specs:
+        a, sep, b = spec.partition(',')
+        if not sep:
+            raise ValueError(f"Input pair must look like 'a,b': {spec!r}")
+        inputs.append((int(a), int(b)))
+    return inputs
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run a 3D program for many input pairs.")
+    parser.add_argument('program', help="path to a program in grid text format or a program pack")
+    parser.add_argument('--name', help="program to run from a pack (default: the first)")
+    parser.add_argument('inputs', nargs='+', help="input pairs as a,b")
+    parser.add_argument('--max-ticks', type=int, default=None)
+    parser.add_argument('--engine', choices=('numpy', 'scalar'), default=None,
+                        help="defaults to scalar, which is faster for batches")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    board = load_any(args.program, args.name)
+    result = run_batch(board, parse_inputs(args.inputs), args.max_ticks, args.engine)
+
+    if args.json:
+        print(json.dumps(result.as_dict(), default=str))
+    else:
+        print(result.format_table())
+        print(f"{len(result.lanes)} lanes, {result.steps} steps in {result.elapsed:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
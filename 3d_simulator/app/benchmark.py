@@ -0,0 +1,267 @@
+"""
+Benchmark suite for the 3D language simulator.
+
+Runs a set of generated programs through the simulator and reports, per
+program and engine, ticks/sec, peak history memory, operator time per tick
+and time to first submission. Results are written as JSON so runs before
+and after an engine change can be compared:
+
+    python -m app.benchmark --output before.json
+    python -m app.benchmark --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from .board import Board
+from .simulator import Simulator
+from .vector_engine import np
+
+
+def movement_chains(length=80, rows=20):
+    """Rows of > operators passing values along; the first row ends in S."""
+    board = Board()
+    for row in range(rows):
+        y = row * 2
+        board.set_cell(0, y, 'A' if row == 0 else row)
+        for x in range(1, length, 2):
+            board.set_cell(x, y, '>')
+    last = max(range(1, length, 2))
+    board.set_cell(last + 1, 0, 'S')
+    return board
+
+
+def arithmetic_trees(depth=40, chains=5):
+    """Diagonal chains of arithmetic operators, each feeding the next.
+
+    An operator's outputs to the right and below are exactly the left and
+    upper operands of the next operator down the diagonal. The first chain
+    starts from A and B and ends in S.
+    """
+    board = Board()
+    ops = ('+', '/', '*', '-')
+    for chain in range(chains):
+        ox = chain * (depth + 4)
+        board.set_cell(ox, 1, 'A' if chain == 0 else chain + 1)
+        board.set_cell(ox + 1, 0, 'B' if chain == 0 else chain + 2)
+        for i in range(depth):
+            board.set_cell(ox + 1 + i, 1 + i, ops[i % len(ops)])
+        if chain == 0:
+            board.set_cell(ox + 1 + depth, depth, 'S')
+    return board
+
+
+def warp_loop():
+    """The ICFP time warp example, which warps back one tick forever."""
+    board = Board()
+    for (x, y), value in {(0, 0): 2, (1, 0): '>', (1, 1): 2, (2, 1): '@', (3, 1): 0, (2, 2): 1}.items():
+        board.set_cell(x, y, value)
+    return board
+
+
+def dense_board(size=100):
+    """A size x size board where every other row is a full > conveyor."""
+    board = Board()
+    for y in range(0, size, 2):
+        for x in range(size):
+            if x % 2:
+                board.set_cell(x, y, '>')
+            elif x < size // 2:
+                board.set_cell(x, y, (x + y) % 10)
+    return board
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    build: object  # () -> Board
+    input_a: int = 3
+    input_b: int = 4
+    max_ticks: int = 1000000
+    detect_cycles: bool = True
+
+
+CASES = [
+    BenchmarkCase('movement_chains', movement_chains),
+    BenchmarkCase('arithmetic_trees', arithmetic_trees),
+    BenchmarkCase('warp_loop', warp_loop, max_ticks=20000, detect_cycles=False),
+    BenchmarkCase('dense_100x100', dense_board),
+]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    engine: str
+    cells: int
+    ticks: int
+    steps: int
+    elapsed: float
+    ticks_per_sec: float
+    peak_history_bytes: int
+    operator_time_per_tick: float  # seconds spent collecting and applying operations
+    evaluations: int  # operator evaluation passes, Simulator.evaluations
+    evaluations_per_tick: float  # per step; 1.0 when every tick is evaluated once
+    time_to_submission: float  # seconds, or None if nothing was submitted
+    stop_reason: str
+    storage: str = 'dict'  # 'dict' or 'chunked' board cells
+
+
+def run_case(case, engine='scalar', sample_every=64, storage='dict'):
+    """Run one benchmark case and return a BenchmarkResult."""
+    board = case.build()
+    if storage == 'chunked':
+        chunked = Board(board.width, board.height, chunked=True)
+        chunked.grid.update(board.grid)
+        board = chunked
+    simulator = Simulator(board.copy(), case.input_a, case.input_b, engine=engine)
+    simulator.max_ticks = case.max_ticks
+    simulator.detect_cycles = case.detect_cycles
+
+    # Time the operator processor from the outside, leaving it untouched
+    processor = simulator.processor
+    operator_time = 0.0
+    collect, apply = processor.collect_operations, processor.apply_operations
+
+    def timed_collect(*args):
+        nonlocal operator_time
+        start = time.perf_counter()
+        collect(*args)
+        operator_time += time.perf_counter() - start
+
+    def timed_apply():
+        nonlocal operator_time
+        start = time.perf_counter()
+        try:
+            return apply()
+        finally:
+            operator_time += time.perf_counter() - start
+
+    processor.collect_operations = timed_collect
+    processor.apply_operations = timed_apply
+
+    elapsed = 0.0
+    peak_history = simulator.history.memory_size()
+    steps = 0
+    start = time.perf_counter()
+    simulator.start()
+    elapsed += time.perf_counter() - start
+    while simulator.running:
+        start = time.perf_counter()
+        stepped = simulator.step()
+        elapsed += time.perf_counter() - start
+        steps += 1
+        # Memory sampling walks the history, so it stays out of the timings
+        if steps % sample_every == 0 or not stepped:
+            peak_history = max(peak_history, simulator.history.memory_size())
+        if not stepped:
+            break
+
+    submitted = simulator.stop_reason == 'submitted'
+    return BenchmarkResult(
+        name=case.name,
+        engine=engine,
+        cells=len(board.grid),
+        ticks=simulator.tick,
+        steps=steps,
+        elapsed=elapsed,
+        ticks_per_sec=steps / elapsed if elapsed > 0 else 0.0,
+        peak_history_bytes=peak_history,
+        operator_time_per_tick=operator_time / steps if steps else 0.0,
+        evaluations=simulator.evaluations,
+        evaluations_per_tick=simulator.evaluations / steps if steps else 0.0,
+        time_to_submission=elapsed if submitted else None,
+        stop_reason=simulator.stop_reason,
+        storage=storage,
+    )
+
+
+def run_suite(cases=None, engines=None, repeat=3, storages=None):
+    """Run every case on every engine and storage, keeping the fastest of repeat runs."""
+    if cases is None:
+        cases = CASES
+    if engines is None:
+        engines = available_engines()
+    if storages is None:
+        storages = ['dict']
+    results = []
+    for case in cases:
+        for engine in engines:
+            for storage in storages:
+                runs = [run_case(case, engine, storage=storage) for _ in range(repeat)]
+                results.append(min(runs, key=lambda result: result.elapsed))
+    return results
+
+
+def available_engines():
+    """Engines that can run in this environment."""
+    return ['scalar', 'numpy'] if np is not None else ['scalar']
+
+
+def suite_report(results):
+    """Return the results with environment details as a JSON-serialisable dict."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__ if np is not None else None,
+        'results': [asdict(result) for result in results],
+    }
+
+
+def compare_reports(old, new):
+    """Return lines comparing ticks/sec of two reports, case by case."""
+    def key(result):
+        return result['name'], result['engine'], result.get('storage', 'dict')
+
+    before = {key(r): r for r in old['results']}
+    lines = []
+    for result in new['results']:
+        storage = result.get('storage', 'dict')
+        line = (f"{result['name']:<20} {result['engine']:<7} {storage:<7} "
+                f"{result['ticks_per_sec']:>12.1f} ticks/s")
+        previous = before.get(key(result))
+        if previous and previous['ticks_per_sec']:
+            ratio = result['ticks_per_sec'] / previous['ticks_per_sec']
+            line += f"  x{ratio:.2f} vs {previous['ticks_per_sec']:.1f}"
+        if 'evaluations_per_tick' in result:
+            line += f"  {result['evaluations_per_tick']:.2f} evaluations/tick"
+        lines.append(line)
+    return lines
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the 3D simulator.")
+    parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--engine', action='append', choices=('scalar', 'numpy'),
+                        help="engine to benchmark; repeatable (default: all available)")
+    parser.add_argument('--only', action='append', choices=[case.name for case in CASES],
+                        help="benchmark to run; repeatable (default: all)")
+    parser.add_argument('--storage', action='append', choices=('dict', 'chunked'),
+                        help="board cell storage; repeatable (default: dict)")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per benchmark, fastest kept")
+    parser.add_argument('--compare', help="previous JSON report to compare ticks/sec against")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in CASES if not args.only or case.name in args.only]
+    report = suite_report(run_suite(cases, args.engine, args.repeat, args.storage))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        print('\n'.join(compare_reports(previous, report)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
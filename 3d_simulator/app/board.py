@@ -2,19 +2,122 @@
 Board class for managing the 2D grid of the 3D language simulator.
 """
 
+from .chunked import ChunkedGrid
+
+# Tokens whose positions the board index keeps
+INDEXED_TOKENS = ('S', 'A', 'B', '@')
+
+
+class BoardIndex:
+    """Occupancy counts per row and column, and positions of INDEXED_TOKENS."""
+    
+    def __init__(self, grid=()):
+        self.columns = {}  # {x: occupied cells}
+        self.rows = {}  # {y: occupied cells}
+        self.tokens = {token: set() for token in INDEXED_TOKENS}
+        self._bounds = None  # (min_x, max_x, min_y, max_y), None to recompute
+        for (x, y), value in grid.items():
+            self.add(x, y, value)
+    
+    def add(self, x, y, value):
+        columns = self.columns
+        rows = self.rows
+        columns[x] = columns.get(x, 0) + 1
+        rows[y] = rows.get(y, 0) + 1
+        if value in self.tokens:
+            self.tokens[value].add((x, y))
+        bounds = self._bounds
+        if bounds is not None and not (bounds[0] <= x <= bounds[1] and bounds[2] <= y <= bounds[3]):
+            self._bounds = (min(bounds[0], x), max(bounds[1], x), min(bounds[2], y), max(bounds[3], y))
+    
+    def remove(self, x, y, value):
+        columns = self.columns
+        rows = self.rows
+        if columns[x] == 1:
+            del columns[x]
+            self._bounds = None
+        else:
+            columns[x] -= 1
+        if rows[y] == 1:
+            del rows[y]
+            self._bounds = None
+        else:
+            rows[y] -= 1
+        if value in self.tokens:
+            self.tokens[value].discard((x, y))
+    
+    def bounds(self):
+        """Bounds of the occupied cells, or None for an empty board."""
+        if self._bounds is None and self.columns:
+            # Only after an outermost row or column emptied
+            self._bounds = (min(self.columns), max(self.columns), min(self.rows), max(self.rows))
+        return self._bounds
+
+
 class Board:
-    def __init__(self, width=20, height=15):
+    def __init__(self, width=20, height=15, chunked=False):
         self.width = width
         self.height = height
-        self.grid = {}  # {(x, y): value}
+        # {(x, y): value}, or a ChunkedGrid with the same interface. Code
+        # that writes to it directly rather than through set_cell() or
+        # set_cells() must call reindex() afterwards
+        self.grid = ChunkedGrid() if chunked else {}
+        self._index = None  # BoardIndex, built on first use
+    
+    @property
+    def chunked(self):
+        """Whether the cells are stored in tiles, see ChunkedGrid."""
+        return isinstance(self.grid, ChunkedGrid)
         
     def set_cell(self, x, y, value):
         """Set a cell value. None or '.' represents empty cell."""
+        grid = self.grid
+        index = self._index
+        if index is None:
+            if value is None or value == '.':
+                if (x, y) in grid:
+                    del grid[(x, y)]
+            else:
+                grid[(x, y)] = value
+            return
+        
+        old = grid.get((x, y))
         if value is None or value == '.':
-            if (x, y) in self.grid:
-                del self.grid[(x, y)]
+            if old is not None:
+                del grid[(x, y)]
+                index.remove(x, y, old)
         else:
-            self.grid[(x, y)] = value
+            grid[(x, y)] = value
+            if old is None:
+                index.add(x, y, value)
+            elif old != value and (old in index.tokens or value in index.tokens):
+                index.remove(x, y, old)
+                index.add(x, y, value)
+    
+    def set_cells(self, cells):
+        """Set many cells from (x, y, value) tuples; values must not be empty."""
+        grid = self.grid
+        if self._index is None:
+            for x, y, value in cells:
+                grid[(x, y)] = value
+        else:
+            for x, y, value in cells:
+                self.set_cell(x, y, value)
+    
+    def reindex(self):
+        """Rebuild the index after the grid was changed directly."""
+        self._index = None
+    
+    @property
+    def index(self):
+        """The BoardIndex of the current cells."""
+        if self._index is None:
+            self._index = BoardIndex(self.grid)
+        return self._index
+    
+    def positions(self, token):
+        """Positions of an indexed token ('S', 'A', 'B' or '@'), as a new list."""
+        return list(self.index.tokens[token])
     
     def get_cell(self, x, y):
         """Get cell value. Returns None for empty cells."""
@@ -28,25 +131,33 @@ class Board:
         """Get all non-empty cells as list of (x, y, value) tuples."""
         return [(x, y, value) for (x, y), value in self.grid.items()]
     
+    def cells_in(self, min_x, max_x, min_y, max_y):
+        """Get the non-empty cells inside a rectangle as (x, y, value) tuples."""
+        grid = self.grid
+        if isinstance(grid, ChunkedGrid):
+            return list(grid.cells_in(min_x, max_x, min_y, max_y))
+        # Scan whichever is smaller, the cells or the rectangle
+        if len(grid) <= (max_x - min_x + 1) * (max_y - min_y + 1):
+            return [(x, y, value) for (x, y), value in grid.items()
+                    if min_x <= x <= max_x and min_y <= y <= max_y]
+        return [(x, y, grid[(x, y)]) for y in range(min_y, max_y + 1)
+                for x in range(min_x, max_x + 1) if (x, y) in grid]
+    
     def clear(self):
         """Clear all cells."""
         self.grid.clear()
+        self._index = None
     
     def copy(self):
         """Create a deep copy of the board."""
         new_board = Board(self.width, self.height)
-        new_board.grid = self.grid.copy()
+        new_board.grid = self.grid.copy()  # copy-on-write for a ChunkedGrid
         return new_board
     
     def get_bounds(self):
         """Get the actual bounds of non-empty cells."""
-        if not self.grid:
-            return 0, 0, 0, 0
-        
-        xs = [x for x, y in self.grid.keys()]
-        ys = [y for x, y in self.grid.keys()]
-        
-        return min(xs), max(xs), min(ys), max(ys)
+        # Kept by the index as cells are set and cleared
+        return self.index.bounds() or (0, 0, 0, 0)
     
     def is_valid_token(self, token):
         """Check if token is valid for 3D language."""
@@ -0,0 +1,162 @@
+"""
+Chunked cell storage for the 3D language simulator.
+
+ChunkedGrid is a drop-in replacement for the {(x, y): value} dict behind
+Board.grid. Cells live in 16x16 tiles, each a flat list of slots with None
+for an empty cell, found through a directory keyed by tile coordinates.
+Coordinates are unbounded and may be negative.
+
+Copies share their tiles and copy a tile only when one side first writes
+to it. Board.copy() is therefore proportional to the number of tiles, not
+cells, and a dense board needs a slot per cell instead of a dict entry and
+a key tuple. Iterating a rectangle visits only the tiles it overlaps.
+
+It is opt-in (Board(chunked=True), headless --chunked, benchmark --storage
+chunked) because it is not faster overall. On CPython a dict lookup on a
+tuple key beats any Python-level mapping, so stepping and cell lookups are
+1.5-3x slower than on a dict board, and even a dense 100x100 board runs
+only about 5% faster for its cheaper copies. Keep the dict the default
+until app.benchmark shows otherwise.
+"""
+
+from collections.abc import ItemsView, MutableMapping
+
+TILE_SHIFT = 4
+TILE_SIZE = 1 << TILE_SHIFT
+TILE_MASK = TILE_SIZE - 1
+TILE_AREA = TILE_SIZE * TILE_SIZE
+
+
+class _Tile:
+    __slots__ = ('cells', 'count')
+
+    def __init__(self, cells=None, count=0):
+        self.cells = [None] * TILE_AREA if cells is None else cells
+        self.count = count  # occupied slots
+
+    def copy(self):
+        return _Tile(self.cells[:], self.count)
+
+
+class _ItemsView(ItemsView):
+    def __iter__(self):
+        return self._mapping._iter_items()
+
+
+class ChunkedGrid(MutableMapping):
+    def __init__(self, cells=()):
+        self._tiles = {}  # {(tile x, tile y): _Tile}
+        self._owned = set()  # tiles this grid may write without copying first
+        self._len = 0
+        if cells:
+            self.update(cells)
+
+    def __len__(self):
+        return self._len
+
+    def get(self, pos, default=None):
+        x, y = pos
+        tile = self._tiles.get((x >> TILE_SHIFT, y >> TILE_SHIFT))
+        if tile is None:
+            return default
+        value = tile.cells[((y & TILE_MASK) << TILE_SHIFT) | (x & TILE_MASK)]
+        return default if value is None else value
+
+    def __getitem__(self, pos):
+        value = self.get(pos)
+        if value is None:
+            raise KeyError(pos)
+        return value
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+    def __setitem__(self, pos, value):
+        if value is None:
+            raise ValueError("ChunkedGrid cannot store None; delete the cell instead")
+        x, y = pos
+        tile = self._writable((x >> TILE_SHIFT, y >> TILE_SHIFT))
+        index = ((y & TILE_MASK) << TILE_SHIFT) | (x & TILE_MASK)
+        if tile.cells[index] is None:
+            tile.count += 1
+            self._len += 1
+        tile.cells[index] = value
+
+    def __delitem__(self, pos):
+        x, y = pos
+        key = (x >> TILE_SHIFT, y >> TILE_SHIFT)
+        index = ((y & TILE_MASK) << TILE_SHIFT) | (x & TILE_MASK)
+        tile = self._tiles.get(key)
+        if tile is None or tile.cells[index] is None:
+            raise KeyError(pos)
+        tile = self._writable(key)
+        tile.cells[index] = None
+        tile.count -= 1
+        self._len -= 1
+        if not tile.count:
+            del self._tiles[key]
+            self._owned.discard(key)
+
+    def _writable(self, key):
+        """The tile at key, created or copied so that this grid owns it."""
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self._tiles[key] = _Tile()
+            self._owned.add(key)
+        elif key not in self._owned:
+            tile = self._tiles[key] = tile.copy()
+            self._owned.add(key)
+        return tile
+
+    def __iter__(self):
+        for pos, value in self._iter_items():
+            yield pos
+
+    def items(self):
+        return _ItemsView(self)
+
+    def _iter_items(self):
+        for (tile_x, tile_y), tile in list(self._tiles.items()):
+            base_x = tile_x << TILE_SHIFT
+            base_y = tile_y << TILE_SHIFT
+            for index, value in enumerate(tile.cells):
+                if value is not None:
+                    yield (base_x + (index & TILE_MASK), base_y + (index >> TILE_SHIFT)), value
+
+    def cells_in(self, min_x, max_x, min_y, max_y):
+        """Yield (x, y, value) for the occupied cells inside a rectangle."""
+        tile_min_x, tile_max_x = min_x >> TILE_SHIFT, max_x >> TILE_SHIFT
+        tile_min_y, tile_max_y = min_y >> TILE_SHIFT, max_y >> TILE_SHIFT
+        area = (tile_max_x - tile_min_x + 1) * (tile_max_y - tile_min_y + 1)
+        if area < len(self._tiles):
+            keys = [(tx, ty) for tx in range(tile_min_x, tile_max_x + 1)
+                    for ty in range(tile_min_y, tile_max_y + 1) if (tx, ty) in self._tiles]
+        else:
+            keys = [(tx, ty) for tx, ty in self._tiles
+                    if tile_min_x <= tx <= tile_max_x and tile_min_y <= ty <= tile_max_y]
+        for tile_x, tile_y in keys:
+            cells = self._tiles[(tile_x, tile_y)].cells
+            base_x = tile_x << TILE_SHIFT
+            base_y = tile_y << TILE_SHIFT
+            for index, value in enumerate(cells):
+                if value is not None:
+                    x = base_x + (index & TILE_MASK)
+                    y = base_y + (index >> TILE_SHIFT)
+                    if min_x <= x <= max_x and min_y <= y <= max_y:
+                        yield x, y, value
+
+    def copy(self):
+        """Return a copy sharing every tile until one side writes to it."""
+        new = ChunkedGrid()
+        new._tiles = dict(self._tiles)
+        new._len = self._len
+        self._owned.clear()
+        return new
+
+    def clear(self):
+        self._tiles.clear()
+        self._owned.clear()
+        self._len = 0
+
+    def __repr__(self):
+        return f"ChunkedGrid({dict(self._iter_items())!r})"
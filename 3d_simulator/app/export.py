@@ -0,0 +1,305 @@
+"""
+Offscreen export of simulator runs as PNG sequences or animated GIFs.
+
+A run is simulated twice: once to find the bounds of every board it
+shows, then again tick by tick, drawing each board onto an 8-bit offscreen
+surface as it is applied; no window is opened. Frames follow the ticks in
+the order they were applied, so ticks that a time warp later undoes are
+exported too. Each frame is written out before the next is drawn, so
+memory stays at one frame whatever the length of the run. After the first
+frame only the cells a tick changed are redrawn, and a GIF frame holds
+just the rectangle around them.
+
+    python -m app.export program.3d -a 3 -b 4 --gif run.gif
+    python -m app.export program.3d --png-dir frames --every 10 --changed-only
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+import pygame
+
+from .program_io import load_any
+from .simulator import Simulator
+from .ui import COLORS, LOD_CELL_SIZE, cell_color
+
+# Every colour a frame may contain, as an 8-bit palette
+PALETTE = list(dict.fromkeys(COLORS.values()))
+
+
+class FrameRenderer:
+    def __init__(self, bounds, cell_size=16, margin=1):
+        min_x, max_x, min_y, max_y = bounds
+        self.cell_size = cell_size
+        self.origin_x = min_x - margin
+        self.origin_y = min_y - margin
+        columns = max_x - min_x + 1 + 2 * margin
+        rows = max_y - min_y + 1 + 2 * margin
+        self.size = (columns * cell_size + 1, rows * cell_size + 1)
+
+        self.surface = pygame.Surface(self.size, depth=8)
+        self.surface.set_palette(PALETTE)
+        self.lod = cell_size < LOD_CELL_SIZE
+        if not self.lod:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, max(10, cell_size * 3 // 5))
+        self._text = {}  # {text: surface}, drawn without antialiasing to stay in the palette
+
+    def draw(self, grid):
+        """Draw a whole board."""
+        self.surface.fill(COLORS['cell_empty'])
+        if not self.lod:
+            width, height = self.size
+            for x in range(0, width, self.cell_size):
+                pygame.draw.line(self.surface, COLORS['grid_line'], (x, 0), (x, height - 1))
+            for y in range(0, height, self.cell_size):
+                pygame.draw.line(self.surface, COLORS['grid_line'], (0, y), (width - 1, y))
+        for x, y in grid:
+            self._draw_cell(grid, x, y)
+        return self.surface.get_rect()
+
+    def draw_cells(self, grid, positions):
+        """Redraw the given cells; returns the rect around them, or None."""
+        rects = [self._draw_cell(grid, x, y) for x, y in positions]
+        return rects[0].unionall(rects[1:]) if rects else None
+
+    def _draw_cell(self, grid, x, y):
+        size = self.cell_size
+        screen_x = (x - self.origin_x) * size
+        screen_y = (y - self.origin_y) * size
+        if self.lod:
+            cell_rect = pygame.Rect(screen_x, screen_y, size, size)
+        else:
+            cell_rect = pygame.Rect(screen_x + 1, screen_y + 1, size - 2, size - 2)
+        value = grid.get((x, y))
+        self.surface.fill(cell_color(value), cell_rect)
+
+        if value is not None and not self.lod:
+            text = str(value)
+            text_surface = self._text.get(text)
+            if text_surface is None:
+                text_surface = self._text[text] = self.font.render(text, False, COLORS['text'])
+            self.surface.set_clip(cell_rect)
+            self.surface.blit(text_surface, text_surface.get_rect(center=cell_rect.center))
+            self.surface.set_clip(None)
+        return cell_rect
+
+
+class PngSequenceWriter:
+    def __init__(self, directory, pattern='frame_{:06d}.png'):
+        self.directory = directory
+        self.pattern = pattern
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, surface, frame, rect=None):
+        """Save the whole surface as the given frame number."""
+        pygame.image.save(surface, os.path.join(self.directory, self.pattern.format(frame)))
+
+    def close(self):
+        pass
+
+
+class GifWriter:
+    def __init__(self, path, size, palette=PALETTE, delay=10, loop=True):
+        self.size = size
+        self.delay = delay  # hundredths of a second per frame
+        self._file = open(path, 'wb')
+        width, height = size
+
+        # Header and logical screen with a 256-entry global palette
+        self._file.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF7, 0, 0))
+        colours = bytearray(3 * 256)
+        for i, (r, g, b) in enumerate(palette):
+            colours[3 * i:3 * i + 3] = bytes((r, g, b))
+        self._file.write(colours)
+        if loop:
+            self._file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+    def write(self, surface, frame, rect=None):
+        """Append a frame holding the given rect of an 8-bit surface (default: all of it).
+
+        Pixels outside the rect keep the previous frame's.
+        """
+        if rect is None:
+            rect = surface.get_rect()
+        pixels = pygame.image.tobytes(surface.subsurface(rect), 'P')
+
+        # Graphic control extension: keep the frame in place, then wait
+        self._file.write(struct.pack('<BBBBHBB', 0x21, 0xF9, 4, 0x04, self.delay, 0, 0))
+        self._file.write(struct.pack('<BHHHHB', 0x2C, rect.x, rect.y, rect.width, rect.height, 0))
+        self._file.write(b'\x08')
+        data = _lzw_encode(pixels, 8)
+        for start in range(0, len(data), 255):
+            block = data[start:start + 255]
+            self._file.write(bytes((len(block),)) + block)
+        self._file.write(b'\x00')
+
+    def close(self):
+        """Finish the file."""
+        if not self._file.closed:
+            self._file.write(b'\x3B')
+            self._file.close()
+
+
+def _lzw_encode(data, min_code_size):
+    """GIF-flavoured variable-length LZW compression of a byte string."""
+    clear = 1 << min_code_size
+    end = clear + 1
+    out = bytearray()
+    bits = 0
+    bit_count = 0
+    code_size = min_code_size + 1
+
+    def emit(code):
+        nonlocal bits, bit_count
+        bits |= code << bit_count
+        bit_count += code_size
+        while bit_count >= 8:
+            out.append(bits & 0xFF)
+            bits >>= 8
+            bit_count -= 8
+
+    table = {}  # {prefix code << 8 | byte: code}
+    next_code = end + 1
+    emit(clear)
+    if not data:
+        emit(end)
+        return bytes(out + (bytes((bits,)) if bit_count else b''))
+
+    prefix = data[0]
+    for byte in data[1:]:
+        key = (prefix << 8) | byte
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix)
+        if next_code < 4096:
+            table[key] = next_code
+            next_code += 1
+            if next_code > (1 << code_size) and code_size < 12:
+                code_size += 1
+        else:
+            # The table is full: start over
+            emit(clear)
+            table.clear()
+            next_code = end + 1
+            code_size = min_code_size + 1
+        prefix = byte
+    emit(prefix)
+    emit(end)
+    if bit_count:
+        out.append(bits & 0xFF)
+    return bytes(out)
+
+
+def run_bounds(simulator):
+    """Run a started simulator to the end; returns the bounds of every board it applied, or None."""
+    bounds = simulator.board.index.bounds()
+    while True:
+        stepped = simulator.step()
+        board_bounds = simulator.board.index.bounds()
+        if board_bounds is not None:
+            if bounds is None:
+                bounds = board_bounds
+            else:
+                bounds = (min(bounds[0], board_bounds[0]), max(bounds[1], board_bounds[1]),
+                          min(bounds[2], board_bounds[2]), max(bounds[3], board_bounds[3]))
+        if not stepped:
+            return bounds
+
+
+def export_run(simulator, writer, renderer, every=1, changed_only=False):
+    """Run a started simulator to the end, writing frames; returns the number written.
+
+    Frame 1 is the first board and frame n + 1 the board after the n-th
+    tick applied, time warps included, so a tick a warp later undid still
+    has its frame. every > 1 keeps only every n-th frame plus the last one,
+    and changed_only drops frames whose board is the same as the previous
+    frame's. The renderer's bounds must hold every board (see run_bounds).
+    """
+    simulator.take_dirty()
+    grid = simulator.board.grid
+    renderer.draw(grid)
+    writer.write(renderer.surface, 1)
+    written = 1
+    frame = last = 1  # the current frame and the last one written
+    shown = dict(grid)  # the board as of the last frame written
+    changed = set()  # cells that may differ from it
+    while True:
+        applied = simulator.ticks_applied
+        stepped = simulator.step()
+        if simulator.ticks_applied != applied:
+            frame += 1
+            changed.update(simulator.take_dirty())
+
+        if frame != last and (not stepped or (frame - 1) % every == 0):
+            changed = {pos for pos in changed if shown.get(pos) != grid.get(pos)}
+            if changed or not changed_only:
+                for pos in changed:
+                    value = grid.get(pos)
+                    if value is None:
+                        del shown[pos]
+                    else:
+                        shown[pos] = value
+                # A frame needs at least a pixel, even when nothing changed
+                rect = renderer.draw_cells(grid, changed) or pygame.Rect(0, 0, 1, 1)
+                changed.clear()
+                writer.write(renderer.surface, frame, rect)
+                written += 1
+                last = frame
+        if not stepped:
+            return written
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Export a 3D program run as frames.")
+    parser.add_argument('program', help="path to a program in grid text format or a program pack")
+    parser.add_argument('--name', help="program to run from a pack (default: the first)")
+    parser.add_argument('-a', type=int, default=0, help="value for input A")
+    parser.add_argument('-b', type=int, default=0, help="value for input B")
+    parser.add_argument('--max-ticks', type=int, default=None)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--gif', help="write an animated GIF to this file")
+    output.add_argument('--png-dir', help="write one PNG per frame into this directory")
+    parser.add_argument('--every', type=int, default=1,
+                        help="keep every n-th frame; frames follow the ticks as applied, warps included")
+    parser.add_argument('--changed-only', action='store_true', help="skip frames that changed nothing")
+    parser.add_argument('--cell-size', type=int, default=16, help="pixels per cell")
+    parser.add_argument('--delay', type=int, default=10, help="GIF frame delay in 1/100 s")
+    args = parser.parse_args(argv)
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+
+    # Surfaces and fonts only; make sure no window can open
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    program = load_any(args.program, args.name)
+
+    def started():
+        simulator = Simulator(program.copy(), args.a, args.b)
+        if args.max_ticks is not None:
+            simulator.max_ticks = args.max_ticks
+        simulator.start()
+        return simulator
+
+    renderer = FrameRenderer(run_bounds(started()) or (0, 0, 0, 0), args.cell_size)
+    if args.gif:
+        writer = GifWriter(args.gif, renderer.size, delay=args.delay)
+    else:
+        writer = PngSequenceWriter(args.png_dir)
+    simulator = started()
+    try:
+        frames = export_run(simulator, writer, renderer, args.every, args.changed_only)
+    finally:
+        writer.close()
+
+    print(f"{frames} frames of {simulator.ticks_applied} ticks applied, stopped: {simulator.stop_reason}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
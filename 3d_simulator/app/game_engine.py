@@ -5,41 +5,98 @@ Game engine for the 3D language simulator.
 import pygame
 from .board import Board
 from .simulator import Simulator
+from .program_io import load_any, save_program
+from .result_cache import ResultCache, program_key
 from .ui import UI
+from .worker import SimulationWorker
+from .tracing import tracer, ERROR, INFO, DEBUG
 
 class GameEngine:
-    def __init__(self):
+    def __init__(self, program_path=None):
         self.board = Board()
+        self.program_path = program_path  # file loaded on start and reset, and saved by Ctrl+S
         self.ui = UI()
         self.running = True
-        self.auto_run = False
-        self.auto_run_delay = 500  # milliseconds
-        self.last_auto_step = 0
         
-        # Load a simple example first
-        self._load_example()
+        # Auto run steps on a worker thread, at one of these ticks per frame
+        # (None is as fast as possible); the slowest is 2 ticks a second
+        self.speeds = (1 / 30, 1 / 8, 1 / 2, 1, 4, 16, 64, 256, None)
+        self.speed = 0
+        self.worker = SimulationWorker(self._auto_step)
+        self.worker.ticks_per_frame = self.speeds[self.speed]
+        
+        # Known outcome of the current program and inputs, shown while stepping
+        self.cache = ResultCache.default()
+        self.cached_result = None
+        self._cache_key = None  # key of the run in progress, until it is stored
+        
+        # Debugging, kept across resets and reloads
+        self.breakpoints = set()  # ticks
+        self.watches = set()  # (x, y)
+        
+        # Load the program file, or a simple example
+        self._load_program()
         
         # Then initialize simulator with the loaded board
-        self.simulator = Simulator(self.board, 42, 7)
+        self.simulator = self._new_simulator()
+        self.ui.show_board(self.board)
+    
+    def _load_program(self):
+        """Load the program file if there is one, otherwise the example."""
+        if self.program_path is None:
+            self._load_example()
+            return
+        load_any(self.program_path, board=self.board)
+        tracer.emit('ui', INFO, "program loaded", path=self.program_path, cells=len(self.board.grid))
+    
+    def _new_simulator(self):
+        """Create a simulator for the board, with the breakpoints and watches set."""
+        simulator = Simulator(self.board, 42, 7)
+        for tick in self.breakpoints:
+            simulator.set_breakpoint(tick)
+        for x, y in self.watches:
+            simulator.set_watch(x, y)
+        return simulator
+    
+    def toggle_breakpoint(self, tick):
+        """Add a breakpoint at a tick, or remove the one there."""
+        enabled = tick not in self.breakpoints
+        if enabled:
+            self.breakpoints.add(tick)
+        else:
+            self.breakpoints.discard(tick)
+        self.simulator.set_breakpoint(tick, enabled)
+        tracer.emit('ui', INFO, "breakpoint", tick=tick, enabled=enabled)
+    
+    def toggle_watch(self, x, y):
+        """Add a watch on a cell, or remove the one there."""
+        enabled = (x, y) not in self.watches
+        if enabled:
+            self.watches.add((x, y))
+        else:
+            self.watches.discard((x, y))
+        self.simulator.set_watch(x, y, enabled)
+        tracer.emit('ui', INFO, "watch", x=x, y=y, enabled=enabled)
+    
+    def save_program(self, path=None):
+        """Save the current program, with A and B still as tokens."""
+        path = path or self.program_path or 'program.3d'
+        save_program(self.simulator.initial_board, path)
+        self.program_path = path
+        tracer.emit('ui', INFO, "program saved", path=path, cells=len(self.simulator.initial_board.grid))
     
     def _load_example(self):
         """Load a simple example program: Simple movement without time warp"""
-        print("Loading example program...")  # Debug log
-        
         # Simple example: A moves right to S
         self.board.set_cell(0, 5, 'A')  # Input A (will become 42)
         self.board.set_cell(1, 5, '>')  # Move right
         self.board.set_cell(2, 5, '>')  # Move right
         self.board.set_cell(3, 5, 'S')  # Output
         
-        print("Example program loaded:")  # Debug log
-        for x, y, value in self.board.get_all_cells():
-            print(f"  ({x}, {y}): {value}")
+        tracer.emit('ui', INFO, "example program loaded", cells=len(self.board.grid))
     
     def _load_time_warp_example(self):
         """Load a time warp example program"""
-        print("Loading time warp example program...")  # Debug log
-        
         # ICFP 2024 time warp example:
         # 2 > . .
         # . 2 @ 0  
@@ -53,92 +110,140 @@ class GameEngine:
         self.board.set_cell(2, 6, 1)   # dt (will be consumed)
         # Note: v will be the value that moves to (2,4) in step 1
         
-        print("Time warp example program loaded:")  # Debug log
-        for x, y, value in self.board.get_all_cells():
-            print(f"  ({x}, {y}): {value}")
+        tracer.emit('ui', INFO, "time warp example program loaded", cells=len(self.board.grid))
     
     def load_time_warp_test(self):
         """Public method to load time warp test"""
+        self.worker.pause()
         self.board.clear()
         self._load_time_warp_example()
-        self.simulator = Simulator(self.board, 42, 7)
+        self.simulator = self._new_simulator()
+        self.ui.show_board(self.board)
+        self.cached_result = None
     
     def run(self):
         """Main game loop."""
         while self.running:
-            current_time = pygame.time.get_ticks()
-            
-            # Handle events
-            events = self.ui.handle_events(self)
-            for event in events:
-                self._handle_event(event)
-            
-            # Auto-run logic
-            if (self.auto_run and self.simulator.running and 
-                current_time - self.last_auto_step > self.auto_run_delay):
-                self.simulator.step()
-                self.last_auto_step = current_time
+            # The worker steps only while the lock is free, so events and
+            # drawing see the board between ticks
+            with self.worker.lock:
+                # Handle events
+                events = self.ui.handle_events(self)
+                for event in events:
+                    self._handle_event(event)
+                
+                self._store_result()
+                
+                # Render
+                self.ui.draw(self)
             
-            # Render
-            self.ui.render(self)
+            self.ui.clock.tick(60)
         
+        self.worker.close()
         pygame.quit()
     
+    def _auto_step(self):
+        """Step on the worker thread; returns False once the run has stopped."""
+        return self.simulator.step()
+    
+    def set_speed(self, speed):
+        """Select an entry of self.speeds for auto run."""
+        self.speed = max(0, min(len(self.speeds) - 1, speed))
+        self.worker.ticks_per_frame = self.speeds[self.speed]
+    
+    def speed_label(self):
+        """Describe the auto run speed for display."""
+        ticks = self.speeds[self.speed]
+        if ticks is None:
+            return "max"
+        if ticks < 1:
+            return f"{ticks * 60:g}/s"
+        return f"{ticks:g}/frame"
+    
     def _handle_event(self, event):
         """Handle game events."""
-        print(f"Handling event: {event}")  # Debug log
+        tracer.emit('ui', DEBUG, "event", event=event)
         
         if event[0] == 'quit':
             self.running = False
         
+        elif event[0] == 'speed':
+            self.set_speed(self.speed + event[1])
+        
+        elif event[0] == 'turbo':
+            self.set_speed(len(self.speeds) - 1 if self.speeds[self.speed] is not None else 0)
+        
+        elif event[0] == 'breakpoint':
+            self.toggle_breakpoint(event[1])
+        
+        elif event[0] == 'watch':
+            self.toggle_watch(event[1], event[2])
+        
+        elif event[0] == 'save':
+            try:
+                self.save_program()
+            except OSError as e:
+                tracer.emit('ui', ERROR, "save failed", error=str(e))
+        
         elif event[0] == 'button':
             button_name = event[1]
-            print(f"Button pressed: {button_name}")  # Debug log
             
             if button_name == 'step':
-                print(f"Step button - simulator running: {self.simulator.running}")  # Debug log
-                print(f"Current tick: {self.simulator.tick}")  # Debug log
-                print(f"Board cells: {len(self.board.get_all_cells())}")  # Debug log
-                
                 if not self.simulator.running:
-                    self.simulator.start()
-                    print("Simulator started")  # Debug log
+                    self._start_simulation()
+                    tracer.emit('ui', INFO, "simulation started")
                 
+                self.worker.pause()
                 result = self.simulator.step()
-                print(f"Step result: {result}")  # Debug log
-                print(f"New tick: {self.simulator.tick}")  # Debug log
-                self.auto_run = False
+                tracer.emit('ui', INFO, "step", result=result, tick=self.simulator.tick)
+                self._store_result()
             
             elif button_name == 'reset':
-                print("Reset button pressed")  # Debug log
-                print(f"Before reset - board has {len(self.board.get_all_cells())} cells")  # Debug log
-                
-                # Reload the example program
+                # Reload the program
+                self.worker.pause()
                 self.board.clear()
-                self._load_example()
+                self._load_program()
                 
                 # Reinitialize simulator with fresh board
-                self.simulator = Simulator(self.board, 42, 7)
-                self.auto_run = False
+                self.simulator = self._new_simulator()
+                self.ui.show_board(self.board)
+                self.cached_result = None
                 
-                print(f"After reset - board has {len(self.board.get_all_cells())} cells")  # Debug log
+                tracer.emit('ui', INFO, "reset", cells=len(self.board.grid))
             
             elif button_name == 'start':
-                if self.simulator.running:
+                if self.worker.running:
+                    self.worker.pause()
                     self.simulator.stop()
-                    self.auto_run = False
-                    print("Simulation stopped")  # Debug log
+                    tracer.emit('ui', INFO, "simulation stopped")
                 else:
-                    self.simulator.start()
-                    self.auto_run = True
-                    self.last_auto_step = pygame.time.get_ticks()
-                    print("Simulation started")  # Debug log
+                    self._start_simulation()
+                    self.worker.resume()
+                    tracer.emit('ui', INFO, "auto run started", speed=self.speed_label())
+    
+    def _start_simulation(self):
+        """Look up the program in the result cache, then start the simulator."""
+        if self.simulator.tick == 1:
+            simulator = self.simulator
+            self._cache_key = program_key(simulator.initial_board, simulator.input_a, simulator.input_b)
+            self.cached_result = self.cache.get(self._cache_key, simulator.max_ticks)
+            if self.cached_result is not None:
+                tracer.emit('ui', INFO, "cached result", **self.cached_result)
+        self.simulator.start()
+    
+    def _store_result(self):
+        """Store the outcome once the simulator has finished."""
+        if self._cache_key is not None and self.simulator.stop_reason is not None:
+            if self.cached_result is None:
+                self.cache.store_simulator(self._cache_key, self.simulator)
+            self._cache_key = None
     
     def set_input_a(self, value):
         """Set input A value."""
         try:
             val = int(value)
             self.simulator.set_inputs(val, self.simulator.input_b)
+            self.cached_result = None
         except ValueError:
             pass
     
@@ -147,5 +252,6 @@ class GameEngine:
         try:
             val = int(value)
             self.simulator.set_inputs(self.simulator.input_a, val)
+            self.cached_result = None
         except ValueError:
             pass
@@ -0,0 +1,159 @@
+"""
+Headless runner for the 3D language simulator.
+
+Runs a program to completion without pygame, stepping the simulator as fast
+as possible. Usable from the command line or as a Python API:
+
+    python -m app.headless program.3d -a 3 -b 4
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+
+from .board import Board
+from .program_io import load_any
+from .result_cache import ResultCache, program_key
+from .simulator import ENGINES, Simulator
+from .stats import FORMATS, open_stats
+from .tracing import tracer
+
+
+@dataclass
+class RunResult:
+    """Outcome of a single headless run."""
+    submitted_value: object
+    tick: int
+    peak_tick: int  # highest tick reached, above tick after a time warp
+    steps: int
+    evaluations: int
+    volume: int
+    elapsed: float
+    stop_reason: str
+    error: str = None
+    cycle_period: int = None
+    cached: bool = False
+
+    @property
+    def ticks_per_sec(self):
+        """Executed steps per wall-clock second."""
+        if self.elapsed <= 0:
+            return float('inf') if self.steps else 0.0
+        return self.steps / self.elapsed
+
+    def as_dict(self):
+        """Return the result as a JSON-serialisable dict."""
+        result = asdict(self)
+        result['ticks_per_sec'] = self.ticks_per_sec
+        return result
+
+
+def run_program(board, input_a=0, input_b=0, max_ticks=None, engine='scalar', cache=None, stats=None,
+                skip_dead=False):
+    """Run a program to completion and return a RunResult.
+
+    The board is copied, so the caller's program is left untouched. With a
+    ResultCache, a stored result is returned without simulating and new
+    results are stored. A StatsRecorder given as stats records every tick;
+    such a run is always simulated, though its result is still stored.
+    skip_dead leaves out operators that static analysis shows can never fire.
+    """
+    if cache is not None:
+        key = program_key(board, input_a, input_b)
+        stored = cache.get(key, max_ticks) if stats is None else None
+        if stored is not None:
+            return RunResult(steps=0, evaluations=0, elapsed=0.0, cached=True, **stored)
+
+    simulator = Simulator(board.copy(), input_a, input_b, engine=engine)
+    simulator.stats = stats
+    if skip_dead:
+        simulator.skip_dead_operators()
+    if max_ticks is not None:
+        simulator.max_ticks = max_ticks
+
+    start = time.perf_counter()
+    simulator.start()
+    while simulator.running:
+        if not simulator.step():
+            break
+    elapsed = time.perf_counter() - start
+    # Only steps that applied a tick count; the one that finds max_ticks
+    # reached or fails to apply does not
+    steps = simulator.ticks_applied
+    if cache is not None:
+        cache.store_simulator(key, simulator)
+
+    return RunResult(
+        submitted_value=simulator.submitted_value,
+        tick=simulator.tick,
+        peak_tick=simulator.peak_tick,
+        steps=steps,
+        evaluations=simulator.evaluations,
+        volume=simulator.get_spacetime_volume(),
+        elapsed=elapsed,
+        stop_reason=simulator.stop_reason,
+        error=simulator.error,
+        cycle_period=simulator.cycle_period,
+    )
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run a 3D program without a window.")
+    parser.add_argument('program', help="path to a program in grid text format or a program pack")
+    parser.add_argument('--name', help="program to run from a pack (default: the first)")
+    parser.add_argument('-a', type=int, default=0, help="value for input A")
+    parser.add_argument('-b', type=int, default=0, help="value for input B")
+    parser.add_argument('--max-ticks', type=int, default=None)
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='scalar',
+                        help="operator engine; 'numpy' suits large boards")
+    parser.add_argument('--chunked', action='store_true', help="store the board in tiles (see app.chunked)")
+    parser.add_argument('--skip-dead', action='store_true',
+                        help="leave out operators that can never fire (see app.analysis)")
+    parser.add_argument('--no-cache', action='store_true', help="always simulate, ignoring the result cache")
+    parser.add_argument('--cache-dir', help="result cache directory (default: $SIM3D_CACHE_DIR or ~/.cache/3d-simulator)")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    parser.add_argument('--stats', help="stream per-tick statistics to this file (see app.stats)")
+    parser.add_argument('--stats-format', choices=FORMATS,
+                        help="statistics file format (default: csv for a .csv path, else columns)")
+    parser.add_argument('--trace', default='', help="trace levels, e.g. 'tick,warp:debug'")
+    parser.add_argument('--trace-file', help="append trace events to this file as JSON lines")
+    args = parser.parse_args(argv)
+
+    tracer.configure(args.trace)
+    if args.trace_file:
+        tracer.open_sink(args.trace_file)
+
+    board = load_any(args.program, args.name, Board(chunked=args.chunked))
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir) if args.cache_dir else ResultCache.default()
+    stats = open_stats(args.stats, args.stats_format) if args.stats else None
+    try:
+        result = run_program(board, args.a, args.b, args.max_ticks, args.engine, cache, stats,
+                             args.skip_dead)
+    finally:
+        if stats is not None:
+            stats.close()
+
+    if args.json:
+        print(json.dumps(result.as_dict()))
+    else:
+        print(f"Submitted: {result.submitted_value}" + (" (cached)" if result.cached else ""))
+        print(f"Stop reason: {result.stop_reason}")
+        if result.error:
+            print(f"Error: {result.error}")
+        if result.cycle_period is not None:
+            print(f"Cycle detected at tick {result.tick}, period {result.cycle_period}")
+        print(f"Ticks: {result.tick} ({result.steps} steps)")
+        print(f"Operator evaluations: {result.evaluations}")
+        print(f"Volume: {result.volume}")
+        print(f"Ticks/sec: {result.ticks_per_sec:.1f}")
+
+    return 0 if result.error is None else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
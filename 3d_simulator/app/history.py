@@ -0,0 +1,315 @@
+"""
+Board history for the 3D language simulator.
+
+The history keeps one full snapshot of the first tick and, for every later
+tick, only the cells that changed. Memory therefore grows with the number of
+cell changes instead of board size x ticks.
+
+Each recorded tick also carries a 64-bit Zobrist-style hash of its board,
+updated from the delta, and a polynomial prefix hash over the board hashes,
+so any run of consecutive ticks can be hashed in O(1). The simulator uses
+them to find candidate repeated states, then confirms each one by comparing
+boards and deltas exactly.
+
+For random access, a full copy of the board is kept as a checkpoint once
+enough cells have changed since the previous one, at least as many as the
+board holds. Any tick is rebuilt by replaying deltas from the nearest
+checkpoint in either direction. Checkpoints therefore cost about as much
+memory as the deltas they summarise, and a seek is bounded by the board
+size rather than the length of the run.
+"""
+
+import bisect
+import sys
+
+from .board import Board
+
+HASH_MASK = (1 << 64) - 1
+
+# Polynomial hashing of board hash sequences, modulo a Mersenne prime
+SPAN_MOD = (1 << 61) - 1
+SPAN_BASE = 0x9E3779B97F4A7C15 % SPAN_MOD
+
+# A checkpoint is taken after this many cell changes (or the board size, if
+# larger), or after this many ticks, whichever comes first
+CHECKPOINT_CHANGES = 1024
+CHECKPOINT_TICKS = 4096
+
+
+def _mix(z):
+    """The splitmix64 finaliser: a 64-bit bijection with good avalanche."""
+    z = (z + 0x9E3779B97F4A7C15) & HASH_MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & HASH_MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & HASH_MASK
+    return z ^ (z >> 31)
+
+
+# Memo of cell_hash(), emptied whenever it reaches CELL_HASH_MEMO entries
+CELL_HASH_MEMO = 1 << 16
+_cell_hashes = {}
+
+
+def cell_hash(pos, value):
+    """Hash contribution of one occupied cell; boards hash to the XOR of their cells.
+
+    Mixes x, y, the type of the value and the value itself, all of it: numbers
+    are unbounded, so they are folded in 64 bits at a time. The builtin hash()
+    would not do, as hash(-1) == hash(-2).
+    """
+    key = (pos, value)
+    h = _cell_hashes.get(key)
+    if h is not None:
+        return h
+    x, y = pos
+    h = _mix(_mix(x & HASH_MASK) ^ (y & HASH_MASK))
+    if isinstance(value, int):
+        h = _mix(h ^ 1)
+        while True:
+            h = _mix(h ^ (value & HASH_MASK))
+            value >>= 64
+            if value in (0, -1):
+                h = _mix(h ^ (value & 1))  # the sign ends the digits
+                break
+    else:
+        h = _mix(_mix(h ^ 2) ^ int.from_bytes(str(value).encode(), 'little'))
+    if len(_cell_hashes) >= CELL_HASH_MEMO:
+        _cell_hashes.clear()
+    _cell_hashes[key] = h
+    return h
+
+
+def grid_hash(grid):
+    """Hash a whole grid dict from scratch."""
+    h = 0
+    for pos, value in grid.items():
+        h ^= cell_hash(pos, value)
+    return h
+
+
+def span_hash(prefix_start, prefix_end, length):
+    """Hash of the boards between two prefix hashes that are length ticks apart."""
+    return (prefix_end - prefix_start * pow(SPAN_BASE, length, SPAN_MOD)) % SPAN_MOD
+
+
+class BoardHistory:
+    def __init__(self, board):
+        self.width = board.width
+        self.height = board.height
+        self._base = dict(board.grid)  # state at history[0]
+        self._head = dict(board.grid)  # state at history[-1]
+        self._deltas = []  # per tick: {(x, y): (old, new)} or None if unchanged
+
+        # Running bounds over all recorded ticks, pushed only when they grow:
+        # [(history index, (min_x, max_x, min_y, max_y)), ...]
+        self._bounds = []
+        if self._base:
+            xs = [x for x, y in self._base]
+            ys = [y for x, y in self._base]
+            self._bounds.append((0, (min(xs), max(xs), min(ys), max(ys))))
+
+        # Board hash per recorded tick, and _prefix[n] = hash of history[:n]
+        self._hashes = [grid_hash(self._base)]
+        self._prefix = [0, self._hashes[0] % SPAN_MOD]
+
+        # Serial number per recorded tick, new whenever a tick is appended
+        self._ids = [0]
+        self._next_id = 1
+
+        # Full boards at some history indexes, in index order; _base is the first
+        self._checkpoint_indexes = [0]
+        self._checkpoints = [self._base]
+        self._changes_since_checkpoint = 0
+
+    def __len__(self):
+        return len(self._deltas) + 1
+
+    def __getitem__(self, index):
+        """Rebuild the board recorded at the given index."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+
+        # Replay from whichever checkpoint, or the head, is closest
+        indexes = self._checkpoint_indexes
+        below = bisect.bisect_right(indexes, index) - 1
+        start = indexes[below]
+        if below + 1 < len(indexes):
+            end, end_grid = indexes[below + 1], self._checkpoints[below + 1]
+        else:
+            end, end_grid = len(self) - 1, self._head
+
+        if index - start <= end - index:
+            grid = dict(self._checkpoints[below])
+            for delta in self._deltas[start:index]:
+                if delta:
+                    _apply(grid, delta, 1)
+        else:
+            grid = dict(end_grid)
+            for delta in reversed(self._deltas[index:end]):
+                if delta:
+                    _apply(grid, delta, 0)
+
+        board = Board(self.width, self.height)
+        board.grid = grid
+        return board
+
+    def replay(self, start=0):
+        """Yield (index, grid, delta) for every tick from start on.
+
+        grid is a single dict updated in place from tick to tick, so it is
+        only valid until the next item; delta is None for a tick that changed
+        nothing, and for the first item.
+        """
+        grid = self[start].grid
+        yield start, grid, None
+        for index in range(start + 1, len(self)):
+            delta = self._deltas[index - 1]
+            if delta:
+                _apply(grid, delta, 1)
+            yield index, grid, delta
+
+    def append(self, board, positions=None):
+        """Record the board as the next tick and return its delta.
+
+        positions lists the cells that may have changed since the last
+        recorded tick; None compares the whole board.
+        """
+        head = self._head
+        grid = board.grid
+        if positions is None:
+            positions = head.keys() | grid.keys()
+
+        delta = {}
+        h = self._hashes[-1]
+        memo = _cell_hashes
+        for pos in positions:
+            old = head.get(pos)
+            new = grid.get(pos)
+            if old != new:
+                delta[pos] = (old, new)
+                if old is not None:
+                    h ^= memo.get((pos, old)) or cell_hash(pos, old)
+                if new is None:
+                    del head[pos]
+                else:
+                    head[pos] = new
+                    h ^= memo.get((pos, new)) or cell_hash(pos, new)
+
+        self._deltas.append(delta or None)
+        self._ids.append(self._next_id)
+        self._next_id += 1
+        self._hashes.append(h)
+        self._prefix.append((self._prefix[-1] * SPAN_BASE + h) % SPAN_MOD)
+        if delta:
+            self._extend_bounds(delta)
+
+        self._changes_since_checkpoint += len(delta)
+        if (self._changes_since_checkpoint >= max(CHECKPOINT_CHANGES, len(head))
+                or len(self._deltas) - self._checkpoint_indexes[-1] >= CHECKPOINT_TICKS):
+            self._checkpoint_indexes.append(len(self._deltas))
+            self._checkpoints.append(dict(head))
+            self._changes_since_checkpoint = 0
+        return delta
+
+    def _extend_bounds(self, delta):
+        """Grow the running bounds to cover the cells written by a delta."""
+        if self._bounds:
+            bounds = self._bounds[-1][1]
+            min_x, max_x, min_y, max_y = bounds
+        else:
+            bounds = None
+            min_x = min_y = float('inf')
+            max_x = max_y = float('-inf')
+
+        for (x, y), (old, new) in delta.items():
+            if new is not None:
+                if x < min_x:
+                    min_x = x
+                if x > max_x:
+                    max_x = x
+                if y < min_y:
+                    min_y = y
+                if y > max_y:
+                    max_y = y
+
+        if min_x != float('inf') and (min_x, max_x, min_y, max_y) != bounds:
+            self._bounds.append((len(self._deltas), (min_x, max_x, min_y, max_y)))
+
+    def bounds(self):
+        """Bounds (min_x, max_x, min_y, max_y) over every recorded tick, or None."""
+        if not self._bounds:
+            return None
+        return self._bounds[-1][1]
+
+    def prefix_hash(self, length=None):
+        """Hash of the first length ticks (default: all of them); see span_hash."""
+        return self._prefix[len(self) if length is None else length]
+
+    def tick_id(self, index):
+        """Serial number of the tick at index; a rewind past it gives a new one.
+
+        The board at an index is unchanged for as long as its id is.
+        """
+        return self._ids[index]
+
+    def deltas(self, start=0, end=None):
+        """The per-tick deltas between two indexes, as a new list.
+
+        Delta i turns history[i] into history[i + 1]; it is None for a tick
+        that changed nothing. Recorded deltas are never modified.
+        """
+        return self._deltas[start:end]
+
+    def memory_size(self):
+        """Approximate memory held by the history, in bytes.
+
+        Counts the containers and per-change tuples, not the shared keys and
+        values. Walks every delta, so it is meant for occasional sampling.
+        """
+        getsizeof = sys.getsizeof
+        size = getsizeof(self._base) + getsizeof(self._head) + getsizeof(self._deltas)
+        for delta in self._deltas:
+            if delta:
+                size += getsizeof(delta) + sum(getsizeof(change) for change in delta.values())
+        size += getsizeof(self._hashes) + getsizeof(self._prefix) + getsizeof(self._bounds)
+        size += getsizeof(self._ids)
+        size += getsizeof(self._checkpoint_indexes) + getsizeof(self._checkpoints)
+        size += sum(getsizeof(grid) for grid in self._checkpoints[1:])
+        return size
+
+    def rewind(self, board, length, dirty=()):
+        """Restore the board in place to history[length - 1] and drop later ticks.
+
+        dirty lists cells changed on the board since the last recorded tick.
+        Returns the set of positions that were written back to the board.
+        """
+        head = self._head
+        changed = set(dirty)
+        while len(self._deltas) >= length:
+            delta = self._deltas.pop()
+            if delta:
+                _apply(head, delta, 0)
+                changed.update(delta)
+        while self._bounds and self._bounds[-1][0] >= length:
+            self._bounds.pop()
+        del self._hashes[length:]
+        del self._ids[length:]
+        del self._prefix[length + 1:]
+        keep = bisect.bisect_left(self._checkpoint_indexes, length)
+        del self._checkpoint_indexes[keep:]
+        del self._checkpoints[keep:]
+
+        for x, y in changed:
+            board.set_cell(x, y, head.get((x, y)))
+        return changed
+
+
+def _apply(grid, delta, side):
+    """Apply a delta forwards (side=1) or backwards (side=0) to a grid dict."""
+    for pos, values in delta.items():
+        value = values[side]
+        if value is None:
+            grid.pop(pos, None)
+        else:
+            grid[pos] = value
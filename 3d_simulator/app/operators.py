@@ -2,24 +2,44 @@
 Operator processing for the 3D language simulator.
 """
 
+from .program import (
+    CompiledProgram, OPERATOR_TOKENS, TOKENS,
+    OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_MOD, OP_EQUAL,
+)
+from .tracing import tracer, DEBUG
+
 class OperatorProcessor:
     def __init__(self, board):
         self.board = board
         self.pending_writes = []  # [(x, y, value), ...]
         self.pending_removes = []  # [(x, y), ...]
-        self.time_warps = []  # [(dx, dy, dt, value), ...]
+        self.time_warps = []  # [(x, y, dx, dy, dt, value), ...]
+        self.program = CompiledProgram(board)
+        self.examined = 0  # operators examined by the last collection
         
-    def process_all_operators(self):
+    def process_all_operators(self, active=None):
         """Process all operators on the board for one tick."""
-        self.pending_writes.clear()
-        self.pending_removes.clear()
-        self.time_warps.clear()
+        self.collect_operations(active)
+        return self.apply_operations()
+    
+    def collect_operations(self, active=None):
+        """Collect the pending operations for one tick without applying them.
         
-        # Collect all operations first - only process actual operators
-        for x, y, value in self.board.get_all_cells():
-            if self._is_operator(value):
-                self._process_operator_at(x, y, value)
+        active is an optional set of positions touched since the previous
+        tick. Only operators on or next to those cells are examined; any
+        other operator sees the same neighbourhood as last tick, when it did
+        not fire, so it cannot fire now either.
+        """
+        self.examined = 0
+        self._collect_operations(active)
         
+        # Conflict messages and the choice of warp depend on board order,
+        # so redo those ticks with a full scan to match it exactly
+        if active is not None and (len(self.time_warps) > 1 or self._has_write_conflict()):
+            self._collect_operations(None)
+    
+    def apply_operations(self):
+        """Apply the collected operations to the board."""
         # Apply all removes first
         for x, y in self.pending_removes:
             self.board.set_cell(x, y, None)
@@ -44,137 +64,179 @@ class OperatorProcessor:
         
         return self.time_warps
     
+    def has_operations(self):
+        """Check whether the collected operations would reduce anything."""
+        return bool(self.pending_writes or self.pending_removes or self.time_warps)
+    
+    def has_conflicts(self):
+        """Check whether applying the collected operations would fail."""
+        if self._has_write_conflict():
+            return True
+        return len({warp[4] for warp in self.time_warps}) > 1
+    
+    def _collect_operations(self, active):
+        """Collect pending operations for all operators, or only the active ones."""
+        self.pending_writes.clear()
+        self.pending_removes.clear()
+        self.time_warps.clear()
+        
+        program = self.program
+        cells = program.cells
+        
+        if active is None:
+            # Full scan in board order - only process actual operators
+            program.recompile()
+            entries = [(pos, cells[pos]) for pos in self.board.grid if pos in cells]
+        else:
+            # The active cells are exactly the ones changed since the last
+            # collection, so they are also the ones to recompile
+            program.update(active)
+            candidates = set()
+            for x, y in active:
+                candidates.update(((x, y), (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)))
+            entries = [(pos, cells[pos]) for pos in candidates if pos in cells]
+        self.examined += len(entries)
+        
+        trace = tracer.operator >= DEBUG
+        for pos, entry in entries:
+            if trace:
+                tracer.emit('operator', DEBUG, "process", x=pos[0], y=pos[1], op=TOKENS[entry[0]])
+            _HANDLERS[entry[0]](self, pos, entry)
+    
+    def _has_write_conflict(self):
+        """Check whether two pending writes put different values in one cell."""
+        write_positions = {}
+        for x, y, value in self.pending_writes:
+            if write_positions.setdefault((x, y), value) != value:
+                return True
+        return False
+    
     def _is_operator(self, value):
         """Check if value is an operator."""
         if isinstance(value, int):
             return False  # Numbers are not operators
-        
-        operators = {'<', '>', '^', 'v', '+', '-', '*', '/', '%', '@', '=', '#', 'S', 'A', 'B'}
-        return value in operators
+        return value in OPERATOR_TOKENS
     
-    def _process_operator_at(self, x, y, operator):
-        """Process a single operator at given position."""
-        print(f"Processing operator '{operator}' at ({x}, {y})")  # Debug log
-        
-        if operator == '<':
-            self._process_move_left(x, y)
-        elif operator == '>':
-            self._process_move_right(x, y)
-        elif operator == '^':
-            self._process_move_up(x, y)
-        elif operator == 'v':
-            self._process_move_down(x, y)
-        elif operator == '+':
-            self._process_binary_op(x, y, lambda a, b: a + b)
-        elif operator == '-':
-            self._process_binary_op(x, y, lambda a, b: a - b)
-        elif operator == '*':
-            self._process_binary_op(x, y, lambda a, b: a * b)
-        elif operator == '/':
-            self._process_binary_op(x, y, lambda a, b: int(a / b) if b != 0 else 0)
-        elif operator == '%':
-            self._process_binary_op(x, y, lambda a, b: a % b if b != 0 else 0)
-        elif operator == '=':
-            self._process_equality(x, y)
-        elif operator == '#':
-            self._process_not_equal(x, y)
-        elif operator == '@':
-            self._process_time_warp(x, y)
+    # Operator handlers. Each takes the operator position and its compiled
+    # entry (opcode, left, right, up, down) and records pending operations.
     
-    def _process_move_left(self, x, y):
+    def _process_move_left(self, pos, entry):
         """Process < operator: . < x -> x < ."""
-        right_val = self.board.get_cell(x + 1, y)
+        right = entry[2]
+        right_val = self.board.grid.get(right)
         if right_val is not None:
-            self.pending_removes.append((x + 1, y))
-            self.pending_writes.append((x - 1, y, right_val))
+            left = entry[1]
+            self.pending_removes.append(right)
+            self.pending_writes.append((left[0], left[1], right_val))
     
-    def _process_move_right(self, x, y):
+    def _process_move_right(self, pos, entry):
         """Process > operator: x > . -> . > x"""
-        left_val = self.board.get_cell(x - 1, y)
-        print(f"Move right at ({x}, {y}): left_val = {left_val}")  # Debug log
+        left = entry[1]
+        left_val = self.board.grid.get(left)
         if left_val is not None:
-            print(f"Moving {left_val} from ({x-1}, {y}) to ({x+1}, {y})")  # Debug log
-            self.pending_removes.append((x - 1, y))
-            self.pending_writes.append((x + 1, y, left_val))
+            right = entry[2]
+            self.pending_removes.append(left)
+            self.pending_writes.append((right[0], right[1], left_val))
     
-    def _process_move_up(self, x, y):
+    def _process_move_up(self, pos, entry):
         """Process ^ operator: move value from below to above"""
-        below_val = self.board.get_cell(x, y + 1)
+        below = entry[4]
+        below_val = self.board.grid.get(below)
         if below_val is not None:
-            self.pending_removes.append((x, y + 1))
-            self.pending_writes.append((x, y - 1, below_val))
+            above = entry[3]
+            self.pending_removes.append(below)
+            self.pending_writes.append((above[0], above[1], below_val))
     
-    def _process_move_down(self, x, y):
+    def _process_move_down(self, pos, entry):
         """Process v operator: move value from above to below"""
-        above_val = self.board.get_cell(x, y - 1)
+        above = entry[3]
+        above_val = self.board.grid.get(above)
         if above_val is not None:
-            self.pending_removes.append((x, y - 1))
-            self.pending_writes.append((x, y + 1, above_val))
+            below = entry[4]
+            self.pending_removes.append(above)
+            self.pending_writes.append((below[0], below[1], above_val))
     
-    def _process_binary_op(self, x, y, operation):
+    def _process_binary_op(self, pos, entry):
         """Process binary operators like +, -, *, /, %"""
-        left_val = self.board.get_cell(x - 1, y)
-        above_val = self.board.get_cell(x, y - 1)
+        opcode, left, right, above, below = entry
+        grid = self.board.grid
+        left_val = grid.get(left)
+        above_val = grid.get(above)
         
-        if (left_val is not None and isinstance(left_val, int) and 
-            above_val is not None and isinstance(above_val, int)):
-            
+        if isinstance(left_val, int) and isinstance(above_val, int):
             try:
                 # For binary operators: left_val is x, above_val is y
                 # So the operation is x op y (e.g., x / y)
-                result = operation(left_val, above_val)
-                self.pending_removes.append((x - 1, y))
-                self.pending_removes.append((x, y - 1))
-                self.pending_writes.append((x + 1, y, result))
-                self.pending_writes.append((x, y + 1, result))
+                result = BINARY_OPS[opcode](left_val, above_val)
+                self.pending_removes.append(left)
+                self.pending_removes.append(above)
+                self.pending_writes.append((right[0], right[1], result))
+                self.pending_writes.append((below[0], below[1], result))
             except (ZeroDivisionError, ValueError):
                 pass  # Operation failed, no change
     
-    def _process_equality(self, x, y):
-        """Process = operator: only reduces if operands are equal"""
-        left_val = self.board.get_cell(x - 1, y)
-        above_val = self.board.get_cell(x, y - 1)
+    def _process_comparison(self, pos, entry):
+        """Process = and # operators: reduce if the operands are equal / not equal"""
+        opcode, left, right, above, below = entry
+        grid = self.board.grid
+        left_val = grid.get(left)
+        above_val = grid.get(above)
         
-        if (left_val is not None and above_val is not None and left_val == above_val):
-            self.pending_removes.append((x - 1, y))
-            self.pending_removes.append((x, y - 1))
-            self.pending_writes.append((x + 1, y, left_val))
-            self.pending_writes.append((x, y + 1, left_val))
+        if (left_val is not None and above_val is not None and
+                (left_val == above_val) == (opcode == OP_EQUAL)):
+            self.pending_removes.append(left)
+            self.pending_removes.append(above)
+            self.pending_writes.append((right[0], right[1], left_val))
+            self.pending_writes.append((below[0], below[1], left_val))
     
-    def _process_not_equal(self, x, y):
-        """Process # operator: only reduces if operands are not equal"""
-        left_val = self.board.get_cell(x - 1, y)
-        above_val = self.board.get_cell(x, y - 1)
-        
-        if (left_val is not None and above_val is not None and left_val != above_val):
-            self.pending_removes.append((x - 1, y))
-            self.pending_removes.append((x, y - 1))
-            self.pending_writes.append((x + 1, y, left_val))
-            self.pending_writes.append((x, y + 1, left_val))
-    
-    def _process_time_warp(self, x, y):
+    def _process_time_warp(self, pos, entry):
         """Process @ operator: time warp"""
-        print(f"Processing time warp at ({x}, {y})")  # Debug log
+        opcode, left, right, above, below = entry
+        grid = self.board.grid
         
         # Get the four values around @
-        above_val = self.board.get_cell(x, y - 1)  # v
-        left_val = self.board.get_cell(x - 1, y)   # dx
-        right_val = self.board.get_cell(x + 1, y)  # dy
-        below_val = self.board.get_cell(x, y + 1)  # dt
-        
-        print(f"Time warp values: v={above_val}, dx={left_val}, dy={right_val}, dt={below_val}")  # Debug log
+        above_val = grid.get(above)  # v
+        left_val = grid.get(left)    # dx
+        right_val = grid.get(right)  # dy
+        below_val = grid.get(below)  # dt
         
         if (above_val is not None and 
             isinstance(left_val, int) and isinstance(right_val, int) and 
             isinstance(below_val, int) and below_val >= 1):
             
+            x, y = pos
             # Store the @ operator position along with the warp parameters
             self.time_warps.append((x, y, left_val, right_val, below_val, above_val))
             # Remove the consumed values
-            self.pending_removes.append((x, y - 1))
-            self.pending_removes.append((x - 1, y))
-            self.pending_removes.append((x + 1, y))
-            self.pending_removes.append((x, y + 1))
-            print(f"Time warp scheduled: @({x},{y}) dx={left_val} dy={right_val} dt={below_val} v={above_val}")  # Debug log
-        else:
-            print(f"Time warp conditions not met")  # Debug log
+            self.pending_removes.append(above)
+            self.pending_removes.append(left)
+            self.pending_removes.append(right)
+            self.pending_removes.append(below)
+            if tracer.warp >= DEBUG:
+                tracer.emit('warp', DEBUG, "warp scheduled", x=x, y=y, dx=left_val, dy=right_val,
+                            dt=below_val, value=above_val)
+
+
+BINARY_OPS = {
+    OP_ADD: lambda a, b: a + b,
+    OP_SUB: lambda a, b: a - b,
+    OP_MUL: lambda a, b: a * b,
+    OP_DIV: lambda a, b: int(a / b) if b != 0 else 0,
+    OP_MOD: lambda a, b: a % b if b != 0 else 0,
+}
+
+# Static dispatch table indexed by opcode
+_HANDLERS = (
+    OperatorProcessor._process_move_left,   # OP_MOVE_LEFT
+    OperatorProcessor._process_move_right,  # OP_MOVE_RIGHT
+    OperatorProcessor._process_move_up,     # OP_MOVE_UP
+    OperatorProcessor._process_move_down,   # OP_MOVE_DOWN
+    OperatorProcessor._process_binary_op,   # OP_ADD
+    OperatorProcessor._process_binary_op,   # OP_SUB
+    OperatorProcessor._process_binary_op,   # OP_MUL
+    OperatorProcessor._process_binary_op,   # OP_DIV
+    OperatorProcessor._process_binary_op,   # OP_MOD
+    OperatorProcessor._process_comparison,  # OP_EQUAL
+    OperatorProcessor._process_comparison,  # OP_NOT_EQUAL
+    OperatorProcessor._process_time_warp,   # OP_WARP
+)
@@ -0,0 +1,84 @@
+"""
+Compiled program representation for the 3D language simulator.
+
+Board stays the editing front end. CompiledProgram is the form the operator
+processor executes: every operator cell maps to an integer opcode plus the
+precomputed coordinates of its four neighbours. It is kept in step with the
+board by recompiling only the cells that changed.
+"""
+
+# Opcodes, in dispatch table order
+OP_MOVE_LEFT = 0
+OP_MOVE_RIGHT = 1
+OP_MOVE_UP = 2
+OP_MOVE_DOWN = 3
+OP_ADD = 4
+OP_SUB = 5
+OP_MUL = 6
+OP_DIV = 7
+OP_MOD = 8
+OP_EQUAL = 9
+OP_NOT_EQUAL = 10
+OP_WARP = 11
+OP_SUBMIT = 12
+OP_INPUT_A = 13
+OP_INPUT_B = 14
+
+OPCODES = {
+    '<': OP_MOVE_LEFT,
+    '>': OP_MOVE_RIGHT,
+    '^': OP_MOVE_UP,
+    'v': OP_MOVE_DOWN,
+    '+': OP_ADD,
+    '-': OP_SUB,
+    '*': OP_MUL,
+    '/': OP_DIV,
+    '%': OP_MOD,
+    '=': OP_EQUAL,
+    '#': OP_NOT_EQUAL,
+    '@': OP_WARP,
+    'S': OP_SUBMIT,
+    'A': OP_INPUT_A,
+    'B': OP_INPUT_B,
+}
+TOKENS = {opcode: token for token, opcode in OPCODES.items()}
+OPERATOR_TOKENS = frozenset(OPCODES)
+
+# Opcodes that act on their neighbours; S, A and B are inert during a tick
+EXECUTABLE_OPCODES = frozenset(range(OP_MOVE_LEFT, OP_WARP + 1))
+
+
+def opcode_of(value):
+    """Return the opcode of a cell value, or None for numbers and empty cells."""
+    if value is None or isinstance(value, int):
+        return None
+    return OPCODES.get(value)
+
+
+class CompiledProgram:
+    def __init__(self, board):
+        self.board = board
+        self.cells = {}  # {(x, y): (opcode, left, right, up, down)}
+        self.live = None  # cells whose operators may fire (see app.analysis), None for all
+        self.recompile()
+
+    def recompile(self):
+        """Rebuild the table from the whole board."""
+        self.cells.clear()
+        for (x, y), value in self.board.grid.items():
+            self._compile_cell(x, y, value)
+
+    def update(self, positions):
+        """Recompile the given cells after they changed on the board."""
+        grid = self.board.grid
+        cells = self.cells
+        for x, y in positions:
+            cells.pop((x, y), None)
+            value = grid.get((x, y))
+            if value is not None:
+                self._compile_cell(x, y, value)
+
+    def _compile_cell(self, x, y, value):
+        opcode = opcode_of(value)
+        if opcode in EXECUTABLE_OPCODES and (self.live is None or (x, y) in self.live):
+            self.cells[(x, y)] = (opcode, (x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1))
@@ -0,0 +1,247 @@
+"""
+Program files for the 3D language simulator.
+
+Two formats are supported:
+
+Text: the ICFP whitespace-separated grid, one row per line, '.' for an empty
+cell. It is parsed line by line straight into the board, so a file is never
+held in memory as a whole.
+
+    . A .
+    B + .
+    . . S
+
+Pack: a compact binary file holding any number of named programs. A pack is
+memory-mapped and only its directory is read on open; each program's cells
+are decoded when it is requested, so large generated programs and whole
+problem sets open instantly. Layout, little-endian:
+
+    header     '3DPK', version u16, program count u32
+    directory  per program: name length u16, UTF-8 name, cell offset u64,
+               cell count u32
+    cells      per cell: x i32, y i32, code i16
+
+A cell code is the number itself for -99..99, or TOKEN_CODE + opcode.
+"""
+
+import mmap
+import re
+import struct
+
+from .board import Board
+from .program import OPCODES, OPERATOR_TOKENS, TOKENS
+
+PACK_MAGIC = b'3DPK'
+PACK_VERSION = 1
+TOKEN_CODE = 1000
+
+_HEADER = struct.Struct('<4sHI')
+_NAME_LENGTH = struct.Struct('<H')
+_ENTRY = struct.Struct('<QI')
+_CELL = struct.Struct('<iih')
+
+# Numbers as format_program() writes them, so that files round-trip
+_NUMBER = re.compile(r'0|-?[1-9][0-9]*')
+
+
+def iter_program_cells(lines, board=None):
+    """Yield (x, y, value) for every cell in grid text lines.
+
+    Numbers must be plain decimals without a sign other than '-', leading
+    zeros or underscores, and are range-checked with Board.is_valid_token;
+    an invalid token raises ValueError with its line and column.
+    """
+    if board is None:
+        board = Board()
+    for y, line in enumerate(lines):
+        for x, token in enumerate(line.split()):
+            if token in OPERATOR_TOKENS:
+                yield x, y, token
+            elif token == '.':
+                continue
+            elif _NUMBER.fullmatch(token) and board.is_valid_token(token):
+                yield x, y, int(token)
+            else:
+                raise ValueError(f"Invalid token {token!r} at line {y + 1}, column {x + 1}")
+
+
+def parse_program(text, board=None):
+    """Parse whitespace-separated grid text into a Board."""
+    return read_program(text.splitlines(), board)
+
+
+def read_program(lines, board=None):
+    """Read grid text from any iterable of lines, such as an open file."""
+    if board is None:
+        board = Board()
+    board.set_cells(iter_program_cells(lines, board))
+    return board
+
+
+def load_program(path, board=None):
+    """Load a program file in grid text format into a Board (default: a new one)."""
+    with open(path) as f:
+        return read_program(f, board)
+
+
+def format_program(board):
+    """Return a board as grid text.
+
+    Rows and columns start at 0, or further up/left if cells lie there.
+    """
+    if not board.grid:
+        return ''
+    min_x, max_x, min_y, max_y = board.get_bounds()
+    min_x = min(min_x, 0)
+    min_y = min(min_y, 0)
+    grid = board.grid
+    lines = []
+    for y in range(min_y, max_y + 1):
+        row = [grid.get((x, y), '.') for x in range(min_x, max_x + 1)]
+        lines.append(' '.join(str(value) for value in row))
+    return '\n'.join(lines) + '\n'
+
+
+def save_program(board, path):
+    """Save a board to a file in grid text format."""
+    with open(path, 'w') as f:
+        f.write(format_program(board))
+
+
+def _cell_code(value):
+    if isinstance(value, int):
+        if not -99 <= value <= 99:
+            raise ValueError(f"Number {value} is outside the program range -99..99")
+        return value
+    return TOKEN_CODE + OPCODES[value]
+
+
+def _cell_value(code):
+    if -99 <= code <= 99:
+        return code
+    token = TOKENS.get(code - TOKEN_CODE)
+    if token is None:
+        raise ValueError(f"Invalid cell code {code} in program pack")
+    return token
+
+
+def save_pack(path, programs):
+    """Write programs to a pack file.
+
+    programs is a dict or an iterable of (name, board) pairs.
+    """
+    if isinstance(programs, dict):
+        programs = programs.items()
+    programs = [(name, name.encode('utf-8'), board) for name, board in programs]
+
+    # Cells start right after the header and directory
+    offset = _HEADER.size + sum(_NAME_LENGTH.size + len(encoded) + _ENTRY.size
+                                for name, encoded, board in programs)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(programs)))
+        for name, encoded, board in programs:
+            f.write(_NAME_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+            f.write(_ENTRY.pack(offset, len(board.grid)))
+            offset += len(board.grid) * _CELL.size
+        for name, encoded, board in programs:
+            cells = bytearray(len(board.grid) * _CELL.size)
+            for i, ((x, y), value) in enumerate(board.grid.items()):
+                _CELL.pack_into(cells, i * _CELL.size, x, y, _cell_code(value))
+            f.write(cells)
+
+
+class ProgramPack:
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path} is not a program pack")
+        self._entries = {}  # {name: (offset, cell count)}, in file order
+        self.path = path
+        try:
+            self._read_directory(path)
+        except ValueError:
+            self.close()
+            raise
+        except struct.error as e:
+            self.close()
+            raise ValueError(f"{path} is truncated") from e
+
+    def _read_directory(self, path):
+        data = self._map
+        magic, version, count = _HEADER.unpack_from(data, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{path} is not a program pack")
+        if version != PACK_VERSION:
+            raise ValueError(f"Unsupported program pack version {version}")
+        position = _HEADER.size
+        for _ in range(count):
+            (length,) = _NAME_LENGTH.unpack_from(data, position)
+            position += _NAME_LENGTH.size
+            name = bytes(data[position:position + length]).decode('utf-8')
+            position += length
+            self._entries[name] = _ENTRY.unpack_from(data, position)
+            position += _ENTRY.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def names(self):
+        """Program names in file order."""
+        return list(self._entries)
+
+    def load(self, name, board=None):
+        """Decode one program into a Board."""
+        if board is None:
+            board = Board()
+        offset, count = self._entries[name]
+        end = offset + count * _CELL.size
+        if end > len(self._map):
+            raise ValueError(f"{self.path} is truncated")
+        # Decode in full before releasing the view, which the unpacking
+        # iterator holds on to; a bad cell code then still raises ValueError
+        view = memoryview(self._map)[offset:end]
+        try:
+            cells = [(x, y, _cell_value(code)) for x, y, code in _CELL.iter_unpack(view)]
+        finally:
+            view.release()
+        board.set_cells(cells)
+        return board
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+
+def is_pack(path):
+    """Check whether a file starts with the program pack magic."""
+    with open(path, 'rb') as f:
+        return f.read(len(PACK_MAGIC)) == PACK_MAGIC
+
+
+def load_any(path, name=None, board=None):
+    """Load a program from a text file or, by name (default: first), from a pack."""
+    if not is_pack(path):
+        return load_program(path, board)
+    with ProgramPack(path) as pack:
+        if name is None:
+            if not len(pack):
+                raise ValueError(f"{path} contains no programs")
+            name = pack.names()[0]
+        return pack.load(name, board)
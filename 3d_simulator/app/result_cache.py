@@ -0,0 +1,192 @@
+"""
+Result cache for the 3D language simulator.
+
+Finished runs are stored under a content hash of the program grid and the
+A/B inputs, so re-running an unchanged program against the same inputs can
+be answered without simulating. There are two tiers: an in-memory LRU and a
+directory of small JSON files whose total size is bounded, evicting the
+least recently used files first.
+
+The cache directory defaults to ~/.cache/3d-simulator and can be moved with
+the SIM3D_CACHE_DIR environment variable.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from .tracing import tracer, DEBUG
+
+# Bump when the simulator semantics or the stored fields change. Version 1
+# could hold 'cycle' stops found by a hash collision; version 2 had no
+# peak_tick and judged max_ticks by the final tick, which warps lower
+CACHE_VERSION = 3
+
+RESULT_FIELDS = ('submitted_value', 'tick', 'peak_tick', 'volume', 'stop_reason', 'error', 'cycle_period')
+
+
+def program_key(board, input_a, input_b):
+    """Canonical hash of a program grid and its inputs."""
+    cells = sorted(([x, y, value] for (x, y), value in board.grid.items()),
+                   key=lambda cell: (cell[0], cell[1]))
+    payload = json.dumps([CACHE_VERSION, input_a, input_b, cells], separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def default_directory():
+    """Directory of the on-disk tier unless one is given explicitly."""
+    return os.environ.get('SIM3D_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', '3d-simulator')
+
+
+class ResultCache:
+    def __init__(self, directory=None, capacity=1024, max_bytes=32 * 1024 * 1024):
+        self.directory = directory  # None keeps the cache in memory only
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # {key: result dict}, least recently used first
+        self._disk_bytes = None  # computed on first write
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def default(cls):
+        """A cache backed by the default directory."""
+        return cls(default_directory())
+
+    def get(self, key, max_ticks=None):
+        """Return the stored result for a key, or None.
+
+        A result whose run reached max_ticks or more ticks would have been
+        cut short under that limit, so it does not count as a hit. This uses
+        the highest tick reached, since a time warp lowers the final one.
+        """
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+        elif self.directory is not None:
+            result = self._read(key)
+            if result is not None:
+                self._remember(key, result)
+
+        if result is None or (max_ticks is not None and result['peak_tick'] >= max_ticks):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if tracer.tick >= DEBUG:
+            tracer.emit('tick', DEBUG, "cache hit", key=key)
+        return dict(result)
+
+    def put(self, key, result):
+        """Store a result; only the fields in RESULT_FIELDS are kept."""
+        result = {field: result[field] for field in RESULT_FIELDS}
+        self._remember(key, result)
+        if self.directory is not None:
+            self._write(key, result)
+
+    def store_simulator(self, key, simulator):
+        """Store the outcome of a finished Simulator run.
+
+        Runs stopped by hand or by max_ticks are incomplete and are skipped.
+        A 'cycle' stop is kept only with its period, which the simulator sets
+        once the repeated state has been compared exactly.
+        """
+        if simulator.stop_reason in (None, 'max_ticks'):
+            return
+        if simulator.stop_reason == 'cycle' and simulator.cycle_period is None:
+            return
+        self.put(key, {
+            'submitted_value': simulator.submitted_value,
+            'tick': simulator.tick,
+            'peak_tick': simulator.peak_tick,
+            'volume': simulator.get_spacetime_volume(),
+            'stop_reason': simulator.stop_reason,
+            'error': simulator.error,
+            'cycle_period': simulator.cycle_period,
+        })
+
+    def clear(self):
+        """Drop every entry from both tiers."""
+        self._memory.clear()
+        if self.directory is not None:
+            for path, size, mtime in self._files():
+                os.remove(path)
+        self._disk_bytes = 0
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.json')
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            pass
+        return result
+
+    def _write(self, key, result):
+        path = self._path(key)
+        data = json.dumps(result, default=str)
+        try:
+            old_size = os.stat(path).st_size  # an overwritten file frees its bytes
+        except OSError:
+            old_size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial file
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return  # a read-only or full disk only loses the disk tier
+
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for path, size, mtime in self._files())
+        else:
+            self._disk_bytes += len(data) - old_size
+        if self._disk_bytes > self.max_bytes:
+            self._evict()
+
+    def _files(self):
+        """(path, size, mtime) of every cache file."""
+        files = []
+        if not os.path.isdir(self.directory):
+            return files
+        for prefix in os.listdir(self.directory):
+            subdir = os.path.join(self.directory, prefix)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.endswith('.json'):
+                    path = os.path.join(subdir, name)
+                    stat = os.stat(path)
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self):
+        """Delete least recently used files until the tier is under 3/4 of max_bytes."""
+        files = self._files()
+        total = sum(size for path, size, mtime in files)
+        target = self.max_bytes * 3 // 4
+        for path, size, mtime in sorted(files, key=lambda f: f[2]):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
@@ -0,0 +1,288 @@
+"""
+Search for smaller 3D programs: a superoptimizer for spacetime volume.
+
+Starting from a seed program that already passes a test set of
+(A, B) -> expected cases, each generation mutates the best candidates so
+far (set or clear a cell, or squeeze out a row or column), evaluates the
+mutants on a process pool and keeps the correct ones with the lowest
+volume. A candidate's volume is its largest over the test set.
+
+Programs are compared by their cells moved to start at (0, 0), which
+changes neither behaviour nor volume; every program evaluated is
+remembered by that key, so no board is simulated twice however often the
+mutations rediscover it. Runs are cut short once a test's volume exceeds
+the volume a candidate must beat to be kept, unless the board holds a
+time warp, which can shrink the volume again. Before any of that, static
+analysis (app.analysis) rejects programs that can never reach an S or
+whose first board is already too large, and leaves out dead operators.
+
+    python -m app.search program.3d --test 3,4=7 --test 1,1=2 --out best.3d
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from .analysis import analyse
+from .board import Board
+from .program_io import format_program, load_any, save_program
+from .simulator import Simulator
+
+# Values a mutation may write; S, A and B cells are never mutated
+ALPHABET = ('<', '>', '^', 'v', '+', '-', '*', '/', '%', '=', '#', '@', -1, 0, 1, 2, 3)
+PROTECTED = frozenset(('S', 'A', 'B'))
+
+
+@dataclass
+class Candidate:
+    """A program that passed every test, with its largest volume."""
+    cells: tuple  # ((x, y, value), ...), sorted and starting at (0, 0)
+    volume: int
+
+    def board(self):
+        """Return the program as a new Board."""
+        board = Board()
+        board.set_cells(self.cells)
+        return board
+
+
+@dataclass
+class SearchResult:
+    """Outcome of a search: the kept candidates, best first, and counters."""
+    best: list
+    generations: int
+    evaluated: int
+    duplicates: int
+    pruned: int
+    failed: int
+    elapsed: float
+
+
+def normalize(cells):
+    """Cells moved to start at (0, 0), as a sorted tuple."""
+    cells = list(cells)
+    if not cells:
+        return ()
+    min_x = min(x for x, y, value in cells)
+    min_y = min(y for x, y, value in cells)
+    return tuple(sorted(((x - min_x, y - min_y, value) for x, y, value in cells),
+                        key=lambda cell: (cell[1], cell[0])))
+
+
+def cells_key(cells):
+    """Compact hash of normalised cells, the dedup key."""
+    return hashlib.blake2b(repr(cells).encode(), digest_size=16).digest()
+
+
+def evaluate(cells, tests, max_ticks=10000, max_volume=None):
+    """Run a program on every test; returns (outcome, volume).
+
+    outcome is 'passed', 'failed' (a wrong answer or no answer) or
+    'pruned' when a run outgrew max_volume; volume is the largest seen.
+    """
+    program = Board()
+    program.set_cells(cells)
+    analysis = analyse(program)
+    if not analysis.may_submit:
+        return 'failed', 0
+    # Every run's volume includes the first board's bounds
+    min_x, max_x, min_y, max_y = program.get_bounds()
+    area = (max_x - min_x + 1) * (max_y - min_y + 1)
+    if max_volume is not None and area > max_volume:
+        return 'pruned', area
+
+    can_warp = bool(program.index.tokens['@'])
+    worst = 0
+    for a, b, expected in tests:
+        simulator = Simulator(program.copy(), a, b)
+        simulator.max_ticks = max_ticks
+        simulator.skip_dead_operators(analysis)
+        simulator.start()
+        while simulator.step():
+            if max_volume is not None and not can_warp and simulator.get_spacetime_volume() > max_volume:
+                return 'pruned', simulator.get_spacetime_volume()
+        volume = simulator.get_spacetime_volume()
+        worst = max(worst, volume)
+        if simulator.submitted_value != expected:
+            return 'failed', worst
+        if max_volume is not None and volume > max_volume:
+            return 'pruned', worst
+    return 'passed', worst
+
+
+def _evaluate_task(task):
+    """Process pool entry point for evaluate()."""
+    return evaluate(*task)
+
+
+def mutate(cells, rng, mutations=1):
+    """Return a copy of cells with random mutations applied (not normalised)."""
+    grid = {(x, y): value for x, y, value in cells}
+    for _ in range(mutations):
+        xs = [x for x, y in grid]
+        ys = [y for x, y in grid]
+        kind = rng.randrange(4)
+        if kind == 0 or not grid:
+            # Set a cell inside the bounds or next to them
+            pos = (rng.randint(min(xs, default=0) - 1, max(xs, default=0) + 1),
+                   rng.randint(min(ys, default=0) - 1, max(ys, default=0) + 1))
+            if grid.get(pos) not in PROTECTED:
+                grid[pos] = rng.choice(ALPHABET)
+        elif kind == 1:
+            pos = rng.choice(list(grid))
+            if grid[pos] not in PROTECTED:
+                del grid[pos]
+        else:
+            # Squeeze: drop a column (or row) and close the gap
+            axis = kind - 2
+            line = rng.randint(min(xs if axis == 0 else ys), max(xs if axis == 0 else ys))
+            if any(pos[axis] == line and value in PROTECTED for pos, value in grid.items()):
+                continue
+            squeezed = {}
+            for pos, value in grid.items():
+                if pos[axis] < line:
+                    squeezed[pos] = value
+                elif pos[axis] > line:
+                    squeezed[(pos[0] - 1, pos[1]) if axis == 0 else (pos[0], pos[1] - 1)] = value
+            grid = squeezed
+    return [(x, y, value) for (x, y), value in grid.items()]
+
+
+def search(seed, tests, generations=100, population=64, keep=8, max_ticks=10000, workers=None,
+           rng_seed=None, progress=None):
+    """Search for low-volume programs passing every (a, b, expected) test.
+
+    seed is a Board that passes the tests. Each generation evaluates up to
+    population new mutants of the kept candidates, across workers processes
+    (default: one per core; 0 evaluates in this process). progress, when
+    given, is called with the generation number and the best Candidate
+    whenever the best improves.
+    """
+    tests = list(tests)
+    if not tests:
+        raise ValueError("A search needs at least one test")
+    rng = random.Random(rng_seed)
+    start = time.perf_counter()
+
+    cells = normalize(seed.get_all_cells())
+    outcome, volume = evaluate(cells, tests, max_ticks)
+    if outcome != 'passed':
+        raise ValueError("The seed program does not pass its tests")
+    best = [Candidate(cells, volume)]
+    seen = {cells_key(cells)}  # every program evaluated or queued
+    counts = {'passed': 1, 'failed': 0, 'pruned': 0}
+    duplicates = 0
+
+    pool = None
+    if workers != 0:
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(workers)
+    try:
+        for generation in range(1, generations + 1):
+            # A candidate must beat the last kept one once the list is full
+            bound = best[-1].volume if len(best) >= keep else None
+
+            mutants = []
+            for _ in range(population * 10):
+                if len(mutants) >= population:
+                    break
+                parent = rng.choice(best)
+                mutant = normalize(mutate(parent.cells, rng, rng.randint(1, 3)))
+                key = cells_key(mutant)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                mutants.append(mutant)
+
+            tasks = [(mutant, tests, max_ticks, bound) for mutant in mutants]
+            if pool is None:
+                outcomes = map(_evaluate_task, tasks)
+            else:
+                outcomes = pool.map(_evaluate_task, tasks, chunksize=max(1, len(tasks) // (4 * workers)))
+
+            previous = best[0]
+            for mutant, (outcome, volume) in zip(mutants, outcomes):
+                counts[outcome] += 1
+                if outcome == 'passed':
+                    best.append(Candidate(mutant, volume))
+            best.sort(key=lambda candidate: (candidate.volume, len(candidate.cells)))
+            del best[keep:]
+            if progress is not None and best[0] is not previous:
+                progress(generation, best[0])
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    return SearchResult(
+        best=best,
+        generations=generations,
+        evaluated=sum(counts.values()),
+        duplicates=duplicates,
+        pruned=counts['pruned'],
+        failed=counts['failed'],
+        elapsed=time.perf_counter() - start,
+    )
+
+
+def parse_tests(specs):
+    """Parse test cases written as 'a,b=expected'."""
+    tests = []
+    for spec in specs:
+        inputs, sep, expected = spec.partition('=')
+        a, comma, b = inputs.partition(',')
+        if not sep or not comma:
+            raise ValueError(f"Test must look like 'a,b=expected': {spec!r}")
+        tests.append((int(a), int(b), int(expected)))
+    return tests
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Search for a lower-volume version of a 3D program.")
+    parser.add_argument('program', help="seed program in grid text format or a program pack")
+    parser.add_argument('--name', help="program to use from a pack (default: the first)")
+    parser.add_argument('--test', action='append', required=True, metavar='A,B=EXPECTED',
+                        help="a test case; repeat for more")
+    parser.add_argument('--generations', type=int, default=100)
+    parser.add_argument('--population', type=int, default=64, help="mutants evaluated per generation")
+    parser.add_argument('--keep', type=int, default=8, help="best candidates kept as parents")
+    parser.add_argument('--max-ticks', type=int, default=10000, help="tick limit per test run")
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"evaluation processes (default: {os.cpu_count()}; 0 runs in this process)")
+    parser.add_argument('--seed', type=int, default=None, help="random seed, for repeatable searches")
+    parser.add_argument('--out', help="save the best program to this file")
+    args = parser.parse_args(argv)
+    try:
+        tests = parse_tests(args.test)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def report(generation, candidate):
+        print(f"generation {generation}: volume {candidate.volume}, {len(candidate.cells)} cells")
+
+    seed = load_any(args.program, args.name)
+    try:
+        result = search(seed, tests, args.generations, args.population, args.keep, args.max_ticks,
+                        args.workers, args.seed, report)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    best = result.best[0]
+    print(f"Best volume {best.volume} with {len(best.cells)} cells:")
+    print(format_program(best.board()), end='')
+    print(f"{result.evaluated} evaluated ({result.failed} failed, {result.pruned} pruned), "
+          f"{result.duplicates} duplicates skipped in {result.elapsed:.1f}s")
+    if args.out:
+        save_program(best.board(), args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,111 +3,212 @@ Simulator class for executing 3D language programs.
 """
 
 from .board import Board
+from .history import BoardHistory, span_hash
 from .operators import OperatorProcessor
+from .tracing import tracer, ERROR, INFO, DEBUG
+from .vector_engine import VectorProcessor
+
+# Operator processors selectable with Simulator(engine=...)
+ENGINES = {
+    'scalar': OperatorProcessor,
+    'numpy': VectorProcessor,
+}
 
 class Simulator:
-    def __init__(self, board, input_a=0, input_b=0):
-        print(f"Initializing simulator with board containing {len(board.get_all_cells())} cells")  # Debug log
-        
+    def __init__(self, board, input_a=0, input_b=0, incremental=True, engine='scalar'):
         self.input_a = input_a
         self.input_b = input_b
         
         # Work with the same board object, not a copy
         self.board = board
         self.tick = 1
+        self.peak_tick = 1  # highest tick reached; warps only lower self.tick
         self.running = False
         self.submitted_value = None
         self.max_ticks = 1000000
+        self.stop_reason = None  # 'submitted', 'deadlock', 'cycle', 'error' or 'max_ticks'
+        self.error = None
+        
+        # Stop as soon as the run repeats a state, compared by 64-bit hash
+        self.detect_cycles = True
+        self.cycle_period = None  # steps per repetition once a cycle is found
+        self._reset_cycle_detection()
+        
+        # Only re-examine operators next to cells touched in the previous tick
+        self.incremental = incremental
+        self._active = None  # None means the next tick needs a full scan
+        
+        # The operations for the next tick are collected once, at the end of
+        # the previous step, and serve both the deadlock check and the step
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
+        self.processor = ENGINES[engine](self.board)
+        self._pending_ready = False
+        self.evaluations = 0  # number of operator evaluation passes
+        self.examined = 0  # operators examined over all of those passes
+        self.ticks_applied = 0  # including ticks a time warp later undid
         
         # Store initial board WITHOUT replacing A, B
         self.initial_board = self.board.copy()
-        self.history = [self.board.copy()]
+        self.history = BoardHistory(self.board)
+        self._unrecorded = set()  # cells changed outside of ticks, e.g. input replacement
+        
+        # Cells changed since a front end last asked, see take_dirty()
+        self.track_dirty = False
+        self._dirty = set()
+        self._dirty_all = True
+        
+        # Debugging: step() returns False without stopping the run when it
+        # reaches a breakpoint tick or a tick writes or removes a watched cell
+        self.breakpoints = set()  # ticks
+        self.watches = set()  # (x, y)
+        self.break_reason = None  # 'breakpoint' or 'watch' after such a pause
+        self.break_cells = set()  # watched cells the pausing tick changed
+        self._next_break = None  # first breakpoint not yet reached, see set_breakpoint()
+        
+        # A StatsRecorder (see app.stats) handed every tick as it is applied
+        self.stats = None
         
-        print(f"Simulator initialized with {len(self.board.get_all_cells())} cells")  # Debug log
+        if tracer.tick >= INFO:
+            tracer.emit('tick', INFO, "simulator initialized", cells=len(self.board.grid))
     
     def _replace_inputs(self):
         """Replace A and B tokens with actual input values."""
-        print(f"Replacing inputs: A={self.input_a}, B={self.input_b}")  # Debug log
         replaced_count = 0
-        for x, y, value in self.board.get_all_cells():
-            if value == 'A':
-                print(f"Replacing A at ({x}, {y}) with {self.input_a}")  # Debug log
-                self.board.set_cell(x, y, self.input_a)
+        for token, value in (('A', self.input_a), ('B', self.input_b)):
+            for x, y in self.board.positions(token):
+                self.board.set_cell(x, y, value)
+                self._unrecorded.add((x, y))
                 replaced_count += 1
-            elif value == 'B':
-                print(f"Replacing B at ({x}, {y}) with {self.input_b}")  # Debug log
-                self.board.set_cell(x, y, self.input_b)
-                replaced_count += 1
-        print(f"Replaced {replaced_count} input tokens")  # Debug log
+        if self.track_dirty:
+            self._dirty.update(self._unrecorded)
+        if tracer.tick >= INFO:
+            tracer.emit('tick', INFO, "inputs replaced", a=self.input_a, b=self.input_b, count=replaced_count)
     
     def step(self):
-        """Execute one tick of the simulation."""
-        print(f"Step called - tick: {self.tick}, running: {self.running}, submitted: {self.submitted_value}")  # Debug log
+        """Execute one tick of the simulation.
+        
+        Returns False when the run stops or pauses at a breakpoint or watch.
+        """
+        if not self.advance():
+            return False
+        
+        # Collect the next tick's operations and check for deadlock
+        self._evaluate_operators()
+        return self.check_reducible() and self.break_reason is None
+    
+    def advance(self):
+        """Apply the collected operations and move to the next tick.
         
+        This is the first half of step(); the caller must then collect the
+        next tick's operations and call check_reducible(). Batch runs use it
+        to collect for many simulators at once.
+        """
         if not self.running or self.submitted_value is not None:
-            print("Step aborted - not running or already submitted")  # Debug log
             return False
         
+        self.break_reason = None
+        
         if self.tick >= self.max_ticks:
-            print("Step aborted - max ticks reached")  # Debug log
+            if tracer.tick >= INFO:
+                tracer.emit('tick', INFO, "max ticks reached", tick=self.tick)
             self.running = False
+            self.stop_reason = 'max_ticks'
             return False
         
-        print(f"Processing operators at tick {self.tick}")  # Debug log
+        if tracer.tick >= DEBUG:
+            tracer.emit('tick', DEBUG, "step", tick=self.tick,
+                        board=[[x, y, value] for (x, y), value in self.board.grid.items()])
         
-        # Debug: Show current board state
-        print("Current board state:")
-        for x, y, value in self.board.get_all_cells():
-            print(f"  ({x}, {y}): {value}")
-        
-        processor = OperatorProcessor(self.board)
+        processor = self.processor
+        applied = self.tick  # the tick whose operations are applied
         
         try:
-            time_warps = processor.process_all_operators()
-            print(f"Operators processed - writes: {len(processor.pending_writes)}, removes: {len(processor.pending_removes)}")  # Debug log
+            if not self._pending_ready:
+                self._evaluate_operators()
+            self._pending_ready = False
+            time_warps = processor.apply_operations()
+            self.ticks_applied += 1
+            if tracer.tick >= DEBUG:
+                tracer.emit('tick', DEBUG, "operators applied", tick=self.tick,
+                            writes=len(processor.pending_writes), removes=len(processor.pending_removes))
             
             # Check for submission
             if self._check_submission():
-                print("Submission detected!")  # Debug log
+                if self.track_dirty:
+                    self._dirty.update(self._changed_positions(processor))
+                if self.stats is not None:
+                    self.stats.record(self, applied, len(processor.pending_writes), len(processor.pending_removes),
+                                      submitted=True)
                 self.running = False
+                self.stop_reason = 'submitted'
                 return False
             
             # Handle time warps
             if time_warps:
-                print(f"Time warp detected: {time_warps[0]}")  # Debug log
-                self._handle_time_warp(time_warps[0])
+                changed = self._handle_time_warp(time_warps[0], self._changed_positions(processor))
+                if self.breakpoints:
+                    self._next_break = self._first_breakpoint(self.tick)
             else:
                 # Normal progression
                 self.tick += 1
-                self.history.append(self.board.copy())
-                print(f"Advanced to tick {self.tick}")  # Debug log
+                if self.tick > self.peak_tick:
+                    self.peak_tick = self.tick
+                changed = self._changed_positions(processor)
+                self.history.append(self.board, changed)
+            self._active = changed if self.incremental else None
+            if self.track_dirty:
+                self._dirty.update(changed)
+            if self.stats is not None:
+                self.stats.record(self, applied, len(processor.pending_writes), len(processor.pending_removes),
+                                  warped=bool(time_warps))
             
-            # Check if no operators can reduce (deadlock)
-            if not self._has_reducible_operators():
-                print("No reducible operators - stopping")  # Debug log
-                self.running = False
+            # Ticks only count up between warps, so one comparison finds a
+            # breakpoint, and watches only look at the cells the tick wrote
+            if self.tick == self._next_break:
+                self._pause('breakpoint')
+                self._next_break = self._first_breakpoint(self.tick + 1)
+            if self.watches:
+                written = self._written_positions(processor, time_warps)
+                if not self.watches.isdisjoint(written):
+                    self.break_cells = self.watches.intersection(written)
+                    self._pause('watch')
+            
+            if self.detect_cycles and self._check_cycle():
                 return False
                 
         except RuntimeError as e:
-            print(f"Simulation error: {e}")
+            tracer.emit('tick', ERROR, "simulation error", tick=self.tick, error=str(e))
             self.running = False
+            self.stop_reason = 'error'
+            self.error = str(e)
             return False
         
         return True
     
+    def check_reducible(self):
+        """Stop with a deadlock if the collected operations cannot reduce."""
+        if not self._has_reducible_operators():
+            if tracer.tick >= INFO:
+                tracer.emit('tick', INFO, "no reducible operators", tick=self.tick)
+            self.running = False
+            self.stop_reason = 'deadlock'
+            return False
+        return True
+    
     def _check_submission(self):
         """Check if any S operator has been overwritten."""
         submitted_values = []
         
-        # Check all positions that had S in the original board (before A,B replacement)
-        for x, y, value in self.initial_board.get_all_cells():
-            if value == 'S':
-                # Check what's at this position now
-                current_value = self.board.get_cell(x, y)
-                if current_value != 'S':
-                    # S has been overwritten
-                    print(f"S at ({x}, {y}) overwritten with {current_value}")  # Debug log
-                    submitted_values.append(current_value)
+        # Check all positions that had S in the original board (before A,B
+        # replacement); the initial board never changes, so its index stays
+        for x, y in self.initial_board.index.tokens['S']:
+            # Check what's at this position now
+            current_value = self.board.get_cell(x, y)
+            if current_value != 'S':
+                # S has been overwritten
+                submitted_values.append(current_value)
         
         if submitted_values:
             # Check for multiple different submissions
@@ -116,75 +217,248 @@ class Simulator:
                 raise RuntimeError(f"Multiple different values submitted: {unique_values}")
             
             self.submitted_value = submitted_values[0]
-            print(f"Submitted value: {self.submitted_value}")  # Debug log
+            if tracer.tick >= INFO:
+                tracer.emit('tick', INFO, "submitted", tick=self.tick, value=self.submitted_value)
             return True
         
         return False
     
-    def _handle_time_warp(self, time_warp):
-        """Handle time warp operation."""
-        at_x, at_y, dx, dy, dt, value = time_warp
+    def _check_cycle(self):
+        """Stop if the run has entered a cycle.
         
-        print(f"Handling time warp: @({at_x},{at_y}) dx={dx} dy={dy} dt={dt} v={value}")  # Debug log
+        A state is the board plus the history a warp could still restore.
+        Ticks before the lowest point rewound to since a saved step are never
+        read again, so if the current history ends with the same run of
+        boards as the saved step's history did from that point on, every
+        later step repeats too. The history's span hashes find candidates,
+        which are then confirmed exactly, so a hash collision can never stop
+        a run. The saved step is renewed at steps 1, 2, 4, 8, ... (Brent's
+        algorithm), so only one is kept and a cycle is found within about
+        twice its start plus its period.
+        """
+        self._cycle_steps += 1
+        history = self.history
+        length = len(history)
+        
+        if self._cycle_mark is not None:
+            saved_length, saved_prefix, saved_deltas = self._cycle_mark
+            span = saved_length - self._cycle_low + 1
+            # A warp clamped at tick 1 depends on the absolute tick, so then
+            # only an identical history counts
+            if self._cycle_clamped:
+                comparable = length == saved_length
+            else:
+                comparable = length >= saved_length
+            if comparable:
+                saved = span_hash(history.prefix_hash(saved_length - span), saved_prefix, span)
+                current = span_hash(history.prefix_hash(length - span), history.prefix_hash(), span)
+                if saved == current and self._same_span(saved_deltas, saved_length, span):
+                    self.running = False
+                    self.stop_reason = 'cycle'
+                    self.cycle_period = self._cycle_steps
+                    if tracer.tick >= INFO:
+                        tracer.emit('tick', INFO, "cycle detected", tick=self.tick, period=self.cycle_period)
+                    return True
+        
+        if self._cycle_steps == self._cycle_power:
+            self._cycle_mark = (length, history.prefix_hash(), history.deltas())
+            self._cycle_low = length
+            self._cycle_clamped = False
+            self._cycle_power *= 2
+            self._cycle_steps = 0
+        return False
+    
+    def _same_span(self, saved_deltas, saved_length, span):
+        """Whether the last span boards equal those the saved step ended with.
+        
+        Both runs start from the same tick, one below the lowest point
+        rewound to, and the saved step's deltas were kept, so comparing the
+        two starting boards and the deltas after them is exact.
+        """
+        history = self.history
+        length = len(history)
+        saved_start = saved_length - span
+        start = length - span
+        if saved_deltas[saved_start:saved_length - 1] != history.deltas(start, length - 1):
+            return False
+        return history[saved_start].grid == history[start].grid
+    
+    def _pause(self, reason):
+        self.break_reason = reason
+        if reason != 'watch':
+            self.break_cells = set()
+        if tracer.tick >= INFO:
+            tracer.emit('tick', INFO, "paused", tick=self.tick, reason=reason,
+                        cells=sorted(self.break_cells))
+    
+    def set_breakpoint(self, tick, enabled=True):
+        """Add or remove a breakpoint that pauses the run on reaching a tick."""
+        if enabled:
+            self.breakpoints.add(tick)
+        else:
+            self.breakpoints.discard(tick)
+        self._next_break = self._first_breakpoint(self.tick + 1)
+    
+    def set_watch(self, x, y, enabled=True):
+        """Add or remove a watch that pauses the run when a tick changes a cell."""
+        if enabled:
+            self.watches.add((x, y))
+        else:
+            self.watches.discard((x, y))
+    
+    def skip_dead_operators(self, analysis=None):
+        """Leave out the operators that can never fire in a run of the initial board.
+        
+        Uses the given Analysis of the initial board, or analyses it; returns
+        the Analysis. An unbounded one leaves every operator in. Runs are
+        unchanged, but the scalar engine no longer examines dead operators
+        each tick; the numpy engine evaluates every cell in any case.
+        """
+        if analysis is None:
+            from .analysis import analyse  # app.analysis runs as a script too
+            analysis = analyse(self.initial_board)
+        self.processor.program.live = analysis.live
+        self.processor.program.recompile()
+        return analysis
+    
+    def _first_breakpoint(self, tick):
+        """The lowest breakpoint at or after a tick, or None."""
+        return min((t for t in self.breakpoints if t >= tick), default=None)
+    
+    def _reset_cycle_detection(self):
+        self._cycle_mark = None  # (history length, prefix hash) at the saved step
+        self._cycle_low = 0  # shortest history length rewound to since then
+        self._cycle_clamped = False  # a warp since then was clamped at tick 1
+        self._cycle_power = 1
+        self._cycle_steps = 0
+    
+    def _changed_positions(self, processor):
+        """Positions changed since the last recorded tick."""
+        positions = self._unrecorded
+        self._unrecorded = set()
+        positions.update(processor.pending_removes)
+        positions.update((x, y) for x, y, value in processor.pending_writes)
+        return positions
+    
+    def _written_positions(self, processor, time_warps):
+        """Positions the applied tick wrote or removed, including a warp target.
+        
+        Unlike _changed_positions() this leaves out input replacement and the
+        cells a warp restored from history.
+        """
+        positions = set(processor.pending_removes)
+        positions.update((x, y) for x, y, value in processor.pending_writes)
+        if time_warps:
+            at_x, at_y, dx, dy, dt, value = time_warps[0]
+            positions.add((at_x - dx, at_y - dy))
+        return positions
+    
+    def _handle_time_warp(self, time_warp, dirty=()):
+        """Handle time warp operation. Returns the positions it changed."""
+        at_x, at_y, dx, dy, dt, value = time_warp
         
         target_time = self.tick - dt
         if target_time < 1:
             target_time = 1
+            self._cycle_clamped = True  # depends on the absolute tick
         
-        print(f"Time warping from tick {self.tick} to tick {target_time}")  # Debug log
-        
-        # Restore board to target time
-        if target_time <= len(self.history):
-            self.board = self.history[target_time - 1].copy()
-        else:
-            # This shouldn't happen, but handle gracefully
-            self.board = self.history[-1].copy()
+        # Restore board to target time in place, dropping later history
+        target_time = min(target_time, len(self.history))
+        self._cycle_low = min(self._cycle_low, target_time)
+        changed = self.history.rewind(self.board, target_time, dirty)
         
         # Calculate target position relative to @ operator position
         target_x = at_x - dx  # Note: negative dx means left of @
         target_y = at_y - dy  # Note: negative dy means above @
         
-        print(f"Writing value {value} to position ({target_x}, {target_y})")  # Debug log
+        if tracer.warp >= INFO:
+            tracer.emit('warp', INFO, "time warp", at=(at_x, at_y), dx=dx, dy=dy, dt=dt, value=value,
+                        from_tick=self.tick, to_tick=target_time, target=(target_x, target_y))
         self.board.set_cell(target_x, target_y, value)
         
-        # Truncate history and restart from this point
-        self.history = self.history[:target_time]
-        self.history.append(self.board.copy())
+        # Restart from this point
+        self.history.append(self.board, [(target_x, target_y)])
         self.tick = target_time + 1
         
-        print(f"Time warp complete, now at tick {self.tick}")  # Debug log
+        changed.add((target_x, target_y))
+        return changed
+    
+    def _evaluate_operators(self):
+        """Collect the operations for the next tick from the current board."""
+        self.processor.collect_operations(self._active)
+        self._operations_collected()
+    
+    def _operations_collected(self):
+        """Record that the processor holds the operations for the next tick."""
+        self._pending_ready = True
+        self.evaluations += 1
+        self.examined += self.processor.examined
     
     def _has_reducible_operators(self):
         """Check if any operator on the board can reduce."""
-        processor = OperatorProcessor(self.board.copy())
-        try:
-            time_warps = processor.process_all_operators()
-            # If we have pending operations or time warps, something can reduce
-            return (len(processor.pending_writes) > 0 or 
-                   len(processor.pending_removes) > 0 or 
-                   len(time_warps) > 0)
-        except:
-            return False
+        # Uses the operations already collected for the next tick; a tick
+        # that would fail to apply counts as unable to reduce
+        return self.processor.has_operations() and not self.processor.has_conflicts()
     
     def reset(self):
         """Reset simulation to initial state."""
-        print(f"Resetting simulator - initial board has {len(self.initial_board.get_all_cells())} cells")  # Debug log
-        
         # Clear current board and copy from initial board (with A, B tokens)
         self.board.clear()
         for x, y, value in self.initial_board.get_all_cells():
             self.board.set_cell(x, y, value)
         
+        self._reset_run_state()
+        
+        if tracer.tick >= INFO:
+            tracer.emit('tick', INFO, "reset", cells=len(self.board.grid))
+    
+    def rebase(self):
+        """Adopt the current board as the initial program and reset state."""
+        self.initial_board = self.board.copy()
+        self.processor.program.live = None  # the analysis was of the old program
+        self._reset_run_state()
+    
+    def _reset_run_state(self):
+        """Return to tick 1 of the current board, forgetting the previous run."""
         self.tick = 1
-        self.history = [self.board.copy()]
+        self.peak_tick = 1
+        self.history = BoardHistory(self.board)
+        self._unrecorded = set()
+        self._active = None
+        self._pending_ready = False
+        self.evaluations = 0
+        self.examined = 0
+        self.ticks_applied = 0
         self.running = False
         self.submitted_value = None
+        self.stop_reason = None
+        self.error = None
+        self.cycle_period = None
+        self._reset_cycle_detection()
+        self._dirty_all = True
+        self.break_reason = None
+        self.break_cells = set()
+        self._next_break = self._first_breakpoint(2)
+    
+    def take_dirty(self):
+        """Return the cells changed since the previous call, or None for all of them.
         
-        print(f"After reset - board has {len(self.board.get_all_cells())} cells")  # Debug log
+        The first call turns tracking on and returns None; so does any call
+        after a reset, when the whole board may have changed.
+        """
+        self.track_dirty = True
+        if self._dirty_all:
+            self._dirty_all = False
+            self._dirty.clear()
+            return None
+        dirty = self._dirty
+        self._dirty = set()
+        return dirty
     
     def start(self):
         """Start the simulation."""
-        print("Starting simulation - replacing A, B with input values")  # Debug log
+        self._active = None
+        self._pending_ready = False
         self._replace_inputs()
         self.running = True
     
@@ -194,35 +468,20 @@ class Simulator:
     
     def set_inputs(self, input_a, input_b):
         """Set input values and reset simulation."""
-        print(f"Setting inputs: A={input_a}, B={input_b}")  # Debug log
         self.input_a = input_a
         self.input_b = input_b
         self.reset()
     
     def get_spacetime_volume(self):
         """Calculate spacetime volume (for scoring)."""
-        if not self.history:
-            return 0
-        
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-        max_t = len(self.history)
-        
-        for board in self.history:
-            if board.grid:
-                xs = [x for x, y in board.grid.keys()]
-                ys = [y for x, y in board.grid.keys()]
-                
-                min_x = min(min_x, min(xs))
-                max_x = max(max_x, max(xs))
-                min_y = min(min_y, min(ys))
-                max_y = max(max_y, max(ys))
-        
-        if min_x == float('inf'):  # No cells ever used
+        # The history keeps running bounds, so this is O(1) per call
+        bounds = self.history.bounds()
+        if bounds is None:  # No cells ever used
             return 0
         
+        min_x, max_x, min_y, max_y = bounds
         vx = max_x - min_x + 1
         vy = max_y - min_y + 1
-        vt = max_t
+        vt = len(self.history)
         
         return vx * vy * vt
@@ -0,0 +1,168 @@
+"""
+Per-tick statistics of simulator runs, streamed to CSV or a columnar file.
+
+Attach a StatsRecorder to Simulator.stats and it records one row per tick
+applied, with the size of that tick's write and remove sets; the live cell count
+and bounding box come from the board index and the volume from the
+history's running bounds, so recording never scans the board. Rows are
+buffered and written out every buffer_rows ticks, so a long run holds one
+buffer in memory, not its whole table.
+
+    python -m app.headless program.3d -a 3 -b 4 --stats run.csv
+    python -m app.headless program.3d --stats run.cols
+    python -m app.stats run.cols > run.csv
+
+The columnar format starts with MAGIC, a u16 column count and each column
+name as a u8 length and ASCII bytes. Blocks follow, each a u32 row count
+and then that many little-endian int64 values for every column in turn.
+"""
+
+import argparse
+import csv
+import struct
+import sys
+from array import array
+
+# Recorded per tick applied. tick is the tick whose operations the row
+# applied, so after a time warp the rows go back and repeat earlier ticks.
+# submitted is 1 for the tick that submitted, warped for a tick that ended
+# in a time warp, and warps counts those so far. The other columns describe
+# the board after the tick; the bounds are all 0 while it is empty
+COLUMNS = ('tick', 'cells', 'writes', 'removes', 'submitted', 'warped', 'warps',
+           'min_x', 'max_x', 'min_y', 'max_y', 'volume')
+
+MAGIC = b'3DSTATS1'
+FORMATS = ('csv', 'columns')
+
+
+class StatsRecorder:
+    def __init__(self, writer, buffer_rows=4096):
+        self.writer = writer
+        self.buffer_rows = buffer_rows
+        self.rows = 0  # rows recorded, written or not
+        self.warps = 0
+        self._rows = []
+
+    def record(self, simulator, tick, writes, removes, submitted=False, warped=False):
+        """Add the row for a tick the simulator has just applied."""
+        self.warps += warped
+        bounds = simulator.board.index.bounds() or (0, 0, 0, 0)
+        rows = self._rows
+        rows.append((tick, len(simulator.board.grid), writes, removes, int(submitted), int(warped), self.warps,
+                     *bounds, simulator.get_spacetime_volume()))
+        self.rows += 1
+        if len(rows) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows, handed to the writer as one array per column."""
+        if self._rows:
+            self.writer.write([array('q', column) for column in zip(*self._rows)])
+            self._rows = []
+
+    def close(self):
+        """Write the buffered rows and close the writer."""
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvStatsWriter:
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', buffering=1 << 16)
+        self._csv = csv.writer(self._file, lineterminator='\n')
+        self._csv.writerow(COLUMNS)
+
+    def write(self, columns):
+        """Append rows given as one array per column."""
+        self._csv.writerows(zip(*columns))
+
+    def close(self):
+        self._file.close()
+
+
+class ColumnarStatsWriter:
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC + struct.pack('<H', len(COLUMNS)))
+        for name in COLUMNS:
+            self._file.write(struct.pack('<B', len(name)) + name.encode('ascii'))
+
+    def write(self, columns):
+        """Append a block of rows given as one array per column."""
+        self._file.write(struct.pack('<I', len(columns[0])))
+        for column in columns:
+            if sys.byteorder == 'big':
+                column = array('q', column)
+                column.byteswap()
+            self._file.write(column.tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+def open_stats(path, fmt=None, buffer_rows=4096):
+    """Return a StatsRecorder writing to path.
+
+    The format is 'csv' or 'columns'; by default a .csv path gets CSV and
+    anything else the columnar format.
+    """
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'columns'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown stats format: {fmt}")
+    writer = CsvStatsWriter(path) if fmt == 'csv' else ColumnarStatsWriter(path)
+    return StatsRecorder(writer, buffer_rows)
+
+
+def read_columns(path):
+    """Read a columnar stats file into {column name: array of int64}."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"Not a columnar stats file: {path}")
+    offset = len(MAGIC)
+    (count,) = struct.unpack_from('<H', data, offset)
+    offset += 2
+    names = []
+    for _ in range(count):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode('ascii'))
+        offset += 1 + length
+
+    columns = {name: array('q') for name in names}
+    while offset < len(data):
+        (rows,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        for name in names:
+            end = offset + 8 * rows
+            if end > len(data):
+                raise ValueError(f"Truncated columnar stats file: {path}")
+            block = array('q', data[offset:end])
+            if sys.byteorder == 'big':
+                block.byteswap()
+            columns[name].extend(block)
+            offset = end
+    return columns
+
+
+def main(argv=None):
+    """Command line entry point: print a columnar stats file as CSV."""
+    parser = argparse.ArgumentParser(description="Print a columnar stats file as CSV.")
+    parser.add_argument('path', help="file written with --stats in the columnar format")
+    args = parser.parse_args(argv)
+
+    columns = read_columns(args.path)
+    out = csv.writer(sys.stdout, lineterminator='\n')
+    out.writerow(columns)
+    out.writerows(zip(*columns.values()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Tracing for the 3D language simulator.
+
+Events are grouped into categories (tick, operator, warp, ui), each with its
+own level. Call sites check the category level before building an event, so
+a disabled category costs one attribute lookup and comparison:
+
+    if tracer.operator >= DEBUG:
+        tracer.emit('operator', DEBUG, "process", x=x, y=y, op=op)
+
+Emitted events are kept in an in-memory ring buffer and can also be written
+to a file sink as JSON lines. The SIM3D_TRACE environment variable sets the
+levels at startup (e.g. "tick,warp:debug" or "all:info") and SIM3D_TRACE_FILE
+opens a sink.
+"""
+
+import atexit
+import json
+import os
+import time
+from collections import deque
+from typing import NamedTuple
+
+OFF = 0
+ERROR = 1
+INFO = 2
+DEBUG = 3
+
+LEVELS = {'off': OFF, 'error': ERROR, 'info': INFO, 'debug': DEBUG}
+CATEGORIES = ('tick', 'operator', 'warp', 'ui')
+
+
+class TraceEvent(NamedTuple):
+    seq: int
+    time: float
+    category: str
+    level: int
+    message: str
+    fields: dict
+
+    def as_dict(self):
+        """Return the event as a JSON-serialisable dict."""
+        return {
+            'seq': self.seq,
+            'time': self.time,
+            'category': self.category,
+            'level': self.level,
+            'message': self.message,
+            **self.fields,
+        }
+
+
+class Tracer:
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+        self.sink = None
+        self._seq = 0
+
+        # One attribute per category holding its current level
+        self.tick = ERROR
+        self.operator = ERROR
+        self.warp = ERROR
+        self.ui = ERROR
+
+    def set_level(self, category, level):
+        """Set the level of one category, or of all of them with 'all'."""
+        if isinstance(level, str):
+            level = LEVELS[level.lower()]
+        categories = CATEGORIES if category == 'all' else (category,)
+        for name in categories:
+            if name not in CATEGORIES:
+                raise ValueError(f"Unknown trace category: {name}")
+            setattr(self, name, level)
+
+    def configure(self, spec):
+        """Set levels from a spec such as "tick,warp:debug" or "all:info".
+
+        A category without a level is set to INFO.
+        """
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            category, _, level = item.partition(':')
+            self.set_level(category, level or INFO)
+
+    def open_sink(self, path):
+        """Also append emitted events to a file as JSON lines."""
+        self.close_sink()
+        self.sink = open(path, 'a')
+
+    def close_sink(self):
+        """Close the file sink, if any."""
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def emit(self, category, level, message, **fields):
+        """Record an event if its category is enabled at this level."""
+        if getattr(self, category) < level:
+            return
+        self._seq += 1
+        event = TraceEvent(self._seq, time.monotonic(), category, level, message, fields)
+        self.events.append(event)
+        if self.sink is not None:
+            self.sink.write(json.dumps(event.as_dict(), default=str) + '\n')
+
+    def recent(self, category=None, limit=None):
+        """Return buffered events, oldest first, optionally filtered."""
+        events = [e for e in self.events if category is None or e.category == category]
+        if limit is not None:
+            events = events[-limit:]
+        return events
+
+    def clear(self):
+        """Drop all buffered events."""
+        self.events.clear()
+
+
+tracer = Tracer()
+tracer.configure(os.environ.get('SIM3D_TRACE', ''))
+if os.environ.get('SIM3D_TRACE_FILE'):
+    tracer.open_sink(os.environ['SIM3D_TRACE_FILE'])
+atexit.register(tracer.close_sink)
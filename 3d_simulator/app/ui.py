@@ -3,7 +3,44 @@ UI class for the 3D language simulator using pygame.
 """
 
 import pygame
-import sys
+from collections import OrderedDict
+
+from .tracing import tracer, INFO, DEBUG
+
+# Cell sizes in pixels the view can zoom between
+ZOOM_LEVELS = (2, 3, 4, 6, 8, 12, 16, 20, 24, 32, 40, 48, 64, 80)
+# Below this cell size cells are drawn as plain coloured blocks, without text
+LOD_CELL_SIZE = 16
+
+COLORS = {
+    'background': (240, 240, 240),
+    'grid_line': (200, 200, 200),
+    'cell_empty': (255, 255, 255),
+    'cell_number': (200, 230, 255),
+    'cell_operator': (255, 200, 200),
+    'cell_input': (200, 255, 200),
+    'cell_output': (255, 255, 150),
+    'cell_selected': (150, 150, 255),
+    'text': (0, 0, 0),
+    'button': (220, 220, 220),
+    'button_hover': (200, 200, 200),
+    'watch': (255, 140, 0),
+    'breakpoint': (220, 0, 0)
+}
+
+
+def cell_color(value, colors=COLORS):
+    """Fill colour of a cell holding a value (None for empty)."""
+    if value is None:
+        return colors['cell_empty']
+    elif isinstance(value, int):
+        return colors['cell_number']
+    elif value in ['A', 'B']:
+        return colors['cell_input']
+    elif value == 'S':
+        return colors['cell_output']
+    else:
+        return colors['cell_operator']
 
 class UI:
     def __init__(self, screen_width=1000, screen_height=700):
@@ -15,19 +52,7 @@ class UI:
         pygame.display.set_caption("3D Language Simulator")
         
         # Colors
-        self.colors = {
-            'background': (240, 240, 240),
-            'grid_line': (200, 200, 200),
-            'cell_empty': (255, 255, 255),
-            'cell_number': (200, 230, 255),
-            'cell_operator': (255, 200, 200),
-            'cell_input': (200, 255, 200),
-            'cell_output': (255, 255, 150),
-            'cell_selected': (150, 150, 255),
-            'text': (0, 0, 0),
-            'button': (220, 220, 220),
-            'button_hover': (200, 200, 200)
-        }
+        self.colors = dict(COLORS)
         
         # Layout
         self.control_panel_height = 60
@@ -35,16 +60,25 @@ class UI:
         self.grid_area_y = self.control_panel_height
         self.grid_area_height = screen_height - self.control_panel_height - self.status_panel_height
         
-        # Grid settings
+        # Camera: the screen position of cell (0, 0) and the zoom, as a cell size
         self.cell_size = 40
         self.grid_offset_x = 50
         self.grid_offset_y = self.grid_area_y + 20
+        self.timeline_height = 24
+        self.view_rect = pygame.Rect(0, self.grid_area_y, screen_width,
+                                     self.grid_area_height - self.timeline_height)
+        self.timeline_rect = pygame.Rect(0, self.view_rect.bottom, screen_width, self.timeline_height)
+        self._drag_origin = None  # mouse position while panning with the right button
         
         # Fonts
         self.font_small = pygame.font.Font(None, 20)
         self.font_medium = pygame.font.Font(None, 24)
         self.font_large = pygame.font.Font(None, 32)
         
+        # Rendered text surfaces, least recently used first
+        self._text_cache = OrderedDict()  # {(font, text, colour): surface}
+        self.text_cache_size = 512
+        
         # UI state
         self.selected_cell = None
         self.input_mode = False
@@ -63,6 +97,26 @@ class UI:
         }
         
         self.clock = pygame.time.Clock()
+        
+        # Dirty-region rendering: only changed cells and panels are redrawn
+        # on top of a cached surface with the static grid
+        self._grid_surface = None
+        self._grid_surface_size = None  # cell size the grid surface was drawn for
+        self._rendered_simulator = None
+        self._dirty_cells = set()
+        self._full_redraw = True
+        self._control_state = None
+        self._status_state = None
+        self._timeline_state = None
+        
+        # Timeline: the past tick being viewed, or None for the live board
+        self.view_tick = None
+        self._view_board = None
+        self._view_history = None  # history and tick id the view was built from
+        self._view_id = None
+        self._scrubbing = False
+        
+        self._watches = set()  # the engine's watched cells, outlined when drawn
     
     def handle_events(self, game_engine):
         """Handle pygame events."""
@@ -79,78 +133,126 @@ class UI:
                     # Check button clicks
                     for button_name, rect in self.buttons.items():
                         if rect.collidepoint(mouse_x, mouse_y):
-                            print(f"Button clicked: {button_name}")  # Debug log
+                            tracer.emit('ui', DEBUG, "button clicked", button=button_name)
                             events.append(('button', button_name))
                             break
                     else:
+                        if self.timeline_rect.collidepoint(mouse_x, mouse_y):
+                            self._scrubbing = True
+                            self._scrub(game_engine, mouse_x)
+                        
                         # Check grid clicks
                         grid_x, grid_y = self._screen_to_grid(mouse_x, mouse_y)
-                        if grid_x is not None and grid_y is not None:
-                            print(f"Cell clicked: ({grid_x}, {grid_y})")  # Debug log
-                            self.selected_cell = (grid_x, grid_y)
+                        if grid_x is not None and grid_y is not None and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                            events.append(('watch', grid_x, grid_y))
+                            self._dirty_cells.add((grid_x, grid_y))
+                        elif grid_x is not None and grid_y is not None:
+                            tracer.emit('ui', DEBUG, "cell clicked", x=grid_x, y=grid_y)
+                            self.seek(None)  # only the live board can be edited
+                            self._select((grid_x, grid_y))
                             self.input_mode = True
                             self.input_text = ""
                             
                             # Get current cell value
                             current_value = game_engine.board.get_cell(grid_x, grid_y)
-                            print(f"Current cell value: {current_value}")  # Debug log
                             if current_value is not None:
                                 self.input_text = str(current_value)
+                
+                elif event.button in (2, 3) and self.view_rect.collidepoint(event.pos):
+                    self._drag_origin = event.pos
+            
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button in (2, 3):
+                    self._drag_origin = None
+                elif event.button == 1:
+                    self._scrubbing = False
+            
+            elif event.type == pygame.MOUSEMOTION:
+                if self._scrubbing:
+                    self._scrub(game_engine, event.pos[0])
+                elif self._drag_origin is not None:
+                    self.pan(event.pos[0] - self._drag_origin[0], event.pos[1] - self._drag_origin[1])
+                    self._drag_origin = event.pos
+            
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_pos = pygame.mouse.get_pos()
+                if self.view_rect.collidepoint(mouse_pos):
+                    self.zoom(event.y, mouse_pos)
             
             elif event.type == pygame.KEYDOWN:
                 if self.input_mode and self.selected_cell:
-                    print(f"Key pressed in input mode: {event.key}, char: '{event.unicode}'")  # Debug log
+                    tracer.emit('ui', DEBUG, "key pressed", key=event.key, char=event.unicode, input_mode=True)
                     if event.key == pygame.K_RETURN:
-                        print("Enter key - committing input")  # Debug log
                         # Commit input
                         self._commit_cell_input(game_engine)
                     elif event.key == pygame.K_ESCAPE:
-                        print("Escape key - canceling input")  # Debug log
                         # Cancel input
                         self.input_mode = False
-                        self.selected_cell = None
+                        self._select(None)
                         self.input_text = ""
                     elif event.key == pygame.K_BACKSPACE:
                         self.input_text = self.input_text[:-1]
-                        print(f"Backspace - input text now: '{self.input_text}'")  # Debug log
                     elif event.key == pygame.K_DELETE:
                         self.input_text = ""
-                        print("Delete - input text cleared")  # Debug log
                     else:
                         # Add character to input
                         char = event.unicode
                         if char and len(self.input_text) < 10:
                             self.input_text += char
-                            print(f"Added char '{char}' - input text now: '{self.input_text}'")  # Debug log
+                    self._dirty_cells.add(self.selected_cell)
                 else:
                     # Global hotkeys
-                    print(f"Key pressed: {event.key}")  # Debug log
+                    tracer.emit('ui', DEBUG, "key pressed", key=event.key, input_mode=False)
                     if event.key == pygame.K_SPACE:
-                        print("Space key detected!")  # Debug log
                         events.append(('button', 'step'))
                     elif event.key == pygame.K_r:
-                        print("R key detected!")  # Debug log
                         events.append(('button', 'reset'))
+                    elif event.key == pygame.K_s and event.mod & pygame.KMOD_CTRL:
+                        events.append(('save',))
                     elif event.key == pygame.K_s:
-                        print("S key detected!")  # Debug log
                         events.append(('button', 'start'))
+                    elif event.key == pygame.K_RIGHTBRACKET:
+                        events.append(('speed', 1))
+                    elif event.key == pygame.K_LEFTBRACKET:
+                        events.append(('speed', -1))
+                    elif event.key == pygame.K_t:
+                        events.append(('turbo',))
+                    elif event.key == pygame.K_COMMA:
+                        self.seek(self._shown_tick(game_engine) - 1)
+                    elif event.key == pygame.K_PERIOD and self.view_tick is not None:
+                        self.seek(self.view_tick + 1)
+                    elif event.key == pygame.K_END:
+                        self.seek(None)
+                    elif event.key == pygame.K_b:
+                        events.append(('breakpoint', self._shown_tick(game_engine)))
+                    elif event.key == pygame.K_f:
+                        self.fit_view(game_engine.board)
+                    elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                        self.zoom(1)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        self.zoom(-1)
+                    elif event.key in self._PAN_KEYS:
+                        dx, dy = self._PAN_KEYS[event.key]
+                        self.pan(dx * self.view_rect.width // 4, dy * self.view_rect.height // 4)
         
         return events
     
+    # Arrow keys pan the view by a quarter of its size
+    _PAN_KEYS = {
+        pygame.K_LEFT: (1, 0),
+        pygame.K_RIGHT: (-1, 0),
+        pygame.K_UP: (0, 1),
+        pygame.K_DOWN: (0, -1),
+    }
+    
     def _screen_to_grid(self, screen_x, screen_y):
         """Convert screen coordinates to grid coordinates."""
-        if (screen_y < self.grid_offset_y or 
-            screen_x < self.grid_offset_x):
+        if not self.view_rect.collidepoint(screen_x, screen_y):
             return None, None
         
         grid_x = (screen_x - self.grid_offset_x) // self.cell_size
         grid_y = (screen_y - self.grid_offset_y) // self.cell_size
-        
-        # Limit to reasonable bounds
-        if 0 <= grid_x < 25 and 0 <= grid_y < 15:
-            return grid_x, grid_y
-        
-        return None, None
+        return grid_x, grid_y
     
     def _grid_to_screen(self, grid_x, grid_y):
         """Convert grid coordinates to screen coordinates."""
@@ -158,71 +260,241 @@ class UI:
         screen_y = self.grid_offset_y + grid_y * self.cell_size
         return screen_x, screen_y
     
+    def pan(self, dx, dy):
+        """Move the view by a number of pixels."""
+        if dx or dy:
+            self.grid_offset_x += dx
+            self.grid_offset_y += dy
+            self.invalidate()
+    
+    def zoom(self, steps, anchor=None):
+        """Zoom in (positive steps) or out, keeping the anchor point in place.
+        
+        The anchor defaults to the centre of the view.
+        """
+        if anchor is None:
+            anchor = self.view_rect.center
+        index = min(range(len(ZOOM_LEVELS)), key=lambda i: abs(ZOOM_LEVELS[i] - self.cell_size))
+        index = max(0, min(len(ZOOM_LEVELS) - 1, index + steps))
+        self._set_zoom(ZOOM_LEVELS[index], anchor)
+    
+    def _set_zoom(self, cell_size, anchor):
+        if cell_size == self.cell_size:
+            return
+        # Scale the anchor's distance from cell (0, 0)
+        ax, ay = anchor
+        self.grid_offset_x = ax - (ax - self.grid_offset_x) * cell_size // self.cell_size
+        self.grid_offset_y = ay - (ay - self.grid_offset_y) * cell_size // self.cell_size
+        self.cell_size = cell_size
+        self.invalidate()
+    
+    def fit_view(self, board):
+        """Zoom and pan so that every cell of the board is visible, centred."""
+        min_x, max_x, min_y, max_y = board.get_bounds()
+        # Leave a cell of margin on every side
+        columns = max_x - min_x + 3
+        rows = max_y - min_y + 3
+        cell_size = ZOOM_LEVELS[0]
+        for size in ZOOM_LEVELS:
+            if columns * size <= self.view_rect.width and rows * size <= self.view_rect.height:
+                cell_size = size
+        self.cell_size = cell_size
+        
+        centre_x = self.view_rect.centerx - (max_x - min_x + 1) * cell_size // 2
+        centre_y = self.view_rect.centery - (max_y - min_y + 1) * cell_size // 2
+        self.grid_offset_x = centre_x - min_x * cell_size
+        self.grid_offset_y = centre_y - min_y * cell_size
+        self.invalidate()
+    
+    def show_board(self, board):
+        """Fit the view to the board unless all of it is visible already."""
+        min_x, max_x, min_y, max_y = board.get_bounds()
+        visible_x, visible_y = self._screen_to_grid(*self.view_rect.topleft)
+        last_x, last_y = self._screen_to_grid(self.view_rect.right - 1, self.view_rect.bottom - 1)
+        if not (visible_x <= min_x and max_x <= last_x and visible_y <= min_y and max_y <= last_y):
+            self.fit_view(board)
+    
+    def _visible_cells(self):
+        """The grid range (min_x, max_x, min_y, max_y) intersecting the view."""
+        min_x, min_y = self._screen_to_grid(*self.view_rect.topleft)
+        max_x, max_y = self._screen_to_grid(self.view_rect.right - 1, self.view_rect.bottom - 1)
+        return min_x, max_x, min_y, max_y
+    
+    def seek(self, tick):
+        """View the board as it was at a past tick; None returns to the live board."""
+        if tick is not None:
+            tick = max(1, tick)
+        if tick != self.view_tick:
+            self.view_tick = tick
+            self._view_board = None
+            self.invalidate()
+    
+    def _scrub(self, game_engine, screen_x):
+        """Seek to the tick under an x position on the timeline."""
+        track = self._timeline_track()
+        length = len(game_engine.simulator.history)
+        fraction = min(1.0, max(0.0, (screen_x - track.x) / track.width))
+        tick = 1 + round(fraction * (length - 1))
+        self.seek(None if tick >= length else tick)
+    
+    def _timeline_track(self):
+        """The slider part of the timeline, between its labels."""
+        rect = self.timeline_rect
+        return pygame.Rect(rect.x + 130, rect.y + 6, rect.width - 280, rect.height - 12)
+    
+    def _shown_tick(self, game_engine):
+        if self.view_tick is not None:
+            return self.view_tick
+        return len(game_engine.simulator.history)
+    
+    def _shown_board(self, game_engine):
+        """The board being viewed: the live one, or one rebuilt from the history."""
+        if self.view_tick is None:
+            return game_engine.board
+        
+        history = game_engine.simulator.history
+        if self.view_tick >= len(history):
+            # A reset or a time warp cut the history short of the viewed tick
+            self.seek(None)
+            return game_engine.board
+        
+        # A warp may also have rewritten the viewed tick; then its id is new
+        view_id = history.tick_id(self.view_tick - 1)
+        if self._view_board is None or history is not self._view_history or view_id != self._view_id:
+            self._view_board = history[self.view_tick - 1]
+            self._view_history = history
+            self._view_id = view_id
+            self.invalidate()
+        return self._view_board
+    
+    def _render_text(self, font, text, colour):
+        """Render text with a font, reusing the surface from an earlier call."""
+        key = (font, text, tuple(colour))
+        surface = self._text_cache.get(key)
+        if surface is not None:
+            self._text_cache.move_to_end(key)
+            return surface
+        surface = font.render(text, True, colour)
+        self._text_cache[key] = surface
+        while len(self._text_cache) > self.text_cache_size:
+            self._text_cache.popitem(last=False)
+        return surface
+    
+    def _select(self, cell):
+        """Change the selected cell, marking the old and new one for redraw."""
+        if self.selected_cell is not None:
+            self._dirty_cells.add(self.selected_cell)
+        if cell is not None:
+            self._dirty_cells.add(cell)
+        self.selected_cell = cell
+    
     def _commit_cell_input(self, game_engine):
         """Commit the current input to the selected cell."""
         if not self.selected_cell:
-            print("No selected cell to commit")  # Debug log
+            tracer.emit('ui', DEBUG, "no selected cell to commit")
             return
         
         grid_x, grid_y = self.selected_cell
         text = self.input_text.strip()
-        print(f"Committing input '{text}' to cell ({grid_x}, {grid_y})")  # Debug log
+        tracer.emit('ui', INFO, "commit cell", x=grid_x, y=grid_y, text=text)
         
         if text == "" or text == ".":
             # Empty cell
-            print("Setting cell to empty")  # Debug log
             game_engine.board.set_cell(grid_x, grid_y, None)
         else:
             # Try to parse as integer
             try:
                 value = int(text)
                 if -99 <= value <= 99:
-                    print(f"Setting cell to integer: {value}")  # Debug log
                     game_engine.board.set_cell(grid_x, grid_y, value)
                 else:
-                    print(f"Invalid integer range: {value}")  # Debug log
+                    tracer.emit('ui', INFO, "invalid integer range", value=value)
                     return  # Invalid range
             except ValueError:
                 # Must be an operator
                 if game_engine.board.is_valid_token(text):
-                    print(f"Setting cell to operator: {text}")  # Debug log
                     game_engine.board.set_cell(grid_x, grid_y, text)
                 else:
-                    print(f"Invalid token: {text}")  # Debug log
+                    tracer.emit('ui', INFO, "invalid token", text=text)
                     return  # Invalid token
         
         # Reset simulation when board changes
         # Update the initial board to reflect the changes
-        game_engine.simulator.initial_board = game_engine.board.copy()
-        game_engine.simulator.tick = 1
-        game_engine.simulator.history = [game_engine.board.copy()]
-        game_engine.simulator.running = False
-        game_engine.simulator.submitted_value = None
-        
-        print(f"Board updated - now has {len(game_engine.board.get_all_cells())} cells")  # Debug log
+        game_engine.simulator.rebase()
+        game_engine.cached_result = None
         
         # Reset UI state
         self.input_mode = False
-        self.selected_cell = None
-        self.input_text = ""
+        self._select(None)
         self.input_text = ""
     
     def render(self, game_engine):
-        """Render the entire UI."""
-        self.screen.fill(self.colors['background'])
-        
-        self._draw_control_panel(game_engine)
-        self._draw_grid(game_engine)
-        self._draw_status_panel(game_engine)
-        
-        pygame.display.flip()
+        """Render the parts of the UI that changed, then wait for the next frame."""
+        self.draw(game_engine)
         self.clock.tick(60)
     
+    def draw(self, game_engine):
+        """Draw the parts of the UI that changed since the last frame."""
+        simulator = game_engine.simulator
+        self._watches = game_engine.watches
+        
+        # A new simulator (reset, program load) or a rebase may change anything
+        dirty = simulator.take_dirty()
+        if dirty is None or simulator is not self._rendered_simulator:
+            self._full_redraw = True
+        self._rendered_simulator = simulator
+        
+        # Seeking redraws everything, and a past board never changes
+        board = self._shown_board(game_engine)
+        if self.view_tick is not None:
+            dirty = set()
+        
+        if self._full_redraw:
+            self._full_redraw = False
+            self._dirty_cells.clear()
+            self._control_state = self._status_state = self._timeline_state = None
+            self.screen.fill(self.colors['background'])
+            self._draw_grid(board)
+            self._draw_control_panel(game_engine)
+            self._draw_timeline(game_engine)
+            self._draw_status_panel(game_engine)
+            pygame.display.flip()
+        else:
+            dirty.update(self._dirty_cells)
+            self._dirty_cells.clear()
+            rects = []
+            min_x, max_x, min_y, max_y = self._visible_cells()
+            for x, y in dirty:
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    rects.append(self._draw_cell(board, x, y))
+            rects.extend(self._draw_control_panel(game_engine))
+            rects.extend(self._draw_timeline(game_engine))
+            rects.extend(self._draw_status_panel(game_engine))
+            if rects:
+                pygame.display.update(rects)
+    
+    def invalidate(self):
+        """Redraw everything on the next frame."""
+        self._full_redraw = True
+    
     def _draw_control_panel(self, game_engine):
-        """Draw the control panel at the top."""
-        # Draw buttons
+        """Draw the control panel at the top if its content changed.
+        
+        Returns the list of updated screen rects.
+        """
         mouse_pos = pygame.mouse.get_pos()
+        simulator = game_engine.simulator
+        hovered = next((name for name, rect in self.buttons.items() if rect.collidepoint(mouse_pos)), None)
+        state = (hovered, game_engine.worker.running, simulator.input_a, simulator.input_b,
+                 simulator.tick, simulator.submitted_value, game_engine.speed_label())
+        if state == self._control_state:
+            return []
+        self._control_state = state
         
+        panel_rect = pygame.Rect(0, 0, self.screen_width, self.control_panel_height)
+        pygame.draw.rect(self.screen, self.colors['background'], panel_rect)
+        
+        # Draw buttons
         for button_name, rect in self.buttons.items():
             color = self.colors['button_hover'] if rect.collidepoint(mouse_pos) else self.colors['button']
             pygame.draw.rect(self.screen, color, rect)
@@ -231,9 +503,9 @@ class UI:
             # Button text
             text = button_name.capitalize()
             if button_name == 'start':
-                text = 'Start' if not game_engine.simulator.running else 'Stop'
+                text = 'Start' if not game_engine.worker.running else 'Stop'
             
-            text_surface = self.font_medium.render(text, True, self.colors['text'])
+            text_surface = self._render_text(self.font_medium, text, self.colors['text'])
             text_rect = text_surface.get_rect(center=rect.center)
             self.screen.blit(text_surface, text_rect)
         
@@ -242,9 +514,9 @@ class UI:
         b_text = f"B: {game_engine.simulator.input_b}"
         tick_text = f"T: {game_engine.simulator.tick:03d}"
         
-        a_surface = self.font_medium.render(a_text, True, self.colors['text'])
-        b_surface = self.font_medium.render(b_text, True, self.colors['text'])
-        tick_surface = self.font_medium.render(tick_text, True, self.colors['text'])
+        a_surface = self._render_text(self.font_medium, a_text, self.colors['text'])
+        b_surface = self._render_text(self.font_medium, b_text, self.colors['text'])
+        tick_surface = self._render_text(self.font_medium, tick_text, self.colors['text'])
         
         self.screen.blit(a_surface, (250, 20))
         self.screen.blit(b_surface, (350, 20))
@@ -253,52 +525,125 @@ class UI:
         # Submitted value
         if game_engine.simulator.submitted_value is not None:
             result_text = f"Result: {game_engine.simulator.submitted_value}"
-            result_surface = self.font_medium.render(result_text, True, (0, 150, 0))
+            result_surface = self._render_text(self.font_medium, result_text, (0, 150, 0))
             self.screen.blit(result_surface, (550, 20))
+        
+        # Auto run speed, changed with [ and ]
+        speed_surface = self._render_text(self.font_medium, f"Speed: {game_engine.speed_label()}", self.colors['text'])
+        self.screen.blit(speed_surface, (850, 20))
+        
+        return [panel_rect]
+    
+    def _static_grid(self):
+        """The grid lines and empty cells for the current zoom, drawn once and cached.
+        
+        The surface is a cell larger than the view on each side, so any pan
+        is a blit of it at an offset within one cell.
+        """
+        size = self.cell_size
+        if self._grid_surface is None or self._grid_surface_size != size:
+            width = self.view_rect.width + 2 * size + 1
+            height = self.view_rect.height + 2 * size + 1
+            surface = pygame.Surface((width, height))
+            surface.fill(self.colors['cell_empty'])
+            if size >= LOD_CELL_SIZE:
+                for x in range(0, width, size):
+                    pygame.draw.line(surface, self.colors['grid_line'], (x, 0), (x, height - 1))
+                for y in range(0, height, size):
+                    pygame.draw.line(surface, self.colors['grid_line'], (0, y), (width - 1, y))
+            self._grid_surface = surface
+            self._grid_surface_size = size
+        return self._grid_surface
+    
+    def _draw_timeline(self, game_engine):
+        """Draw the timeline below the grid if the tick or history length changed.
+        
+        Returns the list of updated screen rects.
+        """
+        length = len(game_engine.simulator.history)
+        tick = self._shown_tick(game_engine)
+        breakpoints = sorted(game_engine.breakpoints)
+        state = (tick, length, self.view_tick is None, tuple(breakpoints))
+        if state == self._timeline_state:
+            return []
+        self._timeline_state = state
+        
+        rect = self.timeline_rect
+        pygame.draw.rect(self.screen, self.colors['background'], rect)
+        
+        if self.view_tick is None:
+            label = f"Live: {length}"
+        else:
+            label = f"Tick {tick} / {length}"
+        label_surface = self._render_text(self.font_small, label, self.colors['text'])
+        self.screen.blit(label_surface, label_surface.get_rect(midleft=(rect.x + 10, rect.centery)))
+        hint_surface = self._render_text(self.font_small, ", . step  End live", self.colors['text'])
+        self.screen.blit(hint_surface, hint_surface.get_rect(midright=(rect.right - 10, rect.centery)))
+        
+        # Track, filled up to the shown tick, with a knob on it
+        track = self._timeline_track()
+        pygame.draw.rect(self.screen, self.colors['cell_empty'], track)
+        fraction = (tick - 1) / (length - 1) if length > 1 else 1.0
+        filled = track.copy()
+        filled.width = round(track.width * fraction)
+        pygame.draw.rect(self.screen, self.colors['cell_number'], filled)
+        pygame.draw.rect(self.screen, self.colors['grid_line'], track, 1)
+        for breakpoint in breakpoints:
+            if breakpoint <= length and length > 1:
+                x = track.x + round(track.width * (breakpoint - 1) / (length - 1))
+                pygame.draw.line(self.screen, self.colors['breakpoint'], (x, track.y), (x, track.bottom - 1), 2)
+        knob = pygame.Rect(0, 0, 6, rect.height - 6)
+        knob.center = (track.x + filled.width, rect.centery)
+        pygame.draw.rect(self.screen, self.colors['cell_selected'], knob)
+        return [rect]
     
-    def _draw_grid(self, game_engine):
-        """Draw the main grid."""
-        # Draw grid lines
-        for x in range(26):  # 0 to 25
-            screen_x = self.grid_offset_x + x * self.cell_size
-            pygame.draw.line(self.screen, self.colors['grid_line'], 
-                           (screen_x, self.grid_offset_y), 
-                           (screen_x, self.grid_offset_y + 15 * self.cell_size))
-        
-        for y in range(16):  # 0 to 15
-            screen_y = self.grid_offset_y + y * self.cell_size
-            pygame.draw.line(self.screen, self.colors['grid_line'], 
-                           (self.grid_offset_x, screen_y), 
-                           (self.grid_offset_x + 25 * self.cell_size, screen_y))
-        
-        # Draw cells
-        for x in range(25):
-            for y in range(15):
-                self._draw_cell(game_engine, x, y)
+    def _draw_grid(self, board):
+        """Draw the cells in view."""
+        size = self.cell_size
+        view = self.view_rect
+        phase_x = (self.grid_offset_x - view.x) % size
+        phase_y = (self.grid_offset_y - view.y) % size
+        self.screen.set_clip(view)
+        self.screen.blit(self._static_grid(), (view.x + phase_x - size, view.y + phase_y - size))
+        self.screen.set_clip(None)
+        
+        # Empty cells are already on the static grid, so only occupied cells
+        # in view are drawn, plus the selected cell and watched cells, which
+        # are outlined even when empty
+        min_x, max_x, min_y, max_y = self._visible_cells()
+        cells = {(x, y) for x, y, value in board.cells_in(min_x, max_x, min_y, max_y)}
+        cells.update((x, y) for x, y in self._watches if min_x <= x <= max_x and min_y <= y <= max_y)
+        if self.selected_cell is not None:
+            cells.add(self.selected_cell)
+        for x, y in cells:
+            self._draw_cell(board, x, y)
     
-    def _draw_cell(self, game_engine, grid_x, grid_y):
-        """Draw a single cell."""
+    def _draw_cell(self, board, grid_x, grid_y):
+        """Draw a single cell and return the screen rect it covers."""
         screen_x, screen_y = self._grid_to_screen(grid_x, grid_y)
-        cell_rect = pygame.Rect(screen_x + 1, screen_y + 1, 
-                               self.cell_size - 2, self.cell_size - 2)
+        lod = self.cell_size < LOD_CELL_SIZE
+        if lod:
+            # No grid lines at this zoom, so blocks fill the whole cell
+            cell_rect = pygame.Rect(screen_x, screen_y, self.cell_size, self.cell_size)
+        else:
+            cell_rect = pygame.Rect(screen_x + 1, screen_y + 1, 
+                                   self.cell_size - 2, self.cell_size - 2)
+        # Cells on the edge of the view must not spill onto the panels
+        cell_rect = cell_rect.clip(self.view_rect)
         
-        value = game_engine.board.get_cell(grid_x, grid_y)
+        value = board.get_cell(grid_x, grid_y)
         
         # Determine cell color
         if (grid_x, grid_y) == self.selected_cell:
             color = self.colors['cell_selected']
-        elif value is None:
-            color = self.colors['cell_empty']
-        elif isinstance(value, int):
-            color = self.colors['cell_number']
-        elif value in ['A', 'B']:
-            color = self.colors['cell_input']
-        elif value == 'S':
-            color = self.colors['cell_output']
         else:
-            color = self.colors['cell_operator']
+            color = cell_color(value, self.colors)
         
-        pygame.draw.rect(self.screen, color, cell_rect)
+        self.screen.fill(color, cell_rect)
+        if lod:
+            return cell_rect
+        if (grid_x, grid_y) in self._watches:
+            pygame.draw.rect(self.screen, self.colors['watch'], cell_rect, 2)
         
         # Draw cell content
         text_to_show = None
@@ -311,43 +656,76 @@ class UI:
             text_to_show = str(value)
         
         if text_to_show:
-            text_surface = self.font_medium.render(text_to_show, True, self.colors['text'])
+            text_surface = self._render_text(self.font_medium, text_to_show, self.colors['text'])
             text_rect = text_surface.get_rect(center=cell_rect.center)
+            # Keep long input text inside the cell so only this rect changes
+            self.screen.set_clip(cell_rect)
             self.screen.blit(text_surface, text_rect)
+            self.screen.set_clip(None)
+        
+        return cell_rect
     
     def _draw_status_panel(self, game_engine):
-        """Draw the status panel at the bottom."""
-        status_y = self.screen_height - self.status_panel_height
+        """Draw the status panel at the bottom if its content changed.
         
-        # Background
-        status_rect = pygame.Rect(0, status_y, self.screen_width, self.status_panel_height)
-        pygame.draw.rect(self.screen, (250, 250, 250), status_rect)
-        pygame.draw.line(self.screen, self.colors['grid_line'], 
-                        (0, status_y), (self.screen_width, status_y))
+        Returns the list of updated screen rects.
+        """
+        status_y = self.screen_height - self.status_panel_height
         
         # Status text
-        if game_engine.simulator.submitted_value is not None:
+        if game_engine.simulator.error is not None:
+            status = f"Error: {game_engine.simulator.error}"
+        elif game_engine.simulator.submitted_value is not None:
             status = f"Submitted: {game_engine.simulator.submitted_value}"
+        elif game_engine.simulator.cycle_period is not None:
+            status = f"Cycle detected at tick {game_engine.simulator.tick}, period {game_engine.simulator.cycle_period}"
+        elif game_engine.simulator.break_reason == 'breakpoint':
+            status = f"Breakpoint at tick {game_engine.simulator.tick}"
+        elif game_engine.simulator.break_reason == 'watch':
+            cells = ", ".join(f"({x}, {y}) = {game_engine.board.get_cell(x, y)}"
+                              for x, y in sorted(game_engine.simulator.break_cells))
+            status = f"Watch at tick {game_engine.simulator.tick}: {cells}"
         elif game_engine.simulator.running:
             status = "Running..."
         else:
             status = "Ready"
         
+        cached = game_engine.cached_result
+        if cached is not None and game_engine.simulator.stop_reason is None:
+            status += f" (cached: {cached['stop_reason']}, submitted {cached['submitted_value']}, volume {cached['volume']})"
+        
         # Spacetime volume
         volume = game_engine.simulator.get_spacetime_volume()
         volume_text = f"Volume: {volume}"
         
-        status_surface = self.font_medium.render(status, True, self.colors['text'])
-        volume_surface = self.font_medium.render(volume_text, True, self.colors['text'])
+        state = (status, volume_text, self.input_mode)
+        if state == self._status_state:
+            return []
+        self._status_state = state
         
+        # Background
+        status_rect = pygame.Rect(0, status_y, self.screen_width, self.status_panel_height)
+        pygame.draw.rect(self.screen, (250, 250, 250), status_rect)
+        pygame.draw.line(self.screen, self.colors['grid_line'], 
+                        (0, status_y), (self.screen_width, status_y))
+        
+        status_surface = self._render_text(self.font_medium, status, self.colors['text'])
+        volume_surface = self._render_text(self.font_medium, volume_text, self.colors['text'])
+        
+        # Long statuses (cycles, cached results, watches) push the volume and
+        # instructions right rather than running under them
+        volume_x = max(200, 10 + status_surface.get_width() + 20)
         self.screen.blit(status_surface, (10, status_y + 10))
-        self.screen.blit(volume_surface, (200, status_y + 10))
+        self.screen.blit(volume_surface, (volume_x, status_y + 10))
         
         # Instructions
         if self.input_mode:
             instruction = "Enter value, press Enter to confirm, Esc to cancel"
         else:
-            instruction = "Click cell to edit, Space=Step, R=Reset, S=Start/Stop"
+            instruction = "Click=Edit, Shift+Click=Watch, B=Break, Space=Step, S=Run, R=Reset, F=Fit"
+        
+        instruction_surface = self._render_text(self.font_small, instruction, self.colors['text'])
+        instruction_x = max(400, volume_x + volume_surface.get_width() + 20)
+        self.screen.blit(instruction_surface, (instruction_x, status_y + 15))
         
-        instruction_surface = self.font_small.render(instruction, True, self.colors['text'])
-        self.screen.blit(instruction_surface, (400, status_y + 15))
+        return [status_rect]
@@ -0,0 +1,416 @@
+"""
+NumPy stepping engine for the 3D language simulator.
+
+Boards are mirrored into dense arrays over a shared coordinate window:
+
+    kind   int8  (N, H, W)  EMPTY, NUMBER or TOKEN_BASE + opcode
+    value  int64 (N, H, W)  the number held by NUMBER cells, else 0
+
+A whole tick of moves, arithmetic and comparisons is computed for every
+board at once with array shifts and masks. Boards where a time warp fires,
+two writes conflict or numbers grow past the exact int64/float range are
+handed back to the scalar OperatorProcessor for that tick, so results match
+it exactly. numpy is an optional dependency; the scalar engine does not
+need it.
+
+Only collecting operations is vectorised: applying them and recording the
+history still cost the same per changed cell as with the scalar engine,
+and every numpy pass has a fixed cost over the whole window. The engine
+therefore only pays off on large, dense boards (about 1.3x on the 100x100
+benchmark board, and slower than scalar on boards of a few hundred
+cells), so boards with fewer than MIN_CELLS cells take the scalar path.
+"""
+
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
+
+from .operators import OperatorProcessor
+from .program import (
+    opcode_of, TOKENS,
+    OP_MOVE_LEFT, OP_MOVE_RIGHT, OP_MOVE_UP, OP_MOVE_DOWN,
+    OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_MOD, OP_EQUAL, OP_NOT_EQUAL, OP_WARP,
+)
+
+EMPTY = 0
+NUMBER = 1
+TOKEN_BASE = 2
+
+# Cells kept free around the occupied area when the window grows
+MARGIN = 4
+
+# Boards with fewer cells than this are collected by the scalar path, which
+# is faster there; measured with app.benchmark and app.batch
+MIN_CELLS = 2048
+
+# Above this magnitude products may overflow int64 and divisions may lose
+# float precision, so such boards use the scalar path
+VALUE_LIMIT = 1 << 31
+
+# (opcode, (dy, dx) of the value moved, (dy, dx) of its destination)
+_MOVES = (
+    (OP_MOVE_LEFT, (0, 1), (0, -1)),
+    (OP_MOVE_RIGHT, (0, -1), (0, 1)),
+    (OP_MOVE_UP, (1, 0), (-1, 0)),
+    (OP_MOVE_DOWN, (-1, 0), (1, 0)),
+)
+
+
+def require_numpy():
+    """Raise a clear error when the numpy engine is used without numpy."""
+    if np is None:
+        raise RuntimeError("The numpy engine requires numpy (pip install numpy)")
+
+
+def encode(value):
+    """Encode a cell value as (kind, number)."""
+    if value is None:
+        return EMPTY, 0
+    if isinstance(value, int):
+        return NUMBER, value
+    return TOKEN_BASE + opcode_of(value), 0
+
+
+def decode(kind, number):
+    """Decode a (kind, number) pair back into a cell value."""
+    if kind == NUMBER:
+        return number
+    return TOKENS[kind - TOKEN_BASE]
+
+
+class BoardArrays:
+    """A stack of boards held as dense arrays over one coordinate window."""
+
+    def __init__(self, count):
+        require_numpy()
+        self.count = count
+        self.origin_x = 0
+        self.origin_y = 0
+        self.kind = np.zeros((count, 2, 2), dtype=np.int8)
+        self.value = np.zeros((count, 2, 2), dtype=np.int64)
+        self.oversized = np.zeros(count, dtype=bool)  # lanes that held numbers past VALUE_LIMIT since their last load
+        # Per lane, the operations of its last vectorised collect() as
+        # absolute-coordinate arrays (write x, y, kind, value, remove x, y),
+        # or None; see sync_collected()
+        self._collected = [None] * count
+
+    @property
+    def height(self):
+        return self.kind.shape[1]
+
+    @property
+    def width(self):
+        return self.kind.shape[2]
+
+    def load(self, lane, board):
+        """Replace a lane with the full contents of a board."""
+        self._collected[lane] = None
+        self.kind[lane] = EMPTY
+        self.value[lane] = 0
+        self.oversized[lane] = False
+        if board.grid:
+            self._ensure_window(*board.get_bounds())
+        for (x, y), value in board.grid.items():
+            self._set(lane, x, y, value)
+
+    def sync(self, lane, board, positions):
+        """Copy the given cells of a board into a lane after they changed."""
+        if self.sync_collected(lane, len(positions)):
+            return
+        grid = board.grid
+        xs, ys, kinds, numbers = [], [], [], []
+        occupied = []
+        for x, y in positions:
+            value = grid.get((x, y))
+            kind, number = encode(value)
+            if kind == NUMBER and abs(number) > VALUE_LIMIT:
+                self.oversized[lane] = True
+                number = 0
+            if kind != EMPTY:
+                occupied.append((x, y))
+            xs.append(x)
+            ys.append(y)
+            kinds.append(kind)
+            numbers.append(number)
+        if not xs:
+            return
+
+        if occupied:
+            self._ensure_window(min(x for x, y in occupied), max(x for x, y in occupied),
+                                min(y for x, y in occupied), max(y for x, y in occupied))
+        ix = np.array(xs) - self.origin_x
+        iy = np.array(ys) - self.origin_y
+        # Cleared cells outside the window are already empty
+        inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+        ix, iy = ix[inside], iy[inside]
+        self.kind[lane, iy, ix] = np.array(kinds, dtype=np.int8)[inside]
+        self.value[lane, iy, ix] = np.array(numbers, dtype=np.int64)[inside]
+
+    def clear(self, lane):
+        """Empty a lane that is not being collected."""
+        self._collected[lane] = None
+        self.kind[lane] = EMPTY
+        self.value[lane] = 0
+        self.oversized[lane] = False
+
+    def sync_collected(self, lane, changed):
+        """Apply a lane's last collected operations to it, as the board did.
+
+        changed is the number of cells the board changed since then. Those
+        include every cell the operations touched, so when the counts match
+        nothing else changed and the lane is updated with a few array
+        assignments instead of cell by cell. Returns whether it was.
+        """
+        collected = self._collected[lane]
+        self._collected[lane] = None
+        if collected is None:
+            return False
+        w_x, w_y, w_kind, w_value, r_x, r_y = collected
+        touched = np.unique(np.concatenate((w_y, r_y)) * (1 << 32) + np.concatenate((w_x, r_x)))
+        if touched.size != changed:
+            return False
+
+        if w_x.size:
+            self._ensure_window(int(w_x.min()), int(w_x.max()), int(w_y.min()), int(w_y.max()))
+        # Removes first, then writes, like OperatorProcessor.apply_operations()
+        self.kind[lane, r_y - self.origin_y, r_x - self.origin_x] = EMPTY
+        self.value[lane, r_y - self.origin_y, r_x - self.origin_x] = 0
+        large = (w_kind == NUMBER) & (np.abs(w_value) > VALUE_LIMIT)
+        if large.any():
+            self.oversized[lane] = True
+            w_value = np.where(large, 0, w_value)
+        self.kind[lane, w_y - self.origin_y, w_x - self.origin_x] = w_kind
+        self.value[lane, w_y - self.origin_y, w_x - self.origin_x] = w_value
+        return True
+
+    def _set(self, lane, x, y, value):
+        kind, number = encode(value)
+        if kind == NUMBER and abs(number) > VALUE_LIMIT:
+            self.oversized[lane] = True
+            number = 0
+        iy = y - self.origin_y
+        ix = x - self.origin_x
+        self.kind[lane, iy, ix] = kind
+        self.value[lane, iy, ix] = number
+
+    def _ensure_window(self, min_x, max_x, min_y, max_y):
+        """Grow the window so the given area sits at least one cell inside it."""
+        ox, oy = self.origin_x, self.origin_y
+        h, w = self.height, self.width
+        if (min_x >= ox + 1 and max_x <= ox + w - 2 and
+                min_y >= oy + 1 and max_y <= oy + h - 2):
+            return
+
+        new_min_x = min(min_x - MARGIN, ox)
+        new_min_y = min(min_y - MARGIN, oy)
+        new_max_x = max(max_x + MARGIN, ox + w - 1)
+        new_max_y = max(max_y + MARGIN, oy + h - 1)
+        new_w = new_max_x - new_min_x + 1
+        new_h = new_max_y - new_min_y + 1
+
+        kind = np.zeros((self.count, new_h, new_w), dtype=np.int8)
+        value = np.zeros((self.count, new_h, new_w), dtype=np.int64)
+        sy = oy - new_min_y
+        sx = ox - new_min_x
+        kind[:, sy:sy + h, sx:sx + w] = self.kind
+        value[:, sy:sy + h, sx:sx + w] = self.value
+        self.kind = kind
+        self.value = value
+        self.origin_x = new_min_x
+        self.origin_y = new_min_y
+
+    def collect(self, lanes=None):
+        """Compute one tick of operations for the given lanes (default: all).
+
+        Returns a list with, per requested lane, (writes, removes) in the format of
+        OperatorProcessor.pending_writes / pending_removes, or None when the
+        lane must be evaluated by the scalar path this tick.
+        """
+        kind = self.kind
+        value = self.value
+        h, w = self.height, self.width
+
+        def shifted(array, dy, dx):
+            return array[:, 1 + dy:h - 1 + dy, 1 + dx:w - 1 + dx]
+
+        center = shifted(kind, 0, 0)
+        op = center.astype(np.int16) - TOKEN_BASE
+        k_left, v_left = shifted(kind, 0, -1), shifted(value, 0, -1)
+        k_right = shifted(kind, 0, 1)
+        k_up, v_up = shifted(kind, -1, 0), shifted(value, -1, 0)
+        k_down, v_down = shifted(kind, 1, 0), shifted(value, 1, 0)
+
+        scalar_lanes = self.oversized.copy()
+
+        # Time warps need the simulator history, so those lanes go scalar
+        warp = ((op == OP_WARP) & (k_up != EMPTY) & (k_left == NUMBER) &
+                (k_right == NUMBER) & (k_down == NUMBER) & (v_down >= 1))
+        scalar_lanes |= warp.any(axis=(1, 2))
+
+        writes = []   # (lane, y, x, kind, value) index arrays, in interior coordinates
+        removes = []  # (lane, y, x)
+
+        for opcode, (sy, sx), (dy, dx) in _MOVES:
+            src_kind = shifted(kind, sy, sx)
+            n, iy, ix = np.nonzero((op == opcode) & (src_kind != EMPTY))
+            if n.size:
+                src = (n, iy + 1 + sy, ix + 1 + sx)
+                removes.append((n, iy + sy, ix + sx))
+                writes.append((n, iy + dy, ix + dx, kind[src], value[src]))
+
+        n, iy, ix = np.nonzero((op >= OP_ADD) & (op <= OP_MOD) &
+                               (k_left == NUMBER) & (k_up == NUMBER))
+        if n.size:
+            a = v_left[n, iy, ix]
+            b = v_up[n, iy, ix]
+            result = _arithmetic(op[n, iy, ix], a, b)
+            removes.append((n, iy, ix - 1))
+            removes.append((n, iy - 1, ix))
+            number = np.full(n.size, NUMBER, dtype=np.int8)
+            writes.append((n, iy, ix + 1, number, result))
+            writes.append((n, iy + 1, ix, number, result))
+
+        both = (k_left != EMPTY) & (k_up != EMPTY)
+        equal = (k_left == k_up) & ((k_left != NUMBER) | (v_left == v_up))
+        n, iy, ix = np.nonzero(both & (((op == OP_EQUAL) & equal) |
+                                       ((op == OP_NOT_EQUAL) & ~equal)))
+        if n.size:
+            moved_kind = k_left[n, iy, ix]
+            moved_value = v_left[n, iy, ix]
+            removes.append((n, iy, ix - 1))
+            removes.append((n, iy - 1, ix))
+            writes.append((n, iy, ix + 1, moved_kind, moved_value))
+            writes.append((n, iy + 1, ix, moved_kind, moved_value))
+
+        if writes:
+            w_lane, w_y, w_x, w_kind, w_value = (np.concatenate(parts) for parts in zip(*writes))
+            r_lane, r_y, r_x = (np.concatenate(parts) for parts in zip(*removes))
+            scalar_lanes |= self._conflicting_lanes(w_lane, w_y, w_x, w_kind, w_value)
+        else:
+            w_lane = w_y = w_x = w_kind = w_value = r_lane = r_y = r_x = np.zeros(0, dtype=np.int64)
+
+        # Interior index (iy, ix) is array index (iy + 1, ix + 1)
+        x0 = self.origin_x + 1
+        y0 = self.origin_y + 1
+        results = []
+        w_split = np.searchsorted(w_lane, np.arange(self.count + 1)) if _is_sorted(w_lane) else None
+        for lane in (range(self.count) if lanes is None else lanes):
+            if scalar_lanes[lane]:
+                self._collected[lane] = None
+                results.append(None)
+                continue
+            if w_split is not None:
+                w_sel = slice(w_split[lane], w_split[lane + 1])
+            else:
+                w_sel = w_lane == lane
+            r_sel = r_lane == lane
+            lane_w_x, lane_w_y = w_x[w_sel] + x0, w_y[w_sel] + y0
+            lane_r_x, lane_r_y = r_x[r_sel] + x0, r_y[r_sel] + y0
+            lane_kind, lane_value = w_kind[w_sel], w_value[w_sel]
+            self._collected[lane] = (lane_w_x.astype(np.int64), lane_w_y.astype(np.int64), lane_kind,
+                                     lane_value, lane_r_x.astype(np.int64), lane_r_y.astype(np.int64))
+            lane_writes = [
+                (x, y, decode(k, v))
+                for x, y, k, v in zip(lane_w_x.tolist(), lane_w_y.tolist(),
+                                      lane_kind.tolist(), lane_value.tolist())
+            ]
+            lane_removes = list(zip(lane_r_x.tolist(), lane_r_y.tolist()))
+            results.append((lane_writes, lane_removes))
+        return results
+
+    def _conflicting_lanes(self, lane, y, x, kind, value):
+        """Lanes where two writes put different values into one cell."""
+        conflicts = np.zeros(self.count, dtype=bool)
+        key = (lane.astype(np.int64) * self.height + y) * self.width + x
+        order = np.argsort(key, kind='stable')
+        key, kind, value, lane = key[order], kind[order], value[order], lane[order]
+        differ = (key[1:] == key[:-1]) & ((kind[1:] != kind[:-1]) | (value[1:] != value[:-1]))
+        conflicts[lane[1:][differ]] = True
+        return conflicts
+
+
+def _arithmetic(op, a, b):
+    """Apply +, -, *, / and % elementwise with the scalar engine's semantics."""
+    result = np.zeros(op.size, dtype=np.int64)
+    safe_b = np.where(b == 0, 1, b)
+    for opcode in (OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_MOD):
+        sel = op == opcode
+        if not sel.any():
+            continue
+        x, y, safe_y = a[sel], b[sel], safe_b[sel]
+        if opcode == OP_ADD:
+            result[sel] = x + y
+        elif opcode == OP_SUB:
+            result[sel] = x - y
+        elif opcode == OP_MUL:
+            result[sel] = x * y
+        elif opcode == OP_DIV:
+            # int(a / b): true division, then truncation towards zero
+            result[sel] = np.where(y == 0, 0, np.trunc(x / safe_y).astype(np.int64))
+        else:
+            result[sel] = np.where(y == 0, 0, np.remainder(x, safe_y))
+    return result
+
+
+def _is_sorted(array):
+    return array.size < 2 or bool((array[1:] >= array[:-1]).all())
+
+
+class VectorProcessor(OperatorProcessor):
+    """OperatorProcessor that collects ticks with numpy, falling back to the scalar path."""
+
+    def __init__(self, board, arrays=None, lane=0):
+        super().__init__(board)
+        # A batch shares one BoardArrays between processors, one lane each
+        self.arrays = arrays if arrays is not None else BoardArrays(1)
+        self.lane = lane
+        self.min_cells = MIN_CELLS  # smaller boards take the scalar path
+        self.scalar_ticks = 0  # ticks handed to the scalar path
+        self._stale = set()  # cells changed since the compiled table was last updated
+        self._loaded = False  # whether the lane mirrors the board
+        self.sync()
+
+    def collect_operations(self, active=None):
+        result = self.arrays.collect([self.lane])[0] if self.sync(active) else None
+        self.accept(result, active)
+
+    def sync(self, active=None):
+        """Copy cells changed on the board into this processor's lane.
+
+        Returns False, leaving the lane empty, when the board has fewer than
+        min_cells cells; the tick should then be collected by the scalar path.
+        """
+        if len(self.board.grid) < self.min_cells:
+            if self._loaded:
+                self.arrays.clear(self.lane)
+                self._loaded = False
+            return False
+        if active is None or not self._loaded:
+            self.arrays.load(self.lane, self.board)
+            self._loaded = True
+        else:
+            self.arrays.sync(self.lane, self.board, active)
+        return True
+
+    def accept(self, result, active=None):
+        """Take this lane's entry from BoardArrays.collect() as the pending operations."""
+        if result is None:
+            # Bring the compiled table up to date before the scalar path uses it
+            self.scalar_ticks += 1
+            self.program.update(self._stale)
+            self._stale.clear()
+            super().collect_operations(active)
+            return
+
+        if active is None:
+            self.program.recompile()
+            self._stale.clear()
+        else:
+            self._stale.update(active)
+
+        self.examined = len(self.program.cells)  # numpy evaluates every cell
+        writes, removes = result
+        self.pending_writes[:] = writes
+        self.pending_removes[:] = removes
+        self.time_warps.clear()
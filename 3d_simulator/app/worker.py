@@ -0,0 +1,89 @@
+"""
+Background stepping for the 3D language simulator UI.
+
+A SimulationWorker calls a step function on its own thread, either at a
+fixed number of ticks per frame or as fast as it can. Every batch of steps
+runs while holding the worker's lock. The UI takes the same lock to handle
+input and draw a frame, so it always sees the board between two ticks.
+Between frames it releases the lock while waiting for the next one.
+"""
+
+import threading
+import time
+
+
+class SimulationWorker:
+    def __init__(self, step, frame_rate=60):
+        self.step = step  # () -> bool, False once there is nothing left to run
+        self.frame_rate = frame_rate
+        self.ticks_per_frame = 1.0  # may be fractional; None runs at full speed
+        self.lock = threading.RLock()
+        self.steps = 0  # steps taken since the worker was created
+        self._running = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._carry = 0.0  # fraction of a tick owed from earlier frames
+
+    @property
+    def running(self):
+        """Whether the worker is stepping."""
+        return self._running.is_set()
+
+    def resume(self):
+        """Start stepping, starting the thread on first use."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+            self._thread.start()
+        self._carry = 0.0
+        self._running.set()
+
+    def pause(self):
+        """Stop stepping after the current step.
+
+        If the caller holds the lock, no further step is taken at all.
+        """
+        self._running.clear()
+
+    def close(self):
+        """Stop the thread and wait for it to finish."""
+        self._closed = True
+        self._running.set()  # wake it so it can see _closed
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        frame_time = 1.0 / self.frame_rate
+        while True:
+            self._running.wait()
+            if self._closed:
+                return
+
+            deadline = time.perf_counter() + frame_time
+            full_speed = self.ticks_per_frame is None
+            with self.lock:
+                if full_speed:
+                    # Leave the rest of the frame for the UI to take the lock
+                    budget = time.perf_counter() + frame_time / 2
+                    while self._running.is_set() and time.perf_counter() < budget:
+                        self._step()
+                else:
+                    self._carry += self.ticks_per_frame
+                    count = int(self._carry)
+                    self._carry -= count
+                    for _ in range(count):
+                        if not self._running.is_set():
+                            break
+                        self._step()
+
+            if full_speed:
+                time.sleep(0.001)
+            else:
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def _step(self):
+        self.steps += 1
+        if not self.step():
+            self._running.clear()
@@ -15,7 +15,8 @@ from app.game_engine import GameEngine
 def main():
     """Main function."""
     try:
-        engine = GameEngine()
+        # Optional program file: python main.py program.3d
+        engine = GameEngine(sys.argv[1] if len(sys.argv) > 1 else None)
         engine.run()
     except KeyboardInterrupt:
         print("\nExiting...")
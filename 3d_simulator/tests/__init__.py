@@ -0,0 +1,3 @@
+"""
+Tests for the 3D language simulator. Run with python -m unittest.
+"""
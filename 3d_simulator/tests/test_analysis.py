@@ -0,0 +1,100 @@
+"""
+Tests for static analysis: every claim an Analysis makes must hold for
+actual runs of random programs.
+"""
+
+import random
+import unittest
+
+from app.analysis import analyse
+from app.board import Board
+from app.program_io import parse_program
+from app.search import ALPHABET
+from app.simulator import Simulator
+from tests.test_history import COUNTDOWN
+
+VALUES = ALPHABET + ('S', 'A', 'B', 5, 7)
+INPUTS = ((3, 4), (0, 1), (-2, 2))
+
+
+def random_board(rng):
+    width, height = rng.randint(2, 6), rng.randint(1, 5)
+    board = Board()
+    for _ in range(rng.randint(2, width * height)):
+        board.set_cell(rng.randrange(width), rng.randrange(height), rng.choice(VALUES))
+    if rng.random() < 0.5:
+        board.set_cell(rng.randrange(width), rng.randrange(height), 'S')
+    return board
+
+
+def run(board, a, b, analysis=None):
+    """Run a copy of a board; returns the outcome and every cell ever occupied."""
+    simulator = Simulator(board.copy(), a, b)
+    simulator.max_ticks = 300
+    if analysis is not None:
+        simulator.skip_dead_operators(analysis)
+    simulator.start()
+    occupied = set(simulator.board.grid)
+    while True:
+        stepped = simulator.step()
+        occupied.update(simulator.board.grid)
+        if not stepped:
+            break
+    outcome = (simulator.submitted_value, simulator.tick, simulator.stop_reason, simulator.error)
+    return outcome, occupied
+
+
+class AnalysisSoundnessTest(unittest.TestCase):
+    def test_random_programs(self):
+        rng = random.Random(25)
+        bounded = 0
+        for _ in range(600):
+            board = random_board(rng)
+            analysis = analyse(board)
+            if not analysis.bounded:
+                continue
+            bounded += 1
+            min_x, max_x, min_y, max_y = analysis.bounds
+            trimmed = Board()
+            trimmed.set_cells((x, y, value) for x, y, value in board.get_all_cells()
+                              if (x, y) not in analysis.inert)
+            for a, b in INPUTS:
+                outcome, occupied = run(board, a, b)
+                if not analysis.may_submit:
+                    self.assertNotEqual(outcome[2], 'submitted')
+                for x, y in occupied:
+                    self.assertTrue(min_x <= x <= max_x and min_y <= y <= max_y)
+                # Skipping dead operators and deleting inert cells change nothing
+                self.assertEqual(run(board, a, b, analysis)[0], outcome)
+                self.assertEqual(run(trimmed, a, b)[0], outcome)
+        self.assertGreater(bounded, 300)
+
+    def test_countdown(self):
+        analysis = analyse(parse_program(COUNTDOWN))
+        self.assertTrue(analysis.bounded)
+        self.assertTrue(analysis.may_submit)
+        self.assertEqual(analysis.dead, frozenset())
+
+    def test_unreachable_submit(self):
+        board = parse_program("1 > .\n. . S\n")
+        analysis = analyse(board)
+        self.assertFalse(analysis.may_submit)
+        self.assertEqual(analysis.bounds, (0, 2, 0, 1))
+
+    def test_dead_and_inert_cells(self):
+        # The + never has both operands, so it and its lone operand are idle
+        board = parse_program("1 > . S\n. . . .\n. + . .\n. 4 . .\n")
+        analysis = analyse(board)
+        self.assertEqual(analysis.dead, frozenset({(1, 2)}))
+        self.assertIn((1, 3), analysis.inert)
+        self.assertNotIn((1, 0), analysis.inert)
+
+    def test_variable_warp_is_unbounded(self):
+        board = parse_program(". 1 .\nA @ 1\n. 1 .\n")
+        analysis = analyse(board)
+        self.assertFalse(analysis.bounded)
+        self.assertIsNone(analysis.volume_bound(10))
+
+
+if __name__ == '__main__':
+    unittest.main()
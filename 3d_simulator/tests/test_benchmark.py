@@ -0,0 +1,64 @@
+"""
+Smoke tests for the benchmark suite, running every case for a few ticks.
+"""
+
+import contextlib
+import dataclasses
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from app import benchmark
+from app.benchmark import CASES, BenchmarkResult, available_engines, compare_reports, run_suite, suite_report
+
+SHORT_CASES = [dataclasses.replace(case, max_ticks=5) for case in CASES]
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test_suite_report_shape(self):
+        results = run_suite(SHORT_CASES, repeat=1, storages=['dict', 'chunked'])
+        engines = available_engines()
+        self.assertEqual([(r.name, r.engine, r.storage) for r in results],
+                         [(case.name, engine, storage) for case in CASES
+                          for engine in engines for storage in ('dict', 'chunked')])
+        for result in results:
+            self.assertIsInstance(result, BenchmarkResult)
+            self.assertGreater(result.cells, 0)
+            self.assertLessEqual(result.ticks, 5)
+            self.assertGreater(result.steps, 0)
+            self.assertGreaterEqual(result.ticks_per_sec, 0)
+            self.assertGreater(result.peak_history_bytes, 0)
+            self.assertGreater(result.evaluations, 0)
+            self.assertIn(result.stop_reason, ('submitted', 'deadlock', 'max_ticks'))
+
+        report = json.loads(json.dumps(suite_report(results)))
+        self.assertEqual(set(report), {'python', 'platform', 'numpy', 'results'})
+        self.assertEqual(len(report['results']), len(results))
+        self.assertEqual(set(report['results'][0]), {field.name for field in dataclasses.fields(BenchmarkResult)})
+
+        lines = compare_reports(report, report)
+        self.assertEqual(len(lines), len(results))
+        self.assertTrue(all(" x1.00 vs " in line for line in lines if "0.0 ticks/s" not in line))
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            with mock.patch.object(benchmark, 'CASES', SHORT_CASES):
+                self.assertEqual(benchmark.main(['--output', path, '--repeat', '1', '--engine', 'scalar',
+                                                 '--only', 'warp_loop']), 0)
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    benchmark.main(['--compare', path, '--repeat', '1', '--engine', 'scalar',
+                                    '--only', 'warp_loop'])
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual([result['name'] for result in report['results']], ['warp_loop'])
+        self.assertIn('warp_loop', out.getvalue())
+        self.assertIn('evaluations/tick', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Tests for the board index, checked against scans of the grid as cells are
+written, overwritten and removed.
+"""
+
+import random
+import unittest
+
+from app.board import INDEXED_TOKENS, Board
+
+VALUES = ('<', '>', '+', '@', 'S', 'A', 'B', -1, 0, 1, 7)
+
+
+def scan_bounds(board):
+    if not board.grid:
+        return None
+    xs = [x for x, y in board.grid]
+    ys = [y for x, y in board.grid]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+class BoardIndexTest(unittest.TestCase):
+    def assert_index_matches(self, board):
+        self.assertEqual(board.index.bounds(), scan_bounds(board))
+        self.assertEqual(board.get_bounds(), scan_bounds(board) or (0, 0, 0, 0))
+        for token in INDEXED_TOKENS:
+            expected = sorted(pos for pos, value in board.grid.items() if value == token)
+            self.assertEqual(sorted(board.positions(token)), expected)
+
+    def random_edits(self, rng, board, count):
+        for _ in range(count):
+            choice = rng.random()
+            if choice < 0.3 and board.grid:
+                # Clear a cell, often one on the current bounds
+                min_x, max_x, min_y, max_y = board.get_bounds()
+                edge = [pos for pos in board.grid if pos[0] in (min_x, max_x) or pos[1] in (min_y, max_y)]
+                x, y = rng.choice(edge if rng.random() < 0.7 else list(board.grid))
+                board.set_cell(x, y, rng.choice((None, '.')))
+            elif choice < 0.5 and board.grid:
+                # Overwrite an occupied cell, switching tokens and numbers
+                x, y = rng.choice(list(board.grid))
+                board.set_cell(x, y, rng.choice(VALUES))
+            elif choice < 0.6:
+                board.set_cells([(rng.randint(-8, 8), rng.randint(-8, 8), rng.choice(VALUES))
+                                 for _ in range(rng.randint(1, 4))])
+            else:
+                board.set_cell(rng.randint(-8, 8), rng.randint(-8, 8), rng.choice(VALUES))
+            self.assert_index_matches(board)
+
+    def test_random_edits(self):
+        rng = random.Random(21)
+        for chunked in (False, True):
+            for _ in range(40):
+                board = Board(chunked=chunked)
+                board.index  # build it first, so every edit updates it
+                self.random_edits(rng, board, 60)
+
+    def test_emptied_board(self):
+        board = Board()
+        board.set_cells([(0, 0, 'S'), (3, -2, 1)])
+        self.assertEqual(board.index.bounds(), (0, 3, -2, 0))
+        board.set_cell(3, -2, None)
+        self.assertEqual(board.index.bounds(), (0, 0, 0, 0))
+        board.set_cell(0, 0, '.')
+        self.assertIsNone(board.index.bounds())
+        self.assertEqual(board.positions('S'), [])
+
+    def test_copies_keep_separate_indexes(self):
+        rng = random.Random(22)
+        board = Board()
+        self.random_edits(rng, board, 30)
+        copy = board.copy()
+        self.assert_index_matches(copy)
+        self.random_edits(rng, copy, 30)
+        self.assert_index_matches(board)
+
+    def test_reindex_after_direct_writes(self):
+        board = Board()
+        board.set_cell(0, 0, 'A')
+        board.index
+        board.grid[(5, 5)] = '@'
+        board.reindex()
+        self.assert_index_matches(board)
+
+
+if __name__ == '__main__':
+    unittest.main()
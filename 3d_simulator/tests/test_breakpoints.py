@@ -0,0 +1,106 @@
+"""
+Tests for breakpoints and cell watches.
+"""
+
+import unittest
+
+from app.program_io import parse_program
+from app.simulator import Simulator
+
+# Moves 1 right; A is replaced by the input but no operator touches it
+SHIFT = """\
+A . . . .
+. 1 > . .
+"""
+
+# Counts down -1, -2, -3 through a warp and submits -3 at tick 5
+COUNTDOWN = """\
+. . . 1 . -3 .
+0 > . - . = S
+. . . . . . .
+. . 1 @ 2 . .
+. . . 1 . . .
+"""
+
+# Warps back one tick forever, writing 2 to (0, 1) each time
+WARP_LOOP = """\
+2 > . .
+. 2 @ 0
+. . 1 .
+"""
+
+
+def start(text, a=0, b=0):
+    simulator = Simulator(parse_program(text), a, b)
+    simulator.start()
+    return simulator
+
+
+class BreakpointTest(unittest.TestCase):
+    def test_pauses_on_reaching_tick(self):
+        simulator = start(COUNTDOWN)
+        simulator.set_breakpoint(3)
+        self.assertTrue(simulator.step())
+        self.assertFalse(simulator.step())
+        self.assertEqual(simulator.break_reason, 'breakpoint')
+        self.assertEqual(simulator.tick, 3)
+        self.assertTrue(simulator.running)
+
+    def test_resumes_to_the_same_result(self):
+        simulator = start(COUNTDOWN)
+        simulator.set_breakpoint(3)
+        simulator.set_breakpoint(4)
+        pauses = []
+        while simulator.running:
+            if not simulator.step() and simulator.break_reason is not None:
+                pauses.append(simulator.tick)
+        # Each warp goes back one tick, so both breakpoints are reached twice
+        self.assertEqual(pauses, [3, 3, 4, 4])
+        self.assertEqual(simulator.stop_reason, 'submitted')
+        self.assertEqual(simulator.submitted_value, -3)
+
+    def test_removed_breakpoint_does_not_pause(self):
+        simulator = start(COUNTDOWN)
+        simulator.set_breakpoint(3)
+        simulator.set_breakpoint(3, enabled=False)
+        while simulator.step():
+            pass
+        self.assertIsNone(simulator.break_reason)
+        self.assertEqual(simulator.stop_reason, 'submitted')
+
+
+class WatchTest(unittest.TestCase):
+    def test_fires_on_write(self):
+        simulator = start(SHIFT, 3, 4)
+        simulator.set_watch(3, 1)
+        self.assertFalse(simulator.step())
+        self.assertEqual(simulator.break_reason, 'watch')
+        self.assertEqual(simulator.break_cells, {(3, 1)})
+
+    def test_fires_on_remove(self):
+        simulator = start(SHIFT, 3, 4)
+        simulator.set_watch(1, 1)
+        self.assertFalse(simulator.step())
+        self.assertEqual(simulator.break_reason, 'watch')
+        self.assertEqual(simulator.break_cells, {(1, 1)})
+
+    def test_input_replacement_does_not_fire(self):
+        simulator = start(SHIFT, 3, 4)
+        simulator.set_watch(0, 0)
+        simulator.step()
+        self.assertIsNone(simulator.break_reason)
+        self.assertEqual(simulator.break_cells, set())
+        self.assertEqual(simulator.stop_reason, 'deadlock')
+
+    def test_fires_on_warp_target(self):
+        simulator = start(WARP_LOOP)
+        simulator.set_watch(0, 1)
+        self.assertTrue(simulator.step())
+        self.assertFalse(simulator.step())
+        self.assertEqual(simulator.break_reason, 'watch')
+        self.assertEqual(simulator.break_cells, {(0, 1)})
+        self.assertEqual(simulator.board.get_cell(0, 1), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
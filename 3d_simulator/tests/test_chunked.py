@@ -0,0 +1,156 @@
+"""
+Tests for the chunked board storage, cross-checked against plain dict
+boards on random programs and random edits.
+"""
+
+import random
+import unittest
+
+from app.benchmark import dense_board
+from app.board import Board
+from app.chunked import TILE_SIZE, ChunkedGrid
+from app.program_io import parse_program
+from app.simulator import Simulator
+
+VALUES = ('<', '>', '^', 'v', '+', '-', '*', '/', '%', '=', '#', '@', 'S', 'A', 'B',
+          -2, -1, 0, 1, 2, 3, 5)
+
+
+# Counts down -1, -2, -3 through a warp and submits -3 at tick 5
+COUNTDOWN = """\
+. . . 1 . -3 .
+0 > . - . = S
+. . . . . . .
+. . 1 @ 2 . .
+. . . 1 . . .
+"""
+
+
+def random_cells(rng, count, low=-2 * TILE_SIZE, high=2 * TILE_SIZE):
+    return [(rng.randint(low, high), rng.randint(low, high), rng.choice(VALUES)) for _ in range(count)]
+
+
+def observe(simulator):
+    return (simulator.tick, simulator.submitted_value, simulator.get_spacetime_volume(),
+            simulator.stop_reason, simulator.error)
+
+
+class ChunkedRunTest(unittest.TestCase):
+    def assert_same_runs(self, cells, a, b, max_ticks=60):
+        """Step a chunked and a dict board together and compare them after every tick."""
+        simulators = []
+        for chunked in (False, True):
+            board = Board(chunked=chunked)
+            board.set_cells(cells)
+            simulator = Simulator(board, a, b)
+            simulator.max_ticks = max_ticks
+            simulator.start()
+            simulators.append(simulator)
+        plain, chunked = simulators
+        self.assertTrue(chunked.board.chunked)
+        running = True
+        while running:
+            running = plain.step()
+            self.assertEqual(chunked.step(), running)
+            self.assertEqual(observe(chunked), observe(plain))
+            self.assertEqual(dict(chunked.board.grid), plain.board.grid)
+
+    def test_random_programs(self):
+        rng = random.Random(20)
+        for _ in range(300):
+            # Small boards straddling the origin, so programs cross tile edges
+            offset = rng.randint(-TILE_SIZE, TILE_SIZE)
+            cells = [(x + offset, y + offset, value)
+                     for x, y, value in random_cells(rng, rng.randint(3, 14), 0, 6)]
+            cells = list({(x, y): (x, y, value) for x, y, value in cells}.values())
+            self.assert_same_runs(cells, rng.randint(-5, 5), rng.randint(-5, 5))
+
+    def test_warp_across_tile_edges(self):
+        cells = parse_program(COUNTDOWN).get_all_cells()
+        for offset in (-TILE_SIZE - 3, -3, TILE_SIZE - 3):
+            self.assert_same_runs([(x + offset, y + offset, value) for x, y, value in cells], 0, 0)
+
+    def test_dense_board(self):
+        self.assert_same_runs(dense_board(40).get_all_cells(), 3, 4, max_ticks=20)
+
+
+class ChunkedGridTest(unittest.TestCase):
+    def test_matches_dict(self):
+        rng = random.Random(21)
+        grid = ChunkedGrid()
+        expected = {}
+        for _ in range(2000):
+            x, y, value = random_cells(rng, 1)[0]
+            if rng.random() < 0.4:
+                grid.pop((x, y), None)
+                expected.pop((x, y), None)
+            else:
+                grid[(x, y)] = value
+                expected[(x, y)] = value
+            self.assertEqual(len(grid), len(expected))
+        self.assertEqual(dict(grid), expected)
+        self.assertEqual(dict(grid.items()), expected)
+        for pos in expected:
+            self.assertIn(pos, grid)
+            self.assertEqual(grid[pos], expected[pos])
+        self.assertNotIn((10 ** 6, -10 ** 6), grid)
+
+    def test_negative_coordinates(self):
+        grid = ChunkedGrid()
+        positions = [(-1, -1), (-TILE_SIZE, 0), (-TILE_SIZE - 1, -TILE_SIZE), (0, -1), (-10 ** 9, 10 ** 9)]
+        for i, pos in enumerate(positions):
+            grid[pos] = i
+        self.assertEqual(dict(grid), {pos: i for i, pos in enumerate(positions)})
+        self.assertNotIn((TILE_SIZE - 1, TILE_SIZE - 1), grid)
+        del grid[(-1, -1)]
+        self.assertNotIn((-1, -1), grid)
+        with self.assertRaises(KeyError):
+            del grid[(-1, -1)]
+
+    def test_cells_in_matches_brute_force(self):
+        rng = random.Random(22)
+        for _ in range(100):
+            cells = dict(((x, y), value) for x, y, value in random_cells(rng, rng.randint(0, 80)))
+            grid = ChunkedGrid(cells)
+            for _ in range(10):
+                min_x, max_x = sorted(rng.randint(-3 * TILE_SIZE, 3 * TILE_SIZE) for _ in range(2))
+                min_y, max_y = sorted(rng.randint(-3 * TILE_SIZE, 3 * TILE_SIZE) for _ in range(2))
+                expected = sorted((x, y, value) for (x, y), value in cells.items()
+                                  if min_x <= x <= max_x and min_y <= y <= max_y)
+                self.assertEqual(sorted(grid.cells_in(min_x, max_x, min_y, max_y)), expected)
+
+    def test_copies_are_isolated(self):
+        rng = random.Random(23)
+        for _ in range(50):
+            original = ChunkedGrid({(x, y): value for x, y, value in random_cells(rng, 60)})
+            copy = original.copy()
+            expected_original = dict(original)
+            expected_copy = dict(original)
+            # Write to both sides in turn, including tiles the other still shares
+            for _ in range(40):
+                grid, expected = rng.choice([(original, expected_original), (copy, expected_copy)])
+                x, y, value = random_cells(rng, 1)[0]
+                if rng.random() < 0.4 and expected:
+                    pos = rng.choice(list(expected))
+                    del grid[pos]
+                    del expected[pos]
+                else:
+                    grid[(x, y)] = value
+                    expected[(x, y)] = value
+                self.assertEqual(dict(original), expected_original)
+                self.assertEqual(dict(copy), expected_copy)
+                self.assertEqual(len(original), len(expected_original))
+                self.assertEqual(len(copy), len(expected_copy))
+
+    def test_board_copy_keeps_storage(self):
+        board = Board(chunked=True)
+        board.set_cells([(0, 0, 1), (-5, 3, '>')])
+        copy = board.copy()
+        self.assertTrue(copy.chunked)
+        copy.set_cell(0, 0, 2)
+        self.assertEqual(board.get_cell(0, 0), 1)
+        self.assertEqual(copy.get_cell(0, 0), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Tests for offscreen export: the GIF LZW encoder and the frames written for
+every tick applied, time warps included.
+"""
+
+import os
+import random
+import struct
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from app.export import FrameRenderer, GifWriter, _lzw_encode, export_run, run_bounds
+from app.program_io import parse_program
+from app.simulator import Simulator
+from tests.test_history import COUNTDOWN
+
+
+def lzw_decode(data, min_code_size):
+    """Decode GIF LZW data, the reverse of _lzw_encode()."""
+    clear = 1 << min_code_size
+    end = clear + 1
+    bits = bit_count = offset = 0
+    code_size = min_code_size + 1
+    table = next_code = previous = None
+    out = bytearray()
+    while True:
+        while bit_count < code_size:
+            bits |= data[offset] << bit_count
+            offset += 1
+            bit_count += 8
+        code = bits & ((1 << code_size) - 1)
+        bits >>= code_size
+        bit_count -= code_size
+
+        if code == clear:
+            table = {i: bytes((i,)) for i in range(clear)}
+            next_code = end + 1
+            code_size = min_code_size + 1
+            previous = None
+            continue
+        if code == end:
+            return bytes(out)
+        if code in table:
+            entry = table[code]
+        elif code == next_code and previous is not None:
+            entry = table[previous] + table[previous][:1]
+        else:
+            raise ValueError(f"Bad LZW code {code}")
+        if previous is not None and next_code < 4096:
+            table[next_code] = table[previous] + entry[:1]
+            next_code += 1
+            if next_code == 1 << code_size and code_size < 12:
+                code_size += 1
+        out += entry
+        previous = code
+
+
+def gif_frames(path):
+    """Return the full canvas after each frame of a GIF written by GifWriter."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    width, height = struct.unpack_from('<HH', data, 6)
+    offset = 13 + 3 * 256
+    canvas = bytearray(width * height)
+    frames = []
+    while data[offset] != 0x3B:
+        if data[offset] == 0x21:
+            offset += 2
+            while data[offset]:
+                offset += data[offset] + 1
+            offset += 1
+            continue
+        x, y, frame_width, frame_height = struct.unpack_from('<HHHH', data, offset + 1)
+        min_code_size = data[offset + 10]
+        offset += 11
+        compressed = bytearray()
+        while data[offset]:
+            compressed += data[offset + 1:offset + 1 + data[offset]]
+            offset += data[offset] + 1
+        offset += 1
+        pixels = lzw_decode(bytes(compressed), min_code_size)
+        for row in range(frame_height):
+            start = (y + row) * width + x
+            canvas[start:start + frame_width] = pixels[row * frame_width:(row + 1) * frame_width]
+        frames.append(bytes(canvas))
+    return frames
+
+
+def started(text):
+    simulator = Simulator(parse_program(text))
+    simulator.max_ticks = 100
+    simulator.start()
+    return simulator
+
+
+class LzwTest(unittest.TestCase):
+    def test_round_trip(self):
+        rng = random.Random(2)
+        for length in (0, 1, 2, 3, 100, 5000, 70000):
+            for alphabet in (1, 2, 16, 256):
+                data = bytes(rng.randrange(alphabet) for _ in range(length))
+                self.assertEqual(lzw_decode(_lzw_encode(data, 8), 8), data, (length, alphabet))
+
+    def test_compresses_runs(self):
+        self.assertLess(len(_lzw_encode(bytes(10000), 8)), 400)
+
+
+class ExportRunTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'run.gif')
+
+    def applied_boards(self):
+        """Every board of the countdown run in the order it was applied."""
+        simulator = started(COUNTDOWN)
+        boards = [dict(simulator.board.grid)]
+        while simulator.step():
+            boards.append(dict(simulator.board.grid))
+        boards.append(dict(simulator.board.grid))
+        self.assertEqual(len(boards), simulator.ticks_applied + 1)
+        return boards
+
+    def export(self, every=1, changed_only=False):
+        bounds = run_bounds(started(COUNTDOWN))
+        renderer = FrameRenderer(bounds, cell_size=12)
+        writer = GifWriter(self.path, renderer.size)
+        try:
+            written = export_run(started(COUNTDOWN), writer, renderer, every, changed_only)
+        finally:
+            writer.close()
+        frames = gif_frames(self.path)
+        self.assertEqual(written, len(frames))
+        return frames, FrameRenderer(bounds, cell_size=12)
+
+    def assert_frames(self, frames, renderer, boards):
+        expected = []
+        for grid in boards:
+            renderer.draw(grid)
+            expected.append(pygame.image.tobytes(renderer.surface, 'P'))
+        self.assertEqual(len(frames), len(expected))
+        for frame, expected_frame in zip(frames, expected):
+            self.assertEqual(frame, expected_frame)
+
+    def test_every_applied_tick(self):
+        # The countdown warps twice, so some of its ticks are undone later
+        boards = self.applied_boards()
+        frames, renderer = self.export()
+        self.assert_frames(frames, renderer, boards)
+
+    def test_every_nth_frame_and_the_last(self):
+        boards = self.applied_boards()
+        frames, renderer = self.export(every=3)
+        self.assert_frames(frames, renderer, boards[::3] + ([boards[-1]] if (len(boards) - 1) % 3 else []))
+
+    def test_changed_only(self):
+        boards = self.applied_boards()
+        expected = [boards[0]]
+        for grid in boards[1:]:
+            if grid != expected[-1]:
+                expected.append(grid)
+        frames, renderer = self.export(changed_only=True)
+        self.assert_frames(frames, renderer, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
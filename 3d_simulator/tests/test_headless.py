@@ -0,0 +1,104 @@
+"""
+Tests for the headless runner and its command line.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from app.headless import main, run_program
+from app.program_io import parse_program
+from tests.test_history import COUNTDOWN
+
+# Adds A and B in one tick
+ADD = """\
+. A .
+B + S
+"""
+
+# Two moves write different values to one cell
+CONFLICT = """\
+A > . < B
+"""
+
+# Moves A right through 10 conveyors
+CONVEYOR = "A " + "> . " * 9 + "> S\n"
+
+
+class RunProgramTest(unittest.TestCase):
+    def test_submits(self):
+        result = run_program(parse_program(ADD), 3, 4)
+        self.assertEqual((result.submitted_value, result.stop_reason, result.tick), (7, 'submitted', 1))
+        self.assertEqual(result.steps, 1)
+        self.assertFalse(result.cached)
+
+    def test_steps_include_ticks_undone_by_warps(self):
+        result = run_program(parse_program(COUNTDOWN))
+        self.assertEqual((result.submitted_value, result.tick), (-3, 5))
+        self.assertEqual(result.steps, 7)
+
+    def test_max_ticks_step_is_not_counted(self):
+        result = run_program(parse_program(CONVEYOR), 1, 0, max_ticks=4)
+        self.assertEqual((result.stop_reason, result.tick), ('max_ticks', 4))
+        self.assertEqual(result.steps, 3)
+
+    def test_error_step_is_not_counted(self):
+        result = run_program(parse_program(CONFLICT), 1, 2)
+        self.assertEqual(result.stop_reason, 'error')
+        self.assertEqual(result.steps, 0)
+
+    def test_leaves_the_board_untouched(self):
+        board = parse_program(ADD)
+        cells = dict(board.grid)
+        run_program(board, 3, 4)
+        self.assertEqual(board.grid, cells)
+
+
+class CommandLineTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def run_main(self, program, *args):
+        path = os.path.join(self.directory, 'program.3d')
+        with open(path, 'w') as f:
+            f.write(program)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = main([path, '--no-cache', *args])
+        return code, out.getvalue()
+
+    def test_submitting_program(self):
+        code, out = self.run_main(ADD, '-a', '3', '-b', '4')
+        self.assertEqual(code, 0)
+        self.assertIn("Submitted: 7\n", out)
+        self.assertIn("Stop reason: submitted\n", out)
+        self.assertIn("Ticks: 1 (1 steps)\n", out)
+
+    def test_erroring_program(self):
+        code, out = self.run_main(CONFLICT, '-a', '1', '-b', '2')
+        self.assertEqual(code, 1)
+        self.assertIn("Stop reason: error\n", out)
+        self.assertIn("Error: Write conflict at (2, 0): 1 vs 2\n", out)
+
+    def test_max_ticks_program(self):
+        code, out = self.run_main(CONVEYOR, '-a', '1', '--max-ticks', '4')
+        self.assertEqual(code, 0)
+        self.assertIn("Submitted: None\n", out)
+        self.assertIn("Stop reason: max_ticks\n", out)
+        self.assertIn("Ticks: 4 (3 steps)\n", out)
+
+    def test_json(self):
+        code, out = self.run_main(ADD, '-a', '3', '-b', '4', '--json')
+        self.assertEqual(code, 0)
+        result = json.loads(out)
+        self.assertEqual((result['submitted_value'], result['steps'], result['stop_reason']), (7, 1, 'submitted'))
+        self.assertIn('ticks_per_sec', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for the board history: hashing, checkpoints, rewinds and the cycle
+detection built on them.
+"""
+
+import random
+import unittest
+from unittest import mock
+
+from app import history
+from app.board import Board
+from app.history import BoardHistory, cell_hash, grid_hash
+from app.program_io import parse_program
+from app.simulator import Simulator
+
+# Counts down -1, -2, -3 through a warp and submits -3 at tick 5. Its boards
+# differ only by -1 against -2, which hash() cannot tell apart
+COUNTDOWN = """\
+. . . 1 . -3 .
+0 > . - . = S
+. . . . . . .
+. . 1 @ 2 . .
+. . . 1 . . .
+"""
+
+
+def run(board, **attributes):
+    simulator = Simulator(board)
+    for name, value in attributes.items():
+        setattr(simulator, name, value)
+    simulator.start()
+    while simulator.step():
+        pass
+    return simulator
+
+
+class CellHashTest(unittest.TestCase):
+    def test_distinguishes_values(self):
+        values = [-2, -1, 0, 1, 2, 2 ** 64 - 1, -2 ** 64, 2 ** 70, '1', '>', '<', 'S']
+        hashes = {cell_hash((0, 0), value) for value in values}
+        self.assertEqual(len(hashes), len(values))
+
+    def test_distinguishes_positions(self):
+        positions = [(x, y) for x in range(-3, 4) for y in range(-3, 4)]
+        hashes = {cell_hash(pos, 1) for pos in positions}
+        self.assertEqual(len(hashes), len(positions))
+
+    def test_grid_hash_ignores_order(self):
+        cells = {(0, 0): 1, (1, 0): '>', (5, -2): -7}
+        self.assertEqual(grid_hash(cells), grid_hash(dict(reversed(list(cells.items())))))
+
+
+class BoardHistoryTest(unittest.TestCase):
+    def random_run(self, rng, ticks):
+        """Record random edits and rewinds; returns the history, board and expected grids."""
+        board = Board()
+        for _ in range(rng.randint(0, 10)):
+            board.set_cell(rng.randint(-3, 5), rng.randint(-3, 5), rng.randint(-2, 9))
+        recorded = BoardHistory(board)
+        expected = [dict(board.grid)]
+        for _ in range(ticks):
+            if rng.random() < 0.1 and len(recorded) > 1:
+                length = rng.randint(1, len(recorded))
+                recorded.rewind(board, length)
+                del expected[length:]
+                self.assertEqual(board.grid, expected[-1])
+                continue
+            changed = []
+            for _ in range(rng.randint(0, 6)):
+                pos = (rng.randint(-3, 5), rng.randint(-3, 5))
+                board.set_cell(*pos, rng.choice([None, -2, -1, 1, '>']))
+                changed.append(pos)
+            recorded.append(board, changed)
+            expected.append(dict(board.grid))
+        return recorded, board, expected
+
+    def test_rebuilds_every_tick(self):
+        rng = random.Random(1)
+        with mock.patch.object(history, 'CHECKPOINT_CHANGES', 8), \
+                mock.patch.object(history, 'CHECKPOINT_TICKS', 16):
+            for _ in range(50):
+                recorded, board, expected = self.random_run(rng, rng.randint(1, 150))
+                self.assertEqual(len(recorded), len(expected))
+                for index, grid in enumerate(expected):
+                    self.assertEqual(recorded[index].grid, grid)
+                self.assertEqual([dict(grid) for index, grid, delta in recorded.replay()], expected)
+
+    def test_hashes_match_boards(self):
+        rng = random.Random(2)
+        recorded, board, expected = self.random_run(rng, 200)
+        for index, grid in enumerate(expected):
+            self.assertEqual(recorded._hashes[index], grid_hash(grid))
+
+    def test_bounds_cover_every_tick(self):
+        rng = random.Random(3)
+        recorded, board, expected = self.random_run(rng, 200)
+        cells = [pos for grid in expected for pos in grid]
+        if cells:
+            xs = [x for x, y in cells]
+            ys = [y for x, y in cells]
+            self.assertEqual(recorded.bounds(), (min(xs), max(xs), min(ys), max(ys)))
+
+    def test_tick_id_changes_only_on_rewind(self):
+        board = Board()
+        board.set_cell(0, 0, 1)
+        recorded = BoardHistory(board)
+        for value in (2, 3, 4):
+            board.set_cell(0, 0, value)
+            recorded.append(board, [(0, 0)])
+        ids = [recorded.tick_id(index) for index in range(4)]
+        recorded.rewind(board, 2)
+        board.set_cell(0, 0, 3)
+        recorded.append(board, [(0, 0)])
+        self.assertEqual(recorded.tick_id(1), ids[1])
+        self.assertNotEqual(recorded.tick_id(2), ids[2])
+
+
+class CycleDetectionTest(unittest.TestCase):
+    def test_countdown_submits(self):
+        simulator = run(parse_program(COUNTDOWN))
+        self.assertEqual(simulator.stop_reason, 'submitted')
+        self.assertEqual(simulator.submitted_value, -3)
+        self.assertEqual(simulator.tick, 5)
+        self.assertEqual(simulator.get_spacetime_volume(), 175)
+
+    def test_hash_collisions_never_stop_a_run(self):
+        with mock.patch.object(history, 'cell_hash', lambda pos, value: 0), \
+                mock.patch.object(history, '_cell_hashes', {}):
+            simulator = run(parse_program(COUNTDOWN))
+        self.assertEqual(simulator.stop_reason, 'submitted')
+        self.assertEqual(simulator.submitted_value, -3)
+
+    def test_finds_warp_loop(self):
+        # Warps back one tick forever, writing the same value each time
+        program = parse_program("2 > . .\n. 2 @ 0\n. . 1 .\n")
+        simulator = run(program)
+        self.assertEqual(simulator.stop_reason, 'cycle')
+        self.assertIsNotNone(simulator.cycle_period)
+        uncut = run(parse_program("2 > . .\n. 2 @ 0\n. . 1 .\n"), detect_cycles=False, max_ticks=50)
+        self.assertEqual(uncut.stop_reason, 'max_ticks')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Tests for active-set operator evaluation, cross-checked tick by tick
+against a full scan of the board on random programs.
+"""
+
+import random
+import unittest
+from collections import Counter
+
+from app.board import Board
+from app.program_io import parse_program
+from app.simulator import Simulator
+
+VALUES = ('<', '>', '^', 'v', '+', '-', '*', '/', '%', '=', '#', '@', 'S', 'A', 'B',
+          -2, -1, 0, 1, 2, 3, 5)
+
+# Programs mutated into random variants, so warps and conflicts are common
+TEMPLATES = (
+    # Counts down -1, -2, -3 through two warps and submits -3 at tick 5
+    """\
+. . . 1 . -3 .
+0 > . - . = S
+. . . . . . .
+. . 1 @ 2 . .
+. . . 1 . . .
+""",
+    # Warps back one tick forever
+    """\
+2 > . .
+. 2 @ 0
+. . 1 .
+""",
+    # Warps from tick 4 back to tick 1, writing 5 into S
+    """\
+5 > . > . > . .
+. . . . . 4 @ -1
+. . S . . . 3 .
+""",
+    # Two warps to different times in the same tick
+    """\
+. 1 . . . 1 .
+0 @ 0 . 0 @ 0
+. 1 . . . 2 .
+""",
+    # Two moves writing different values to one cell
+    """\
+A > . < B
+. . . . .
+. . S . .
+""",
+)
+
+
+def random_program(rng):
+    """A template with a few cells changed, or a board of random cells."""
+    if rng.random() < 0.25:
+        board = Board()
+        size = 7
+    else:
+        board = parse_program(rng.choice(TEMPLATES))
+        min_x, max_x, min_y, max_y = board.get_bounds()
+        size = max(max_x, max_y) + 2
+    for _ in range(rng.randint(0, 4) if board.grid else rng.randint(6, 30)):
+        board.set_cell(rng.randrange(size), rng.randrange(size), rng.choice(VALUES + ('.',)))
+    return board
+
+
+def observe(simulator):
+    return (simulator.tick, simulator.submitted_value, simulator.get_spacetime_volume(),
+            simulator.stop_reason, simulator.error)
+
+
+class IncrementalTest(unittest.TestCase):
+    def assert_same_runs(self, board, a, b, max_ticks=60):
+        """Step active-set and full-scan runs together and compare them after every tick.
+
+        Returns the stop reason and the number of warps taken.
+        """
+        simulators = []
+        for incremental in (True, False):
+            simulator = Simulator(board.copy(), a, b, incremental=incremental)
+            simulator.max_ticks = max_ticks
+            simulator.start()
+            simulators.append(simulator)
+        active, full = simulators
+        warps = 0
+        running = True
+        while running:
+            tick = full.tick
+            running = full.step()
+            self.assertEqual(active.step(), running)
+            self.assertEqual(observe(active), observe(full))
+            self.assertEqual(active.board.grid, full.board.grid)
+            if full.ticks_applied and full.tick <= tick and full.stop_reason is None:
+                warps += 1
+        return full.error or full.stop_reason, warps
+
+    def test_random_programs(self):
+        rng = random.Random(4)
+        outcomes = Counter()
+        for _ in range(600):
+            outcome, warps = self.assert_same_runs(random_program(rng), rng.randint(-3, 3), rng.randint(-3, 3))
+            outcomes[outcome.split(' at ')[0]] += 1
+            outcomes['several warps'] += warps >= 2
+        # The random set covers the cases active-set evaluation could miss
+        self.assertGreater(outcomes['Write conflict'], 0)
+        self.assertGreater(outcomes['Multiple time warps to different times in same tick'], 0)
+        self.assertGreater(outcomes['several warps'], 0)
+        self.assertGreater(outcomes['submitted'], 0)
+
+    def test_templates(self):
+        for text in TEMPLATES:
+            self.assert_same_runs(parse_program(text), 3, 4)
+
+
+class ExaminedCountTest(unittest.TestCase):
+    # A moves right four times past a row of operators that never fire
+    IDLE = """\
+A > . > . > . > S
+. . . . . . . . .
++ . - . * . / . %
+"""
+
+    def test_idle_operators_are_not_examined(self):
+        simulator = Simulator(parse_program(self.IDLE), 3, 0)
+        operators = len(simulator.processor.program.cells)
+        simulator.start()
+        self.assertTrue(simulator.step())
+        # The first collection scans the board, later ones only A's neighbours
+        self.assertEqual(simulator.examined - simulator.processor.examined, operators)
+        while simulator.step():
+            self.assertLess(simulator.processor.examined, operators)
+        self.assertEqual(simulator.submitted_value, 3)
+        self.assertLess(simulator.examined, operators * simulator.evaluations)
+
+    def test_full_scan_examines_every_operator(self):
+        simulator = Simulator(parse_program(self.IDLE), 3, 0, incremental=False)
+        operators = len(simulator.processor.program.cells)
+        simulator.start()
+        while simulator.step():
+            self.assertEqual(simulator.processor.examined, operators)
+
+    def test_counters_reset(self):
+        simulator = Simulator(parse_program(TEMPLATES[0]))
+        simulator.start()
+        while simulator.step():
+            pass
+        # One collection per applied tick, including ticks the warps undid;
+        # a submitting tick needs no collection after it
+        self.assertEqual(simulator.stop_reason, 'submitted')
+        self.assertEqual(simulator.evaluations, simulator.ticks_applied)
+        self.assertGreater(simulator.examined, 0)
+        simulator.reset()
+        self.assertEqual((simulator.evaluations, simulator.examined, simulator.ticks_applied), (0, 0, 0))
+        simulator.start()
+        simulator.step()
+        self.assertEqual(simulator.examined, simulator.processor.examined + len(simulator.processor.program.cells))
+        simulator.rebase()
+        self.assertEqual((simulator.evaluations, simulator.examined), (0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for program files: the text grid format and program packs.
+"""
+
+import os
+import struct
+import tempfile
+import unittest
+
+from app.program_io import ProgramPack, format_program, load_any, parse_program, save_pack
+
+ADDER = """\
+. A .
+B + S
+"""
+
+
+class TextFormatTest(unittest.TestCase):
+    def test_round_trip(self):
+        board = parse_program(ADDER)
+        self.assertEqual(board.get_cell(1, 0), 'A')
+        self.assertEqual(board.get_cell(1, 1), '+')
+        self.assertEqual(format_program(board), ADDER)
+
+    def test_numbers(self):
+        board = parse_program("-3 . 99\n")
+        self.assertEqual(board.get_all_cells(), [(0, 0, -3), (2, 0, 99)])
+
+    def test_rejects_numbers_int_would_accept(self):
+        for token in ('1_0', '+5', '-0', '07', '\u0667', '100', '-100'):
+            with self.assertRaises(ValueError) as raised:
+                parse_program(f". .\n. {token} .\n")
+            self.assertEqual(str(raised.exception), f"Invalid token {token!r} at line 2, column 2")
+
+    def test_rejects_unknown_tokens(self):
+        with self.assertRaisesRegex(ValueError, r"Invalid token 'x' at line 1, column 3"):
+            parse_program("A . x\n")
+
+
+class ProgramPackTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'programs.3dpk')
+
+    def write_pack(self, programs):
+        save_pack(self.path, programs)
+        with open(self.path, 'rb') as f:
+            return bytearray(f.read())
+
+    def test_round_trip(self):
+        programs = {'adder': parse_program(ADDER), 'négatif': parse_program("-99 > . S\n")}
+        self.write_pack(programs)
+        with ProgramPack(self.path) as pack:
+            self.assertEqual(pack.names(), list(programs))
+            for name, board in programs.items():
+                self.assertEqual(pack.load(name).grid, board.grid)
+        self.assertEqual(load_any(self.path).grid, programs['adder'].grid)
+        self.assertEqual(load_any(self.path, 'négatif').grid, programs['négatif'].grid)
+
+    def test_rejects_numbers_out_of_range(self):
+        board = parse_program("S\n")
+        board.set_cell(1, 0, 100)
+        with self.assertRaises(ValueError):
+            save_pack(self.path, {'big': board})
+
+    def test_bad_cell_code_is_a_value_error(self):
+        data = self.write_pack({'adder': parse_program(ADDER)})
+        data[-2:] = struct.pack('<h', 5000)
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        with self.assertRaisesRegex(ValueError, "Invalid cell code"):
+            load_any(self.path)
+
+    def test_truncated_pack_is_a_value_error(self):
+        data = self.write_pack({'adder': parse_program(ADDER)})
+        for size in (8, 12, len(data) - 5):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            with self.assertRaises(ValueError):
+                load_any(self.path)
+
+    def test_empty_pack(self):
+        self.write_pack({})
+        with self.assertRaises(ValueError):
+            load_any(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests for the result cache.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app.headless import run_program
+from app.program_io import parse_program
+from app.result_cache import ResultCache, program_key
+from app.simulator import Simulator
+
+RESULT = {
+    'submitted_value': 7,
+    'tick': 3,
+    'peak_tick': 3,
+    'volume': 18,
+    'stop_reason': 'submitted',
+    'error': None,
+    'cycle_period': None,
+}
+
+# Warps from tick 4 back to tick 1, writing 5 into S; it submits at tick 2
+WARP_TO_S = """\
+5 > . > . > . .
+. . . . . 4 @ -1
+. . S . . . 3 .
+"""
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_disk_tier_round_trip(self):
+        key = program_key(parse_program(". A .\nB + S\n"), 3, 4)
+        ResultCache(self.directory.name).put(key, RESULT)
+        self.assertEqual(ResultCache(self.directory.name).get(key), RESULT)
+
+    def test_overwrites_do_not_grow_the_byte_count(self):
+        cache = ResultCache(self.directory.name)
+        key = 'ab' * 32
+        for _ in range(5):
+            cache.put(key, RESULT)
+        self.assertEqual(cache._disk_bytes, sum(size for path, size, mtime in cache._files()))
+
+    def test_stores_confirmed_cycles(self):
+        simulator = Simulator(parse_program("2 > . .\n. 2 @ 0\n. . 1 .\n"))
+        simulator.start()
+        while simulator.step():
+            pass
+        self.assertEqual(simulator.stop_reason, 'cycle')
+        cache = ResultCache()
+        cache.store_simulator('key', simulator)
+        self.assertEqual(cache.get('key')['cycle_period'], simulator.cycle_period)
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        cache = ResultCache(capacity=2)
+        cache.put('a', RESULT)
+        cache.put('b', RESULT)
+        cache.get('a')
+        cache.put('c', RESULT)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), RESULT)
+        self.assertEqual(cache.get('c'), RESULT)
+
+    def test_disk_tier_evicts_to_its_size_limit(self):
+        size = len(json.dumps(RESULT))
+        cache = ResultCache(self.directory.name, capacity=1, max_bytes=10 * size)
+        keys = [f'{i:02x}' * 32 for i in range(20)]
+        for i, key in enumerate(keys):
+            cache.put(key, RESULT)
+            # Distinct times, so the oldest files are evicted first
+            path = cache._path(key)
+            os.utime(path, (i, i))
+        files = cache._files()
+        self.assertLessEqual(sum(size for path, size, mtime in files), 10 * size)
+        self.assertEqual(cache._disk_bytes, sum(size for path, size, mtime in files))
+        reader = ResultCache(self.directory.name)
+        self.assertEqual(reader.get(keys[-1]), RESULT)
+        self.assertIsNone(reader.get(keys[0]))
+
+    def test_max_ticks_uses_the_highest_tick_reached(self):
+        board = parse_program(WARP_TO_S)
+        cache = ResultCache()
+        first = run_program(board, cache=cache)
+        self.assertEqual((first.stop_reason, first.submitted_value), ('submitted', 5))
+        self.assertEqual((first.tick, first.peak_tick), (2, 4))
+        # Uncached, a limit of 4 stops the run before its warp
+        limited = run_program(board, max_ticks=4)
+        self.assertEqual(limited.stop_reason, 'max_ticks')
+        cached = run_program(board, max_ticks=4, cache=cache)
+        self.assertFalse(cached.cached)
+        self.assertEqual(cached.stop_reason, 'max_ticks')
+        self.assertTrue(run_program(board, max_ticks=5, cache=cache).cached)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Tests for the program search: evaluation and pruning, dedup keys,
+mutations and a small seeded search.
+"""
+
+import random
+import unittest
+from collections import Counter
+
+from app.program_io import parse_program
+from app.search import PROTECTED, cells_key, evaluate, mutate, normalize, search
+
+ADD_TESTS = [(3, 4, 7), (1, 1, 2), (-2, 5, 3)]
+
+# Adds A and B, after moving A two cells right first
+PADDED_ADD = """\
+. . . B .
+A > . + S
+"""
+
+# Moves A right three times; its volume grows every tick
+CONVEYOR = "A > . > . > S\n"
+
+# Counts down -1, -2, -3 through a warp and submits -3 at tick 5
+COUNTDOWN = """\
+. . . 1 . -3 .
+0 > . - . = S
+. . . . . . .
+. . 1 @ 2 . .
+. . . 1 . . .
+"""
+
+
+def cells_of(text):
+    return normalize(parse_program(text).get_all_cells())
+
+
+class EvaluateTest(unittest.TestCase):
+    def test_passes(self):
+        self.assertEqual(evaluate(cells_of(PADDED_ADD), ADD_TESTS), ('passed', 20))
+
+    def test_wrong_answer_fails(self):
+        self.assertEqual(evaluate(cells_of(PADDED_ADD), [(3, 4, 8)])[0], 'failed')
+
+    def test_prunes_above_max_volume(self):
+        self.assertEqual(evaluate(cells_of(CONVEYOR), [(3, 0, 3)]), ('passed', 21))
+        outcome, volume = evaluate(cells_of(CONVEYOR), [(3, 0, 3)], max_volume=12)
+        self.assertEqual(outcome, 'pruned')
+        # Cut short as soon as the run outgrew the bound
+        self.assertGreater(volume, 12)
+        self.assertLess(volume, 21)
+
+    def test_prunes_first_board(self):
+        self.assertEqual(evaluate(cells_of(PADDED_ADD), ADD_TESTS, max_volume=9), ('pruned', 10))
+
+    def test_warp_boards_run_to_the_end(self):
+        # A warp can shrink the volume again, so the run is not cut short
+        self.assertEqual(evaluate(cells_of(COUNTDOWN), [(0, 0, -3)]), ('passed', 175))
+        self.assertEqual(evaluate(cells_of(COUNTDOWN), [(0, 0, -3)], max_volume=100), ('pruned', 175))
+
+
+class DedupTest(unittest.TestCase):
+    def test_translated_programs_match(self):
+        cells = parse_program(PADDED_ADD).get_all_cells()
+        moved = [(x - 7, y + 3, value) for x, y, value in reversed(cells)]
+        self.assertEqual(normalize(moved), normalize(cells))
+        self.assertEqual(cells_key(normalize(moved)), cells_key(normalize(cells)))
+
+    def test_different_programs_differ(self):
+        self.assertNotEqual(cells_key(cells_of(PADDED_ADD)), cells_key(cells_of(CONVEYOR)))
+
+    def test_normalize_starts_at_origin(self):
+        cells = normalize([(5, -2, 1), (7, 3, '>')])
+        self.assertEqual(cells, ((0, 0, 1), (2, 5, '>')))
+        self.assertEqual(normalize([]), ())
+
+
+class MutateTest(unittest.TestCase):
+    def test_protected_cells_survive(self):
+        rng = random.Random(24)
+        cells = cells_of(COUNTDOWN.replace('0 >', 'A >').replace('. . . 1 . .', 'B . . 1 . .', 1))
+        protected = Counter(value for x, y, value in cells if value in PROTECTED)
+        self.assertEqual(protected, Counter({'S': 1, 'A': 1, 'B': 1}))
+        for _ in range(500):
+            cells = normalize(mutate(cells, rng, rng.randint(1, 3)))
+            self.assertEqual(Counter(value for x, y, value in cells if value in PROTECTED), protected)
+
+    def test_does_not_change_its_input(self):
+        cells = cells_of(PADDED_ADD)
+        mutate(cells, random.Random(25), 10)
+        self.assertEqual(cells, cells_of(PADDED_ADD))
+
+
+class SearchTest(unittest.TestCase):
+    def test_finds_lower_volume(self):
+        seed = parse_program(PADDED_ADD)
+        result = search(seed, ADD_TESTS, generations=20, population=32, workers=0, rng_seed=1)
+        best = result.best[0]
+        self.assertLess(best.volume, 20)
+        self.assertEqual(evaluate(best.cells, ADD_TESTS), ('passed', best.volume))
+        self.assertGreater(result.pruned, 0)
+        self.assertGreater(result.duplicates, 0)
+
+    def test_process_pool_matches_in_process(self):
+        seed = parse_program(PADDED_ADD)
+        serial = search(seed, ADD_TESTS, generations=5, population=16, workers=0, rng_seed=2)
+        pooled = search(seed, ADD_TESTS, generations=5, population=16, workers=2, rng_seed=2)
+        self.assertEqual(pooled.best, serial.best)
+        self.assertLess(pooled.best[0].volume, 20)
+        self.assertEqual((pooled.evaluated, pooled.pruned, pooled.failed, pooled.duplicates),
+                         (serial.evaluated, serial.pruned, serial.failed, serial.duplicates))
+
+    def test_seed_must_pass(self):
+        with self.assertRaises(ValueError):
+            search(parse_program(PADDED_ADD), [(3, 4, 8)], generations=1, workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for per-tick statistics: one row per applied tick, and the CSV and
+columnar files they are written to.
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+
+from app.benchmark import dense_board
+from app.program_io import parse_program
+from app.simulator import Simulator
+from app.stats import COLUMNS, StatsRecorder, open_stats, read_columns
+from tests.test_history import COUNTDOWN
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+
+    def write(self, columns):
+        self.rows.extend(dict(zip(COLUMNS, row)) for row in zip(*columns))
+
+    def close(self):
+        self.closed = True
+
+
+def run(board, recorder, max_ticks=1000):
+    """Run to the end; returns the simulator and, per step, (tick before, tick after)."""
+    simulator = Simulator(board)
+    simulator.max_ticks = max_ticks
+    simulator.stats = recorder
+    simulator.start()
+    ticks = []
+    while True:
+        before = simulator.tick
+        stepped = simulator.step()
+        ticks.append((before, simulator.tick))
+        if not stepped:
+            return simulator, ticks
+
+
+class StatsRecorderTest(unittest.TestCase):
+    def test_one_row_per_applied_tick(self):
+        recorder = StatsRecorder(ListWriter(), buffer_rows=3)
+        simulator, ticks = run(parse_program(COUNTDOWN), recorder)
+        recorder.close()
+        rows = recorder.writer.rows
+        self.assertTrue(recorder.writer.closed)
+        self.assertEqual(simulator.submitted_value, -3)
+
+        # Every step applied a tick, the submitting one included
+        self.assertEqual(len(rows), len(ticks))
+        self.assertEqual(recorder.rows, len(rows))
+        self.assertEqual([row['tick'] for row in rows], [before for before, after in ticks])
+        self.assertEqual([row['submitted'] for row in rows], [0] * (len(rows) - 1) + [1])
+
+        warped = [row['warped'] for row in rows]
+        self.assertEqual(warped, [int(after <= before) for before, after in ticks[:-1]] + [0])
+        self.assertEqual(sum(warped), 2)
+        self.assertEqual(rows[-1]['warps'], 2)
+        self.assertEqual(rows[-1]['volume'], simulator.get_spacetime_volume())
+        self.assertEqual(rows[-1]['cells'], len(simulator.board.grid))
+
+    def test_max_ticks_applies_no_extra_row(self):
+        recorder = StatsRecorder(ListWriter())
+        simulator, ticks = run(dense_board(10), recorder, max_ticks=5)
+        recorder.close()
+        self.assertEqual(simulator.stop_reason, 'max_ticks')
+        self.assertEqual([row['tick'] for row in recorder.writer.rows], [1, 2, 3, 4])
+
+
+class StatsFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def record(self, name, fmt=None):
+        path = os.path.join(self.directory.name, name)
+        with open_stats(path, fmt, buffer_rows=2) as recorder:
+            run(parse_program(COUNTDOWN), recorder)
+        expected = StatsRecorder(ListWriter())
+        run(parse_program(COUNTDOWN), expected)
+        expected.flush()
+        return path, [[row[name] for row in expected.writer.rows] for name in COLUMNS]
+
+    def test_csv(self):
+        path, expected = self.record('run.csv')
+        with open(path, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(tuple(rows[0]), COLUMNS)
+        self.assertEqual([list(map(int, column)) for column in zip(*rows[1:])], expected)
+
+    def test_columns(self):
+        path, expected = self.record('run.cols')
+        columns = read_columns(path)
+        self.assertEqual(tuple(columns), COLUMNS)
+        self.assertEqual([list(column) for column in columns.values()], expected)
+
+    def test_truncated_columns(self):
+        path, expected = self.record('run.cols')
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 4)
+        with self.assertRaises(ValueError):
+            read_columns(path)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            open_stats(os.path.join(self.directory.name, 'run.txt'), 'xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
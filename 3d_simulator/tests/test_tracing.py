@@ -0,0 +1,60 @@
+"""
+Tests for the tracer and its JSON lines file sink.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from app.program_io import parse_program
+from app.simulator import Simulator
+from app.tracing import CATEGORIES, tracer
+
+# Moves A right twice and submits it at tick 3
+PROGRAM = """\
+A > . .
+. . > S
+"""
+
+
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        levels = {name: getattr(tracer, name) for name in CATEGORIES}
+        self.addCleanup(lambda: [tracer.set_level(name, level) for name, level in levels.items()])
+        tracer.clear()
+        self.addCleanup(tracer.clear)
+        self.addCleanup(tracer.close_sink)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'trace.jsonl')
+
+    def test_tick_debug_trace_to_sink(self):
+        tracer.configure('tick:debug')
+        tracer.open_sink(self.path)
+        simulator = Simulator(parse_program(PROGRAM), 3, 4)
+        simulator.start()
+        while simulator.step():
+            pass
+        tracer.close_sink()
+
+        with open(self.path) as f:
+            events = [json.loads(line) for line in f]
+        steps = [e for e in events if e['message'] == "step"]
+        self.assertTrue(steps)
+        self.assertEqual(steps[0]['tick'], 1)
+        self.assertIn([0, 0, 3], steps[0]['board'])
+        self.assertIn([3, 1, 'S'], steps[0]['board'])
+
+    def test_disabled_category_emits_nothing(self):
+        tracer.set_level('all', 'off')
+        tracer.open_sink(self.path)
+        tracer.emit('tick', 1, "dropped")
+        tracer.close_sink()
+        with open(self.path) as f:
+            self.assertEqual(f.read(), '')
+        self.assertEqual(tracer.recent('tick'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Tests for the UI on the dummy video driver: dirty redraws against full
+redraws, the text surface cache and timeline seeking.
+"""
+
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from app.program_io import parse_program
+from app.simulator import Simulator
+from app.ui import UI
+from tests.test_history import COUNTDOWN
+
+
+def engine_for(text, a=0, b=0):
+    """The parts of a GameEngine the UI reads, around a started Simulator."""
+    board = parse_program(text)
+    simulator = Simulator(board, a, b)
+    simulator.start()
+    return SimpleNamespace(board=board, simulator=simulator, breakpoints=set(), watches=set(),
+                           cached_result=None, worker=SimpleNamespace(running=False),
+                           speed_label=lambda: "1 tick/frame")
+
+
+class UITest(unittest.TestCase):
+    def setUp(self):
+        self.ui = UI()
+        self.addCleanup(pygame.quit)
+
+    def test_dirty_redraw_matches_full_redraw(self):
+        engine = engine_for(COUNTDOWN)
+        engine.watches = {(2, 1), (6, 4)}  # one cell the run writes, one always empty
+        engine.breakpoints = {3}
+        self.ui.show_board(engine.board)
+        self.ui._select((4, 2))
+        self.ui.draw(engine)
+        frames = 0
+        while engine.simulator.step() or engine.simulator.running:
+            self.ui.draw(engine)
+            dirty = pygame.image.tostring(self.ui.screen, 'RGB')
+            self.ui.invalidate()
+            self.ui.draw(engine)
+            self.assertEqual(dirty, pygame.image.tostring(self.ui.screen, 'RGB'))
+            frames += 1
+        self.assertGreater(frames, 3)
+        self.assertEqual(engine.simulator.submitted_value, -3)
+
+    def test_text_cache_evicts_least_recently_used(self):
+        ui = self.ui
+        ui.text_cache_size = 4
+        ui._text_cache.clear()
+        colour = ui.colors['text']
+        first = ui._render_text(ui.font_small, "0", colour)
+        for text in "1234":
+            ui._render_text(ui.font_small, text, colour)
+        self.assertEqual(len(ui._text_cache), 4)
+        self.assertNotIn((ui.font_small, "0", colour), ui._text_cache)
+        self.assertIsNot(ui._render_text(ui.font_small, "0", colour), first)
+        # A hit moves the entry to the back, so "2" goes next instead of it
+        kept = ui._render_text(ui.font_small, "3", colour)
+        ui._render_text(ui.font_small, "5", colour)
+        self.assertIs(ui._render_text(ui.font_small, "3", colour), kept)
+        self.assertNotIn((ui.font_small, "2", colour), ui._text_cache)
+
+    def test_seek_restores_past_boards(self):
+        engine = engine_for(COUNTDOWN)
+        boards = [dict(engine.board.grid)]  # board at each tick, by the latest run of it
+        while engine.simulator.step():
+            del boards[engine.simulator.tick - 1:]
+            boards.append(dict(engine.board.grid))
+        history = engine.simulator.history
+        self.assertEqual(len(history), len(boards))
+
+        for tick in range(1, len(history)):
+            self.ui.seek(tick)
+            shown = self.ui._shown_board(engine)
+            self.assertEqual(shown.grid, history[tick - 1].grid)
+            self.assertEqual(shown.grid, boards[tick - 1])
+            self.ui.draw(engine)
+        self.ui.seek(None)
+        self.assertIs(self.ui._shown_board(engine), engine.board)
+
+    def test_scrub_ends(self):
+        engine = engine_for(COUNTDOWN)
+        for _ in range(3):
+            engine.simulator.step()
+        track = self.ui._timeline_track()
+        self.ui._scrub(engine, track.x)
+        self.assertEqual(self.ui.view_tick, 1)
+        self.ui._scrub(engine, track.right)
+        self.assertIsNone(self.ui.view_tick)
+
+
+if __name__ == '__main__':
+    unittest.main()
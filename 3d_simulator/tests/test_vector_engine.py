@@ -0,0 +1,104 @@
+"""
+Tests for the numpy engine, cross-checked tick by tick against the scalar
+OperatorProcessor on random programs.
+"""
+
+import random
+import unittest
+from unittest import mock
+
+from app import batch, vector_engine
+from app.batch import run_batch
+from app.benchmark import dense_board
+from app.board import Board
+from app.simulator import Simulator
+from app.vector_engine import np
+
+VALUES = ('<', '>', '^', 'v', '+', '-', '*', '/', '%', '=', '#', '@', 'S', 'A', 'B',
+          -2, -1, 0, 1, 2, 3, 5, 2 ** 40)
+
+
+def random_board(rng, size=7):
+    board = Board()
+    for _ in range(rng.randint(3, 2 * size)):
+        board.set_cell(rng.randrange(size), rng.randrange(size), rng.choice(VALUES))
+    return board
+
+
+def observe(simulator):
+    return (simulator.tick, simulator.submitted_value, simulator.get_spacetime_volume(),
+            simulator.stop_reason, simulator.error)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class VectorEngineTest(unittest.TestCase):
+    def assert_same_runs(self, board, a, b, max_ticks=60):
+        """Step both engines together and compare them after every tick."""
+        simulators = []
+        for engine in ('scalar', 'numpy'):
+            simulator = Simulator(board.copy(), a, b, engine=engine)
+            simulator.max_ticks = max_ticks
+            simulator.start()
+            simulators.append(simulator)
+        scalar, vector = simulators
+        running = True
+        while running:
+            running = scalar.step()
+            self.assertEqual(vector.step(), running)
+            self.assertEqual(observe(vector), observe(scalar))
+            self.assertEqual(vector.board.grid, scalar.board.grid)
+        return vector
+
+    def test_random_programs(self):
+        rng = random.Random(8)
+        with mock.patch.object(vector_engine, 'MIN_CELLS', 0):
+            for _ in range(300):
+                self.assert_same_runs(random_board(rng), rng.randint(-5, 5), rng.randint(-5, 5))
+
+    def test_vector_path_is_used(self):
+        board = Board()
+        board.set_cells([(0, 0, 1), (1, 0, '>'), (3, 1, 'S')])
+        with mock.patch.object(vector_engine, 'MIN_CELLS', 0):
+            vector = self.assert_same_runs(board, 0, 0)
+        self.assertEqual(vector.processor.scalar_ticks, 0)
+
+    def test_switching_paths(self):
+        # Boards growing and shrinking across the threshold move between paths
+        rng = random.Random(9)
+        with mock.patch.object(vector_engine, 'MIN_CELLS', 6):
+            for _ in range(200):
+                self.assert_same_runs(random_board(rng), rng.randint(-5, 5), rng.randint(-5, 5))
+
+    def test_small_boards_take_scalar_path(self):
+        board = Board()
+        board.set_cells([(0, 0, 1), (1, 0, '>'), (3, 1, 'S')])
+        vector = self.assert_same_runs(board, 0, 0)
+        self.assertEqual(vector.processor.scalar_ticks, vector.tick)
+
+    def test_dense_board(self):
+        vector = self.assert_same_runs(dense_board(80), 3, 4, max_ticks=10)
+        self.assertGreaterEqual(len(vector.board.grid), vector_engine.MIN_CELLS)
+        self.assertLess(vector.processor.scalar_ticks, vector.tick)
+
+    def test_batch_matches_scalar(self):
+        rng = random.Random(10)
+        inputs = [(a, b) for a in range(-2, 3) for b in range(-2, 3)]
+        with mock.patch.object(vector_engine, 'MIN_CELLS', 6):
+            for _ in range(40):
+                board = random_board(rng)
+                scalar = run_batch(board, inputs, max_ticks=60, engine='scalar')
+                vector = run_batch(board, inputs, max_ticks=60, engine='numpy')
+                self.assertEqual(vector.lanes, scalar.lanes)
+
+    def test_batch_lanes_report_numpy_engine(self):
+        board = Board()
+        board.set_cells([(0, 0, 'A'), (1, 0, '>'), (3, 1, 'S')])
+        simulators = [Simulator(board.copy(), a, 0) for a in range(3)]
+        batch._run_vectorised(simulators)
+        for simulator in simulators:
+            self.assertEqual(simulator.engine, 'numpy')
+            self.assertIsInstance(simulator.processor, vector_engine.VectorProcessor)
+
+
+if __name__ == '__main__':
+    unittest.main()
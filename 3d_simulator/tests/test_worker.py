@@ -0,0 +1,89 @@
+"""
+Tests for the simulation worker thread, compared with synchronous runs.
+"""
+
+import time
+import unittest
+
+from app.program_io import parse_program
+from app.simulator import Simulator
+from app.worker import SimulationWorker
+
+# Moves A right through 40 conveyors and submits it
+CONVEYOR = "A " + "> . " * 39 + "> S\n"
+
+
+def observe(simulator):
+    return (simulator.tick, simulator.submitted_value, simulator.get_spacetime_volume(),
+            simulator.stop_reason, dict(simulator.board.grid))
+
+
+def synchronous_run():
+    simulator = Simulator(parse_program(CONVEYOR), 7, 0)
+    simulator.start()
+    while simulator.step():
+        pass
+    return observe(simulator)
+
+
+class SimulationWorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.simulator = Simulator(parse_program(CONVEYOR), 7, 0)
+        self.simulator.start()
+        self.worker = SimulationWorker(self.simulator.step, frame_rate=1000)
+        self.addCleanup(self.worker.close)
+
+    def wait_until(self, predicate, timeout=10.0):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                self.fail("timed out waiting for the worker")
+            time.sleep(0.001)
+
+    def test_full_speed_runs_to_completion(self):
+        self.worker.ticks_per_frame = None
+        self.worker.resume()
+        self.wait_until(lambda: not self.worker.running)
+        self.assertEqual(observe(self.simulator), synchronous_run())
+        self.assertEqual(self.simulator.stop_reason, 'submitted')
+
+    def test_ticks_per_frame(self):
+        self.worker.ticks_per_frame = 2
+        self.worker.resume()
+        self.wait_until(lambda: not self.worker.running)
+        self.assertEqual(observe(self.simulator), synchronous_run())
+
+    def test_pause_and_resume(self):
+        self.worker.ticks_per_frame = 1
+        self.worker.resume()
+        self.wait_until(lambda: self.worker.steps >= 5)
+        with self.worker.lock:
+            self.worker.pause()
+            paused = observe(self.simulator)
+            steps = self.worker.steps
+        time.sleep(0.02)
+        self.assertEqual(self.worker.steps, steps)
+        self.assertEqual(observe(self.simulator), paused)
+        self.assertEqual(self.simulator.stop_reason, None)
+
+        self.worker.resume()
+        self.wait_until(lambda: not self.worker.running)
+        self.assertEqual(observe(self.simulator), synchronous_run())
+
+    def test_reset_while_running(self):
+        self.worker.ticks_per_frame = 1
+        self.worker.resume()
+        self.wait_until(lambda: self.worker.steps >= 5)
+        with self.worker.lock:
+            self.worker.pause()
+            self.simulator.reset()
+            self.simulator.start()
+            self.assertEqual(self.simulator.tick, 1)
+        self.worker.ticks_per_frame = None
+        self.worker.resume()
+        self.wait_until(lambda: not self.worker.running)
+        self.assertEqual(observe(self.simulator), synchronous_run())
+
+
+if __name__ == '__main__':
+    unittest.main()